@@ -0,0 +1,6 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能基准测试包 - 对比各检索与处理路径的耗时
+"""
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+案例近似检索基准测试 - 对比IVF索引与精确打分在不同探查簇数下的召回率和延迟
+
+用法:
+    python -m care_elite.benchmarks.case_ann --count 500000 --queries 200 --nprobe 1,2,4,8,16
+    python -m care_elite.benchmarks.case_ann --count 500000 --nlist 64
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from care_elite.benchmarks.case_database import generate_profiles
+from care_elite.benchmarks.synthetic import generate_success_cases
+from care_elite.database.case_ann import CaseIVFIndex
+from care_elite.database.case_database import CaseFeatureMatrix
+
+def _recall(exact: List[np.ndarray], approximate: List[np.ndarray], top_k: int) -> float:
+    """按案例下标计算的平均召回率"""
+    hits = [len(set(e.tolist()) & set(a.tolist())) / max(min(top_k, len(e)), 1) for e, a in zip(exact, approximate)]
+    return round(sum(hits) / len(hits), 4)
+
+def _score_recall(exact: List[np.ndarray], approximate: List[np.ndarray], top_k: int) -> float:
+    """按分数计算的平均召回率，同分案例互相替换不算漏召回"""
+    hits = []
+    for e, a in zip(exact, approximate):
+        common = Counter(e.tolist()) & Counter(a.tolist())
+        hits.append(sum(common.values()) / max(min(top_k, len(e)), 1))
+    return round(sum(hits) / len(hits), 4)
+
+def run_benchmark(count: int = 500000, queries: int = 200, top_k: int = 10,
+                  nprobes: Optional[List[int]] = None, nlist: Optional[int] = None,
+                  inserts: int = 1000, seed: int = 42) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    参数:
+        count: 案例条数
+        queries: 查询条数
+        top_k: top-k检索的k值
+        nprobes: 要测试的最少探查簇数
+        nlist: 簇数，默认按案例数计算
+        inserts: 增量插入的案例条数
+        seed: 随机种子
+
+    返回:
+        基准测试结果
+    """
+    nprobes = nprobes or [1, 2, 4, 8, 16]
+    cases = generate_success_cases(count + inserts, seed)
+    case_matrix = CaseFeatureMatrix(cases[:count])
+    vectors = [
+        case_matrix.profile_vector(p.get("delivery_type", ""), p.get("concerns", []), p.get("child_count", 0))
+        for p in generate_profiles(queries, seed + 1)
+    ]
+
+    def per_query_ms(seconds: float) -> float:
+        return round(seconds * 1000 / queries, 4)
+
+    start = time.perf_counter()
+    ann = CaseIVFIndex.build(case_matrix.matrix, case_matrix.feature_signature(), nlist, seed)
+    build_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        ann.save(path)
+        save_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = CaseIVFIndex.load(path)
+        load_seconds = time.perf_counter() - start
+
+        # 增量插入：特征矩阵和索引同步追加
+        start = time.perf_counter()
+        for position in range(count, count + inserts):
+            if case_matrix.add(cases[position]):
+                loaded.add(position, case_matrix.matrix[position])
+        insert_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = [case_matrix.rank(vector, top_k) for vector in vectors]
+        exact_seconds = time.perf_counter() - start
+        exact_scores = [scores for _, scores in exact]
+
+        runs = []
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            approximate = [loaded.rank(vector, top_k, nprobe=nprobe) for vector in vectors]
+            seconds = time.perf_counter() - start
+            runs.append({
+                "nprobe": nprobe,
+                "ms_per_query": per_query_ms(seconds),
+                "recall_at_k": _recall([p for p, _ in exact], [p for p, _ in approximate], top_k),
+                "score_recall_at_k": _score_recall(exact_scores, [s for _, s in approximate], top_k),
+                "speedup": round(exact_seconds / seconds, 2) if seconds else None
+            })
+
+        memory_mapped = isinstance(loaded.vectors, np.memmap)
+
+    return {
+        "cases": count,
+        "queries": queries,
+        "top_k": top_k,
+        "nlist": len(ann.centroids),
+        "build_ms": round(build_seconds * 1000, 3),
+        "save_ms": round(save_seconds * 1000, 3),
+        "load_ms": round(load_seconds * 1000, 3),
+        "memory_mapped": memory_mapped,
+        "inserts": inserts,
+        "insert_us_per_case": round(insert_seconds * 1e6 / inserts, 3) if inserts else None,
+        "exact_ms_per_query": per_query_ms(exact_seconds),
+        "ann": runs
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="案例近似检索基准测试")
+    parser.add_argument("--count", type=int, default=500000, help="案例条数")
+    parser.add_argument("--queries", type=int, default=200, help="查询条数")
+    parser.add_argument("--top-k", type=int, default=10, help="top-k检索的k值")
+    parser.add_argument("--nprobe", default="1,2,4,8,16", help="逗号分隔的最少探查簇数")
+    parser.add_argument("--nlist", type=int, default=None, help="簇数，默认约为4 * sqrt(案例数)")
+    parser.add_argument("--inserts", type=int, default=1000, help="增量插入的案例条数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.count, args.queries, args.top_k,
+                           [int(n) for n in args.nprobe.split(",") if n], args.nlist, args.inserts, args.seed)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+案例检索基准测试 - 对比NumPy特征矩阵打分与逐条Python打分
+
+用法:
+    python -m care_elite.benchmarks.case_database --count 500000 --queries 20
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from care_elite.benchmarks.synthetic import generate_basic_info, generate_success_cases
+from care_elite.database.case_database import CASE_MATCH_WEIGHTS, CaseFeatureMatrix
+
+def generate_profiles(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    生成合成的用户画像基本信息
+
+    参数:
+        count: 画像条数
+        seed: 随机种子
+
+    返回:
+        basic_info列表
+    """
+    rng = random.Random(seed)
+    return [generate_basic_info(rng) for _ in range(count)]
+
+def linear_rank_cases(basic_info: Dict[str, Any], cases: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """原有的逐条打分逻辑，作为对照基准，返回按分数降序的(位置, 分数)"""
+    delivery_type = basic_info.get("delivery_type", "")
+    concerns = basic_info.get("concerns", [])
+    child_count = basic_info.get("child_count", 0)
+
+    results = []
+    for position, case in enumerate(cases):
+        match_score = 0
+        case_info = case.get("customer_info", {})
+        if delivery_type and case_info.get("delivery_type") == delivery_type:
+            match_score += CASE_MATCH_WEIGHTS["delivery_type"]
+        for concern in concerns:
+            if concern in case_info.get("initial_concerns", []):
+                match_score += CASE_MATCH_WEIGHTS["concern"]
+        if child_count and case_info.get("child_count") == child_count:
+            match_score += CASE_MATCH_WEIGHTS["child_count"]
+        if match_score > 0:
+            results.append((position, match_score))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return results
+
+def _vectorized_rank(case_matrix: CaseFeatureMatrix, basic_info: Dict[str, Any], top_k: Any = None) -> List[Tuple[int, int]]:
+    vector = case_matrix.profile_vector(basic_info.get("delivery_type", ""), basic_info.get("concerns", []),
+                                        basic_info.get("child_count", 0))
+    positions, scores = case_matrix.rank(vector, top_k)
+    return list(zip(positions.tolist(), [int(score) for score in scores.tolist()]))
+
+def run_benchmark(count: int = 500000, queries: int = 20, top_k: int = 10, seed: int = 42) -> Dict[str, Any]:
+    """
+    运行对比基准测试，并校验排名一致
+
+    参数:
+        count: 案例条数
+        queries: 查询条数
+        top_k: top-k检索的k值
+        seed: 随机种子
+
+    返回:
+        基准测试结果
+    """
+    cases = generate_success_cases(count, seed)
+    profiles = generate_profiles(queries, seed + 1)
+
+    start = time.perf_counter()
+    case_matrix = CaseFeatureMatrix(cases)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    linear_results = [linear_rank_cases(p, cases) for p in profiles]
+    linear_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized_results = [_vectorized_rank(case_matrix, p) for p in profiles]
+    vectorized_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top_k_results = [_vectorized_rank(case_matrix, p, top_k) for p in profiles]
+    top_k_seconds = time.perf_counter() - start
+
+    consistent = vectorized_results == linear_results and all(
+        top == full[:top_k] for top, full in zip(top_k_results, linear_results)
+    )
+
+    def per_query_ms(seconds: float) -> float:
+        return round(seconds * 1000 / queries, 3)
+
+    return {
+        "cases": count,
+        "queries": queries,
+        "matrix_build_ms": round(build_seconds * 1000, 3),
+        "linear_ms_per_query": per_query_ms(linear_seconds),
+        "vectorized_full_ranking_ms_per_query": per_query_ms(vectorized_seconds),
+        "vectorized_top_k_ms_per_query": per_query_ms(top_k_seconds),
+        "top_k": top_k,
+        "speedup_top_k": round(linear_seconds / top_k_seconds, 2) if top_k_seconds else None,
+        "consistent": consistent
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="案例检索基准测试")
+    parser.add_argument("--count", type=int, default=500000, help="案例条数")
+    parser.add_argument("--queries", type=int, default=20, help="查询条数")
+    parser.add_argument("--top-k", type=int, default=10, help="top-k检索的k值")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.count, args.queries, args.top_k, args.seed), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
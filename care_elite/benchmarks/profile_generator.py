@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+用户信息提取基准测试 - 对比单次扫描的关键词匹配器与逐关键词子串查找，以及增量画像更新与全量重建
+
+用法:
+    python -m care_elite.benchmarks.profile_generator --length 50000
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from care_elite.utils.profile_generator import (PROFILE_KEYWORD_RULES, discard_extraction_state, extract_user_info,
+                                                generate_user_profile, update_user_profile)
+
+FILLER_SENTENCES = [
+    "我们先看一下中心的环境，房间都是朝南的，采光很好。",
+    "宝宝的护理由专业护士负责，月嫂都持证上岗。",
+    "每天的餐食会根据您的口味和恢复阶段调整。",
+    "这边是活动区，平时会有亲子课程和产后瑜伽。",
+    "嗯，好的，我了解了，那我们再看看别的。"
+]
+
+def legacy_extract_user_info(text: str) -> Dict[str, Any]:
+    """原有的逐关键词子串查找实现，作为对照基准"""
+    extracted_info = {
+        "delivery_type": None,
+        "child_count": None,
+        "concerns": [],
+        "budget_preference": None
+    }
+    if "顺产" in text:
+        extracted_info["delivery_type"] = "顺产"
+    elif "剖腹产" in text or "刨腹产" in text:
+        extracted_info["delivery_type"] = "剖腹产"
+    if "一胎" in text or "第一胎" in text or "第一个孩子" in text:
+        extracted_info["child_count"] = 1
+    elif "二胎" in text or "第二胎" in text or "第二个孩子" in text:
+        extracted_info["child_count"] = 2
+    concerns = []
+    if any(keyword in text for keyword in ["体重", "瘦身", "减肥", "恢复身材"]):
+        concerns.append("体重恢复")
+    if any(keyword in text for keyword in ["母乳", "奶水", "喂养", "催乳"]):
+        concerns.append("母乳喂养")
+    if any(keyword in text for keyword in ["睡眠", "失眠", "休息不好"]):
+        concerns.append("睡眠质量")
+    if any(keyword in text for keyword in ["伤口", "恢复", "疼痛"]):
+        concerns.append("伤口愈合")
+    extracted_info["concerns"] = concerns
+    if any(keyword in text for keyword in ["经济", "便宜", "实惠", "性价比"]):
+        extracted_info["budget_preference"] = "经济型"
+    elif any(keyword in text for keyword in ["高端", "豪华", "尊享", "贵"]):
+        extracted_info["budget_preference"] = "高端"
+    return extracted_info
+
+def _all_keywords() -> List[str]:
+    return [keyword for values in PROFILE_KEYWORD_RULES.values() for _, keywords in values for keyword in keywords]
+
+def generate_transcript(length: int, keywords: List[str], keyword_ratio: float, seed: int = 42) -> str:
+    """
+    生成合成的咨询转录文本
+
+    参数:
+        length: 目标字符数
+        keywords: 会在对话中被提到的关键词
+        keyword_ratio: 含关键词的句子比例
+        seed: 随机种子
+
+    返回:
+        转录文本
+    """
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < length:
+        if keywords and rng.random() < keyword_ratio:
+            sentence = f"我比较在意{rng.choice(keywords)}的问题，"
+        else:
+            sentence = rng.choice(FILLER_SENTENCES)
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+def _time_per_call(func: Callable[[str], Any], text: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(text)
+    return (time.perf_counter() - start) * 1000 / rounds
+
+def run_benchmark(length: int = 50000, rounds: int = 50, seed: int = 42) -> Dict[str, Any]:
+    """
+    运行对比基准测试，并在随机短文本上校验两种实现结果一致
+
+    参数:
+        length: 长转录文本的字符数
+        rounds: 每种实现重复调用次数
+        seed: 随机种子
+
+    返回:
+        基准测试结果
+    """
+    rng = random.Random(seed)
+    keywords = _all_keywords()
+    samples = ["".join(rng.choice(keywords + ["，", "的", "我", "了"]) for _ in range(rng.randint(1, 12)))
+               for _ in range(2000)]
+    consistent = all(extract_user_info(text) == legacy_extract_user_info(text) for text in samples)
+
+    # no_keywords: 全程闲聊；typical: 一次咨询通常只涉及少数几个关键词；keyword_heavy: 全部关键词频繁出现
+    scenarios = (
+        ("no_keywords", [], 0.0),
+        ("typical", ["顺产", "二胎", "母乳", "睡眠", "性价比"], 0.01),
+        ("keyword_heavy", keywords, 0.5)
+    )
+    results = {"length": length, "rounds": rounds, "transcripts": {}}
+    for name, mentioned, ratio in scenarios:
+        text = generate_transcript(length, mentioned, ratio, seed)
+        consistent = consistent and extract_user_info(text) == legacy_extract_user_info(text)
+        legacy_ms = _time_per_call(legacy_extract_user_info, text, rounds)
+        matcher_ms = _time_per_call(extract_user_info, text, rounds)
+        results["transcripts"][name] = {
+            "keyword_ratio": ratio,
+            "legacy_ms_per_call": round(legacy_ms, 3),
+            "matcher_ms_per_call": round(matcher_ms, 3),
+            "speedup": round(legacy_ms / matcher_ms, 2) if matcher_ms else None
+        }
+    results["consistent"] = consistent
+    return results
+
+def run_session_benchmark(turns: int = 2000, seed: int = 42) -> Dict[str, Any]:
+    """
+    模拟一次长咨询：每轮发言后都刷新画像，对比全量重建与增量更新的总耗时
+
+    参数:
+        turns: 对话轮数
+        seed: 随机种子
+
+    返回:
+        基准测试结果
+    """
+    rng = random.Random(seed)
+    keywords = _all_keywords()
+    conversation = []
+    for _ in range(turns):
+        sentence = rng.choice(FILLER_SENTENCES)
+        if rng.random() < 0.05:
+            sentence += f"我比较在意{rng.choice(keywords)}。"
+        conversation.append({"role": rng.choice(["user", "sales"]), "content": sentence})
+
+    start = time.perf_counter()
+    history: List[Dict[str, Any]] = []
+    for entry in conversation:
+        history.append(entry)
+        full_profile = generate_user_profile(history)
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    profile = generate_user_profile([], profile_id="benchmark_session")
+    for entry in conversation:
+        update_user_profile(profile, entry["content"], entry["role"])
+    incremental_seconds = time.perf_counter() - start
+    discard_extraction_state("benchmark_session")
+
+    return {
+        "turns": turns,
+        "full_regeneration_ms": round(full_seconds * 1000, 3),
+        "incremental_ms": round(incremental_seconds * 1000, 3),
+        "speedup": round(full_seconds / incremental_seconds, 2) if incremental_seconds else None,
+        # 增量更新按发现顺序追加关注点，全量重建按规则表顺序，比较时忽略顺序
+        "consistent": all(
+            full_profile["basic_info"][key] == profile["basic_info"][key] for key in ("delivery_type", "child_count")
+        ) and set(full_profile["basic_info"]["concerns"]) == set(profile["basic_info"]["concerns"])
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用户信息提取基准测试")
+    parser.add_argument("--length", type=int, default=50000, help="转录文本字符数")
+    parser.add_argument("--rounds", type=int, default=50, help="重复调用次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--turns", type=int, default=2000, help="会话基准的对话轮数")
+    args = parser.parse_args()
+
+    results = {
+        "extraction": run_benchmark(args.length, args.rounds, args.seed),
+        "session": run_session_benchmark(args.turns, args.seed)
+    }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+用户画像内存基准测试 - 对比嵌套字典与紧凑记录常驻内存的画像占用
+
+画像先序列化为JSON再逐条解析，与从SQLite存储加载时一样，每个画像的键、角色和时间戳都是独立的字符串对象。
+紧凑记录用加载时间换内存：转换时要驻留字符串并解析、校验每轮对话的时间戳，record_load_ms明显高于dict_load_ms。
+
+用法:
+    python -m care_elite.benchmarks.profile_memory --count 100000 --turns 8
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from care_elite.benchmarks.synthetic import generate_user_profiles
+from care_elite.database.records import UserProfile, to_plain
+
+def _serialized_profiles(count: int, turns: int, seed: int) -> List[str]:
+    return [json.dumps(profile, ensure_ascii=False) for profile in generate_user_profiles(count, seed, turns)]
+
+def _measure(documents: List[str], load: Callable[[str], Any]) -> Dict[str, Any]:
+    """测量全部画像常驻内存后的占用，解析过程中的临时对象不计入"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    profiles = [load(document) for document in documents]
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"profiles": profiles, "bytes": current, "seconds": seconds}
+
+def run_benchmark(count: int = 100000, turns: int = 8, seed: int = 42) -> Dict[str, Any]:
+    """
+    运行对比基准测试，并校验紧凑记录序列化后与原画像一致
+
+    参数:
+        count: 画像数量
+        turns: 每个画像的对话轮数
+        seed: 随机种子
+
+    返回:
+        基准测试结果
+    """
+    documents = _serialized_profiles(count, turns, seed)
+
+    dicts = _measure(documents, json.loads)
+    records = _measure(documents, lambda document: UserProfile.coerce(json.loads(document)))
+
+    consistent = all(to_plain(record) == profile for record, profile in zip(records["profiles"], dicts["profiles"]))
+
+    def per_profile(result: Dict[str, Any]) -> float:
+        return round(result["bytes"] / count, 1)
+
+    return {
+        "profiles": count,
+        "turns_per_profile": turns,
+        "dict_bytes_per_profile": per_profile(dicts),
+        "record_bytes_per_profile": per_profile(records),
+        "dict_total_mb": round(dicts["bytes"] / 2 ** 20, 2),
+        "record_total_mb": round(records["bytes"] / 2 ** 20, 2),
+        "memory_ratio": round(records["bytes"] / dicts["bytes"], 3) if dicts["bytes"] else None,
+        "dict_load_ms": round(dicts["seconds"] * 1000, 3),
+        "record_load_ms": round(records["seconds"] * 1000, 3),
+        "consistent": consistent
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用户画像内存基准测试")
+    parser.add_argument("--count", type=int, default=100000, help="画像数量")
+    parser.add_argument("--turns", type=int, default=8, help="每个画像的对话轮数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.count, args.turns, args.seed), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+销售心得检索基准测试 - 对比倒排索引与逐条线性扫描
+
+用法:
+    python -m care_elite.benchmarks.sales_experience --count 20000 --queries 200
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Tuple
+
+from care_elite.benchmarks.synthetic import generate_sales_experiences, generate_sales_queries
+from care_elite.database.sales_experience import SalesExperienceIndex
+
+def linear_score_sales_experience(query: Dict[str, Any], experiences: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """原有的逐条扫描打分逻辑，作为对照基准，返回按分数降序的(位置, 分数)"""
+    scored = []
+    for position, exp in enumerate(experiences):
+        match_score = 0
+        if "tags" in query and "tags" in exp:
+            for tag in query["tags"]:
+                if tag in exp["tags"]:
+                    match_score += 1
+        if "persona" in query and "persona" in exp:
+            persona_query = query["persona"]
+            persona_exp = exp["persona"]
+            if "delivery_type" in persona_query and "delivery_type" in persona_exp:
+                if persona_query["delivery_type"] == persona_exp["delivery_type"]:
+                    match_score += 2
+            if "concerns" in persona_query and "concerns" in persona_exp:
+                for concern in persona_query["concerns"]:
+                    if concern in persona_exp["concerns"]:
+                        match_score += 2
+            if "budget_level" in persona_query and "budget_level" in persona_exp:
+                if persona_query["budget_level"] == persona_exp["budget_level"]:
+                    match_score += 1
+        if match_score > 0:
+            scored.append((position, match_score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
+
+def linear_search_sales_experience(query: Dict[str, Any], experiences: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """原有的逐条扫描实现，作为对照基准"""
+    results = []
+    for position, match_score in linear_score_sales_experience(query, experiences):
+        result = experiences[position].copy()
+        result["match_score"] = match_score
+        results.append(result)
+    return results
+
+def _indexed_rank(index: SalesExperienceIndex, query: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """倒排索引打分并排序，不复制结果"""
+    scores = index.score(query)
+    return [(position, scores[position]) for position in sorted(sorted(scores), key=scores.__getitem__, reverse=True)]
+
+def _timed(func, items) -> Tuple[float, List[Any]]:
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return time.perf_counter() - start, results
+
+def run_benchmark(count: int = 20000, queries: int = 200, seed: int = 42) -> Dict[str, Any]:
+    """
+    运行对比基准测试，并校验两种实现的结果一致
+
+    参数:
+        count: 心得条数
+        queries: 查询条数
+        seed: 随机种子
+
+    返回:
+        基准测试结果
+    """
+    experiences = generate_sales_experiences(count, seed)
+    query_list = generate_sales_queries(queries, seed + 1)
+
+    start = time.perf_counter()
+    index = SalesExperienceIndex(experiences)
+    build_seconds = time.perf_counter() - start
+
+    linear_rank_seconds, linear_ranks = _timed(lambda q: linear_score_sales_experience(q, experiences), query_list)
+    indexed_rank_seconds, indexed_ranks = _timed(lambda q: _indexed_rank(index, q), query_list)
+    linear_seconds, linear_results = _timed(lambda q: linear_search_sales_experience(q, experiences), query_list)
+    indexed_seconds, indexed_results = _timed(index.search, query_list)
+
+    consistent = linear_ranks == indexed_ranks and all(
+        [(r["id"], r["match_score"]) for r in a] == [(r["id"], r["match_score"]) for r in b]
+        for a, b in zip(linear_results, indexed_results)
+    )
+
+    def per_query_ms(seconds: float) -> float:
+        return round(seconds * 1000 / queries, 3)
+
+    return {
+        "experiences": count,
+        "queries": queries,
+        "avg_matches_per_query": round(sum(len(r) for r in indexed_ranks) / queries, 1),
+        "index_build_ms": round(build_seconds * 1000, 3),
+        "ranking": {
+            "linear_ms_per_query": per_query_ms(linear_rank_seconds),
+            "indexed_ms_per_query": per_query_ms(indexed_rank_seconds),
+            "speedup": round(linear_rank_seconds / indexed_rank_seconds, 2) if indexed_rank_seconds else None
+        },
+        "end_to_end": {
+            "linear_ms_per_query": per_query_ms(linear_seconds),
+            "indexed_ms_per_query": per_query_ms(indexed_seconds),
+            "speedup": round(linear_seconds / indexed_seconds, 2) if indexed_seconds else None
+        },
+        "consistent": consistent
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="销售心得检索基准测试")
+    parser.add_argument("--count", type=int, default=20000, help="心得条数")
+    parser.add_argument("--queries", type=int, default=200, help="查询条数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.count, args.queries, args.seed), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+MCP工具基准测试套件 - 在不同规模的合成数据集上测量各工具及底层检索的延迟、吞吐量和内存峰值
+
+用法:
+    python -m care_elite.benchmarks.suite --scales 1000,100000,1000000 --output bench.json
+    python -m care_elite.benchmarks.suite --scales 1000 --compare bench.json
+"""
+
+import argparse
+import asyncio
+import base64
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+from care_elite.benchmarks.synthetic import (UTTERANCES, generate_sales_experiences, generate_sales_queries,
+                                             generate_success_cases, generate_transcript, generate_user_profiles)
+from care_elite.database.case_database import replace_success_cases, search_similar_cases
+from care_elite.database.profile_store import MemoryProfileBackend
+from care_elite.database.sales_experience import replace_sales_experiences, search_sales_experience
+from care_elite.database.user_profile import save_user_profile, set_profile_backend
+from care_elite.tools.case_presenter import present_case
+from care_elite.tools.information_collector import collect_information
+from care_elite.tools.service_recommender import recommend_service, recommend_service_batch
+from care_elite.utils.executor import shutdown_executors
+from care_elite.utils.result_cache import RECOMMENDATION_CACHE
+from care_elite.utils.profile_generator import extract_user_info
+
+DEFAULT_SCALES = [1000, 100000, 1000000]
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """
+    最近秩法计算百分位数
+
+    参数:
+        sorted_samples: 升序排列的样本
+        q: 百分位(0-100)
+
+    返回:
+        百分位数
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, Any]:
+    """
+    汇总单个操作的延迟样本
+
+    参数:
+        samples: 每次调用耗时(秒)
+        elapsed: 全部调用的总耗时(秒)
+
+    返回:
+        延迟分位数(毫秒)与吞吐量(次/秒)
+    """
+    ordered = sorted(samples)
+
+    def ms(value: float) -> float:
+        return round(value * 1000, 4)
+
+    return {
+        "calls": len(samples),
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "throughput_ops": round(len(samples) / elapsed, 2) if elapsed else None
+    }
+
+def _max_rss_kb() -> Optional[int]:
+    """进程的峰值常驻内存(KB)，macOS上ru_maxrss单位为字节"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def load_corpus(profiles: int, cases: int, experiences: int, seed: int) -> Dict[str, Any]:
+    """
+    生成合成数据集并装载到各数据库模块
+
+    参数:
+        profiles: 用户画像数量
+        cases: 成功案例数量
+        experiences: 销售心得数量
+        seed: 随机种子
+
+    返回:
+        装载耗时等信息，以及画像ID列表(profile_ids)
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    set_profile_backend(MemoryProfileBackend())
+    profile_ids = [save_user_profile(profile) for profile in generate_user_profiles(profiles, seed)]
+    timings["profiles_load_s"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    replace_success_cases(generate_success_cases(cases, seed + 1))
+    timings["cases_load_s"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    replace_sales_experiences(generate_sales_experiences(experiences, seed + 2))
+    timings["experiences_load_s"] = round(time.perf_counter() - start, 3)
+
+    return {"profile_ids": profile_ids, "timings": timings}
+
+def build_workloads(profile_ids: List[str], seed: int) -> Dict[str, Callable[[], Any]]:
+    """
+    为每个被测操作构造调用函数，每次调用使用随机抽取的输入
+
+    参数:
+        profile_ids: 已装载的用户画像ID
+        seed: 随机种子
+
+    返回:
+        操作名 -> 无参调用函数（异步操作返回协程）
+    """
+    rng = random.Random(seed)
+    queries = generate_sales_queries(256, seed)
+    transcripts = [generate_transcript(2000, seed + i) for i in range(16)]
+    audio = base64.b64encode(bytes(rng.getrandbits(8) for _ in range(3 * 1024))).decode("ascii")
+
+    def pick_profile() -> str:
+        return rng.choice(profile_ids)
+
+    return {
+        "collect_information": lambda: collect_information(audio, rng.choice(["user", "sales"])),
+        "recommend_service": lambda: recommend_service(pick_profile()),
+        "recommend_service_query": lambda: recommend_service(pick_profile(), query=rng.choice(UTTERANCES)),
+        "recommend_service_batch": lambda: recommend_service_batch(rng.sample(profile_ids, min(32, len(profile_ids)))),
+        "present_case": lambda: present_case(pick_profile()),
+        "search_similar_cases": lambda: search_similar_cases(pick_profile()),
+        "search_sales_experience": lambda: search_sales_experience(rng.choice(queries)),
+        "extract_user_info": lambda: extract_user_info(rng.choice(transcripts))
+    }
+
+async def _call(func: Callable[[], Any]) -> Any:
+    result = func()
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+async def measure_operation(func: Callable[[], Any], iterations: int, warmup: int,
+                            max_seconds: float) -> Dict[str, Any]:
+    """
+    测量单个操作的延迟分布与内存峰值
+
+    参数:
+        func: 无参调用函数
+        iterations: 最多调用次数
+        warmup: 预热次数，不计入统计
+        max_seconds: 时间预算，至少完成5次调用后超出预算即停止
+
+    返回:
+        测量结果
+    """
+    for _ in range(warmup):
+        await _call(func)
+
+    samples: List[float] = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        await _call(func)
+        samples.append(time.perf_counter() - call_start)
+        if len(samples) >= 5 and time.perf_counter() - start > max_seconds:
+            break
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc会显著拖慢执行，内存峰值单独测量
+    gc.collect()
+    tracemalloc.start()
+    for _ in range(3):
+        await _call(func)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(samples, elapsed)
+    result["peak_alloc_bytes"] = peak
+    return result
+
+def run_scale(profiles: int, cases: int, experiences: int, operations: List[str], iterations: int,
+              warmup: int, max_seconds: float, seed: int) -> Dict[str, Any]:
+    """
+    在一个规模的数据集上运行全部操作
+
+    返回:
+        该规模的测量结果
+    """
+    corpus = load_corpus(profiles, cases, experiences, seed)
+    workloads = build_workloads(corpus["profile_ids"], seed)
+
+    async def run_all() -> Dict[str, Any]:
+        results = {}
+        for name in operations:
+            # 每个操作从空的结果缓存开始，命中情况计入result_cache
+            RECOMMENDATION_CACHE.clear()
+            results[name] = await measure_operation(workloads[name], iterations, warmup, max_seconds)
+        return results
+
+    try:
+        operation_results = asyncio.run(run_all())
+    finally:
+        shutdown_executors()
+
+    return {
+        "profiles": profiles,
+        "cases": cases,
+        "experiences": experiences,
+        "corpus_load": corpus["timings"],
+        "max_rss_kb": _max_rss_kb(),
+        "result_cache": RECOMMENDATION_CACHE.stats(),
+        "operations": operation_results
+    }
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    对比两次运行中相同规模、相同操作的p50/p99延迟
+
+    参数:
+        baseline: 之前的运行结果
+        current: 本次运行结果
+
+    返回:
+        对比条目列表，ratio大于1表示变慢
+    """
+    previous = {
+        (run["profiles"], run["cases"], run["experiences"]): run for run in baseline.get("runs", [])
+    }
+    rows = []
+    for run in current.get("runs", []):
+        old_run = previous.get((run["profiles"], run["cases"], run["experiences"]))
+        if old_run is None:
+            continue
+        for name, stats in run["operations"].items():
+            old_stats = old_run["operations"].get(name)
+            if not old_stats:
+                continue
+            row = {"scale": [run["profiles"], run["cases"], run["experiences"]], "operation": name}
+            for key in ("p50_ms", "p99_ms"):
+                row[f"{key}_before"] = old_stats[key]
+                row[f"{key}_after"] = stats[key]
+                row[f"{key}_ratio"] = round(stats[key] / old_stats[key], 3) if old_stats[key] else None
+            rows.append(row)
+    return rows
+
+def run_suite(scales: List[int], operations: Optional[List[str]] = None, iterations: int = 200,
+              warmup: int = 3, max_seconds: float = 30.0, seed: int = 42,
+              profiles: Optional[int] = None, cases: Optional[int] = None,
+              experiences: Optional[int] = None) -> Dict[str, Any]:
+    """
+    运行基准测试套件
+
+    参数:
+        scales: 数据规模列表，每个规模同时作为画像、案例、心得的数量
+        operations: 要测量的操作，默认全部
+        iterations: 每个操作最多调用次数
+        warmup: 预热次数
+        max_seconds: 每个操作的时间预算(秒)
+        seed: 随机种子
+        profiles/cases/experiences: 固定某类数据的数量，不随规模变化
+
+    返回:
+        可序列化为JSON的结果
+    """
+    operations = operations or list(build_workloads(["placeholder"], seed))
+    runs = []
+    for scale in scales:
+        runs.append(run_scale(
+            profiles if profiles is not None else scale,
+            cases if cases is not None else scale,
+            experiences if experiences is not None else scale,
+            operations, iterations, warmup, max_seconds, seed
+        ))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "iterations": iterations,
+            "warmup": warmup
+        },
+        "runs": runs
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MCP工具基准测试套件")
+    parser.add_argument("--scales", default=",".join(str(scale) for scale in DEFAULT_SCALES),
+                        help="逗号分隔的数据规模")
+    parser.add_argument("--profiles", type=int, help="固定用户画像数量")
+    parser.add_argument("--cases", type=int, help="固定成功案例数量")
+    parser.add_argument("--experiences", type=int, help="固定销售心得数量")
+    parser.add_argument("--operations", help="逗号分隔的操作名，默认全部")
+    parser.add_argument("--iterations", type=int, default=200, help="每个操作最多调用次数")
+    parser.add_argument("--warmup", type=int, default=3, help="预热次数")
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="每个操作的时间预算(秒)")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", help="结果JSON文件路径，默认输出到标准输出")
+    parser.add_argument("--compare", help="之前的结果JSON文件，输出延迟对比")
+    args = parser.parse_args()
+
+    results = run_suite(
+        [int(scale) for scale in args.scales.split(",") if scale],
+        args.operations.split(",") if args.operations else None,
+        args.iterations, args.warmup, args.max_seconds, args.seed,
+        args.profiles, args.cases, args.experiences
+    )
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            results["comparison"] = compare_results(json.load(f), results)
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
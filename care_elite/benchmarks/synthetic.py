@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+合成数据生成 - 按接近真实业务的分布生成用户画像、成功案例和销售心得
+"""
+
+import random
+from typing import Any, Dict, List, Sequence
+
+# 取值及其权重：顺产占多数，关注点呈长尾分布
+DELIVERY_TYPES = ["顺产", "剖腹产"]
+DELIVERY_TYPE_WEIGHTS = [0.65, 0.35]
+CONCERNS = ["体重恢复", "母乳喂养", "睡眠质量", "伤口愈合", "肠胃恢复", "情绪调节", "新生儿护理", "盆底修复"]
+CONCERN_WEIGHTS = [0.24, 0.22, 0.16, 0.12, 0.09, 0.07, 0.06, 0.04]
+BUDGET_LEVELS = ["经济型", "中端", "中高端", "高端"]
+BUDGET_LEVEL_WEIGHTS = [0.2, 0.35, 0.3, 0.15]
+CHILD_COUNTS = [1, 2, 3]
+CHILD_COUNT_WEIGHTS = [0.6, 0.35, 0.05]
+EXTRA_TAGS = ["产后恢复", "催乳", "月子餐", "中医调理", "二胎", "高龄产妇", "早产儿", "黄疸"]
+SCENARIOS = ["初次咨询", "价格顾虑", "哺乳困难", "担心宝宝吃不饱", "参观环境", "签约犹豫"]
+
+UTTERANCES = [
+    "我是顺产的，最近睡眠不好。",
+    "这是第二胎了，上一胎是剖腹产，伤口恢复得比较慢。",
+    "主要想恢复身材，体重还差很多。",
+    "母乳不太够，想找催乳师看看。",
+    "预算有限，想看看性价比高一点的套餐。",
+    "想要高端一点的房间，环境好一些。",
+    "嗯，好的，我了解了。",
+    "房间能看看吗？",
+    "餐食是怎么安排的？"
+]
+
+# 较长的文本字段在所有记录间共享同一个字符串对象，降低大规模数据集的内存占用
+_EXPERIENCE_TEXT = "针对该类客户，应着重强调我们的专业团队和往期客户的恢复数据，先建立信任，再介绍套餐细节。"
+_SCRIPT_TEXT = "了解到您的情况，我们中心会安排专属的护理方案，往期同类情况的妈妈平均28天内都有明显改善。"
+_TESTIMONIAL_TEXT = "在月子中心的这段时间恢复得很好，专业的团队让我能够专注于恢复和照顾宝宝。"
+
+def weighted_sample(rng: random.Random, population: Sequence[Any], weights: Sequence[float], k: int) -> List[Any]:
+    """
+    按权重不放回抽样
+
+    参数:
+        rng: 随机数生成器
+        population: 候选取值
+        weights: 对应权重
+        k: 抽样个数
+
+    返回:
+        抽中的取值列表
+    """
+    candidates = list(population)
+    candidate_weights = list(weights)
+    chosen = []
+    for _ in range(min(k, len(candidates))):
+        index = rng.choices(range(len(candidates)), candidate_weights)[0]
+        chosen.append(candidates.pop(index))
+        candidate_weights.pop(index)
+    return chosen
+
+def generate_basic_info(rng: random.Random) -> Dict[str, Any]:
+    """生成一份用户画像的basic_info"""
+    return {
+        "pregnancy_status": "产后",
+        "delivery_type": rng.choices(DELIVERY_TYPES, DELIVERY_TYPE_WEIGHTS)[0],
+        "child_count": rng.choices(CHILD_COUNTS, CHILD_COUNT_WEIGHTS)[0],
+        "concerns": weighted_sample(rng, CONCERNS, CONCERN_WEIGHTS, rng.randint(1, 3))
+    }
+
+def generate_user_profiles(count: int, seed: int = 42, history_turns: int = 4) -> List[Dict[str, Any]]:
+    """
+    生成合成的用户画像
+
+    参数:
+        count: 画像数量
+        seed: 随机种子
+        history_turns: 每个画像的对话轮数
+
+    返回:
+        用户画像列表
+    """
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(count):
+        profiles.append({
+            "profile_id": f"user_bench_{i:07d}",
+            "basic_info": generate_basic_info(rng),
+            "preferences": {
+                "budget_level": rng.choices(BUDGET_LEVELS, BUDGET_LEVEL_WEIGHTS)[0],
+                "stay_duration": "28天",
+                "dietary_restrictions": []
+            },
+            "conversation_history": [
+                {
+                    "role": "user" if turn % 2 else "sales",
+                    "content": rng.choice(UTTERANCES),
+                    "timestamp": "2024-01-01T10:00:00"
+                }
+                for turn in range(history_turns)
+            ]
+        })
+    return profiles
+
+def generate_success_cases(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    生成合成的成功案例数据
+
+    参数:
+        count: 案例条数
+        seed: 随机种子
+
+    返回:
+        案例列表
+    """
+    rng = random.Random(seed)
+    cases = []
+    for i in range(count):
+        cases.append({
+            "case_id": f"case{i:07d}",
+            "title": f"成功案例{i}",
+            "customer_info": {
+                "age": rng.randint(22, 42),
+                "delivery_type": rng.choices(DELIVERY_TYPES, DELIVERY_TYPE_WEIGHTS)[0],
+                "child_count": rng.choices(CHILD_COUNTS, CHILD_COUNT_WEIGHTS)[0],
+                "initial_concerns": weighted_sample(rng, CONCERNS, CONCERN_WEIGHTS, rng.randint(1, 3))
+            },
+            "stay_info": {"package": "高级产后护理套餐", "duration": "28天"},
+            "testimonial": _TESTIMONIAL_TEXT,
+            "images": []
+        })
+    return cases
+
+def generate_sales_experiences(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    生成合成的销售心得数据
+
+    参数:
+        count: 心得条数
+        seed: 随机种子
+
+    返回:
+        销售心得列表
+    """
+    rng = random.Random(seed)
+    experiences = []
+    for i in range(count):
+        concerns = weighted_sample(rng, CONCERNS, CONCERN_WEIGHTS, rng.randint(1, 3))
+        persona: Dict[str, Any] = {"concerns": concerns}
+        if rng.random() < 0.7:
+            persona["delivery_type"] = rng.choices(DELIVERY_TYPES, DELIVERY_TYPE_WEIGHTS)[0]
+        if rng.random() < 0.5:
+            persona["budget_level"] = rng.choices(BUDGET_LEVELS, BUDGET_LEVEL_WEIGHTS)[0]
+        tags = concerns + rng.sample(EXTRA_TAGS, rng.randint(0, 3))
+        if "delivery_type" in persona:
+            tags.append(persona["delivery_type"])
+        experiences.append({
+            "id": f"exp{i:07d}",
+            "title": f"销售心得{i}",
+            "tags": tags,
+            "persona": persona,
+            "experience": _EXPERIENCE_TEXT,
+            "scripts": [
+                {"scenario": scenario, "content": _SCRIPT_TEXT}
+                for scenario in rng.sample(SCENARIOS, rng.randint(1, 2))
+            ]
+        })
+    return experiences
+
+def generate_sales_queries(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    生成合成的销售心得检索条件
+
+    参数:
+        count: 查询条数
+        seed: 随机种子
+
+    返回:
+        查询条件列表
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        basic_info = generate_basic_info(rng)
+        queries.append({
+            "tags": basic_info["concerns"] + rng.sample(EXTRA_TAGS, 1),
+            "persona": {
+                "delivery_type": basic_info["delivery_type"],
+                "concerns": basic_info["concerns"],
+                "budget_level": rng.choices(BUDGET_LEVELS, BUDGET_LEVEL_WEIGHTS)[0]
+            }
+        })
+    return queries
+
+def generate_transcript(length: int, seed: int = 42) -> str:
+    """
+    生成指定长度的合成咨询转录文本
+
+    参数:
+        length: 目标字符数
+        seed: 随机种子
+
+    返回:
+        转录文本
+    """
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < length:
+        utterance = rng.choice(UTTERANCES)
+        parts.append(utterance)
+        size += len(utterance)
+    return "".join(parts)[:length]
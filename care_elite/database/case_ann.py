@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+案例近似最近邻索引 - IVF倒排文件：k-means将案例特征向量聚成若干簇，查询时只对最相关的簇精确打分
+
+索引以.npy文件保存，按内存映射加载，多个工作进程共享操作系统页缓存中的同一份数据。
+每次保存写入新的版本目录，再原子地替换CURRENT文件指向该目录，读取方不会看到写了一半的索引。
+进程只删除自己保存的较旧版本，并保留最近的ANN_KEEP_GENERATIONS个，刚读到CURRENT、尚未打开文件的读取方
+和其它进程写入的版本都不受影响。
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from care_elite.database.pagination import Cursor, top_k_array_after
+from care_elite.utils.id_generator import new_id
+
+logger = logging.getLogger(__name__)
+
+# 索引保存目录，为空时只在内存中构建
+ANN_INDEX_PATH = os.environ.get("CARE_ELITE_CASE_ANN_INDEX", "")
+# 案例数达到该值时改用近似检索，之前精确打分
+ANN_MIN_CASES = int(os.environ.get("CARE_ELITE_CASE_ANN_MIN_CASES", "100000"))
+# 每次查询至少探查的簇数，越大召回率越高、延迟越大
+ANN_NPROBE = int(os.environ.get("CARE_ELITE_CASE_ANN_NPROBE", "8"))
+
+# 每个进程保留的自己保存的最近版本数，至少为2，保存新版本时上一版本仍可加载
+ANN_KEEP_GENERATIONS = max(2, int(os.environ.get("CARE_ELITE_CASE_ANN_KEEP_GENERATIONS", "2")))
+
+KMEANS_ITERATIONS = 10
+# k-means训练最多使用的样本数
+KMEANS_SAMPLE = 65536
+
+_CURRENT_FILE = "CURRENT"
+_META_FILE = "meta.json"
+_ARRAYS = ("centroids", "offsets", "ids", "vectors")
+
+# 索引目录(绝对路径) -> 本进程在其中保存的版本，按保存顺序排列
+_saved_generations: Dict[str, List[str]] = {}
+_saved_generations_lock = threading.Lock()
+
+def default_nlist(size: int) -> int:
+    """按案例数确定簇数，约为4 * sqrt(n)"""
+    return max(1, min(size, int(4 * math.sqrt(size))))
+
+def matrix_fingerprint(vectors: np.ndarray) -> str:
+    """特征矩阵内容的哈希，用于判断保存的索引是否对应当前案例库"""
+    return hashlib.sha256(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()).hexdigest()
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """
+    按欧氏距离为每个向量分配最近的簇
+
+    参数:
+        vectors: 向量矩阵
+        centroids: 簇中心矩阵
+        chunk: 分块大小，限制中间结果的内存占用
+
+    返回:
+        与vectors逐行对应的簇编号
+    """
+    # ||x - c||^2 = ||x||^2 - 2x·c + ||c||^2，||x||^2对argmin没有影响
+    centroid_norms = (centroids * centroids).sum(axis=1)
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        assignment[start:start + chunk] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return assignment
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS,
+                    seed: int = 0) -> np.ndarray:
+    """
+    k-means训练簇中心
+
+    参数:
+        vectors: 向量矩阵
+        nlist: 簇数
+        iterations: 迭代次数
+        seed: 随机种子
+
+    返回:
+        簇中心矩阵；不同的向量不多于nlist种时，每种向量单独成簇
+    """
+    rng = np.random.default_rng(seed)
+    sample = np.asarray(vectors, dtype=np.float32)
+    if len(sample) > KMEANS_SAMPLE:
+        sample = sample[np.sort(rng.choice(len(sample), KMEANS_SAMPLE, replace=False))]
+    distinct = np.unique(sample, axis=0)
+    if len(distinct) <= nlist:
+        # one-hot特征的取值组合有限，每种组合一簇时簇内分数相同，按簇排序即为精确排名
+        return distinct
+    centroids = distinct[np.sort(rng.choice(len(distinct), nlist, replace=False))].copy()
+    for _ in range(iterations):
+        assignment = nearest_centroids(sample, centroids)
+        counts = np.bincount(assignment, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        # 空簇保留原中心
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centroids
+
+
+def _remove_old_generations(path: str, generation: str) -> None:
+    """记录本进程刚保存的版本，删除本进程保存的、最近ANN_KEEP_GENERATIONS个之外的旧版本"""
+    with _saved_generations_lock:
+        saved = _saved_generations.setdefault(os.path.abspath(path), [])
+        saved.append(generation)
+        stale = saved[:-ANN_KEEP_GENERATIONS]
+        del saved[:-ANN_KEEP_GENERATIONS]
+    # 已加载旧版本的进程仍持有内存映射，删除目录不影响它们
+    for entry in stale:
+        shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+class _IndexState(NamedTuple):
+    """一组配套的簇数据，保存时整体替换，查询只读取一次，不会混用新旧两组数组"""
+    # 各簇在ids/vectors中的起止位置，长度为簇数 + 1
+    offsets: np.ndarray
+    # 按簇分组排列的案例下标
+    ids: np.ndarray
+    # 与ids逐行对应的特征向量
+    vectors: np.ndarray
+    # 簇编号 -> [(案例下标, 特征向量)]，增量插入的行，追加是原子操作，查询时取快照
+    pending: List[List[Tuple[int, np.ndarray]]]
+
+
+class CaseIVFIndex:
+    """案例特征向量的IVF索引，簇内向量连续存放，增量插入的行在保存前暂存于内存"""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, ids: np.ndarray,
+                 vectors: np.ndarray, signature: Any, fingerprint: str):
+        """
+        参数:
+            centroids: 簇中心矩阵 (簇数, 特征维度)
+            offsets: 各簇在ids/vectors中的起止位置，长度为簇数 + 1
+            ids: 按簇分组排列的案例下标
+            vectors: 与ids逐行对应的特征向量
+            signature: 特征矩阵的列布局，见CaseFeatureMatrix.feature_signature
+            fingerprint: 已保存部分对应的特征矩阵哈希
+        """
+        self.centroids = centroids
+        self.signature = signature
+        self.fingerprint = fingerprint
+        self._state = _IndexState(offsets, ids, vectors, [[] for _ in range(len(centroids))])
+        self.size = len(ids)
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._state.offsets
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._state.ids
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._state.vectors
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, signature: Any, nlist: Optional[int] = None,
+              seed: int = 0) -> "CaseIVFIndex":
+        """
+        训练簇中心并将全部向量分配到簇
+
+        参数:
+            vectors: 特征矩阵，行号即案例下标
+            signature: 特征矩阵的列布局
+            nlist: 簇数，默认按default_nlist计算
+            seed: 随机种子
+
+        返回:
+            IVF索引
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        centroids = train_centroids(vectors, nlist or default_nlist(len(vectors)), seed=seed)
+        assignment = nearest_centroids(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignment, minlength=len(centroids)))
+        return cls(centroids, offsets, order.astype(np.int64), vectors[order], signature,
+                   matrix_fingerprint(vectors))
+
+    @property
+    def pending_count(self) -> int:
+        """增量插入、尚未保存的行数"""
+        return sum(len(entries) for entries in self._state.pending)
+
+    def add(self, position: int, vector: np.ndarray) -> None:
+        """
+        增量插入一个案例，分配到最近的簇；与save之间需由调用方互斥，查询可以并发
+
+        参数:
+            position: 案例下标
+            vector: 特征向量
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        cluster = int(nearest_centroids(vector[None, :], self.centroids)[0])
+        self._state.pending[cluster].append((position, vector))
+        self.size += 1
+
+    @staticmethod
+    def _cluster(state: _IndexState, cluster: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回一个簇的(案例下标, 特征向量)，包含增量插入的行"""
+        start, end = int(state.offsets[cluster]), int(state.offsets[cluster + 1])
+        ids = state.ids[start:end]
+        vectors = state.vectors[start:end]
+        pending = list(state.pending[cluster])
+        if pending:
+            ids = np.concatenate([ids, np.array([position for position, _ in pending], dtype=np.int64)])
+            vectors = np.concatenate([vectors, np.stack([vector for _, vector in pending])])
+        return ids, vectors
+
+    def rank(self, vector: np.ndarray, top_k: Optional[int] = None, cursor: Optional[Cursor] = None,
+             nprobe: int = ANN_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        近似检索，接口与CaseFeatureMatrix.rank一致
+
+        按簇中心得分从高到低探查，至少探查nprobe个簇；候选仍不足top_k时继续探查，直到凑满或没有得分为正的簇。
+
+        参数:
+            vector: 查询向量，各分量不能为负；含负数时应使用精确检索
+            top_k: 返回前k个，为None时探查全部得分为正的簇
+            cursor: 上一页最后一条的(分数, 下标)
+            nprobe: 至少探查的簇数
+
+        返回:
+            (案例下标数组, 分数数组)，按分数降序排列；候选只来自已探查的簇，
+            同分的案例返回哪几条、以什么顺序返回都不确定，不保证与精确检索一致
+        """
+        # 簇中心得分即簇内平均得分；特征和权重非负，平均得分为0的簇中没有得分为正的案例
+        centroid_scores = self.centroids @ vector
+        probe_order = np.argsort(-centroid_scores, kind="stable")
+        # 只读取一次，与并发的save互不影响
+        state = self._state
+
+        id_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        found = 0
+        for probed, cluster in enumerate(probe_order.tolist()):
+            if centroid_scores[cluster] <= 0:
+                break
+            if probed >= nprobe and top_k is not None and found >= top_k:
+                break
+            ids, vectors = self._cluster(state, cluster)
+            scores = vectors @ vector
+            keep = scores > 0
+            if cursor is not None:
+                cursor_score, cursor_position = cursor
+                keep &= (scores < cursor_score) | ((scores == cursor_score) & (ids > cursor_position))
+            id_parts.append(ids[keep])
+            score_parts.append(scores[keep])
+            found += int(keep.sum())
+
+        if not id_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return top_k_array_after(np.concatenate(id_parts), np.concatenate(score_parts), top_k)
+
+    def _merged(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """将增量插入的行并入各簇，返回(offsets, ids, vectors)"""
+        state = self._state
+        id_parts: List[np.ndarray] = []
+        vector_parts: List[np.ndarray] = []
+        counts = np.zeros(len(self.centroids), dtype=np.int64)
+        for cluster in range(len(self.centroids)):
+            ids, vectors = self._cluster(state, cluster)
+            id_parts.append(ids)
+            vector_parts.append(vectors)
+            counts[cluster] = len(ids)
+        offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+        width = self.centroids.shape[1]
+        ids = np.concatenate(id_parts) if id_parts else np.zeros(0, dtype=np.int64)
+        vectors = np.concatenate(vector_parts) if vector_parts else np.zeros((0, width), dtype=np.float32)
+        return offsets, ids, vectors
+
+    def save(self, path: str, fingerprint: Optional[str] = None) -> bool:
+        """
+        保存索引，增量插入的行并入后写入新的版本目录；与add之间需由调用方互斥，查询可以并发
+
+        参数:
+            path: 索引目录
+            fingerprint: 当前特征矩阵的哈希，存在增量插入时应传入
+
+        返回:
+            是否保存成功
+        """
+        offsets, ids, vectors = self._merged()
+        fingerprint = fingerprint or self.fingerprint
+        generation = new_id()
+        directory = os.path.join(path, generation)
+        try:
+            os.makedirs(directory)
+            for name, array in zip(_ARRAYS, (self.centroids, offsets, ids, vectors)):
+                np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(directory, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"signature": self.signature, "fingerprint": fingerprint, "size": len(ids)},
+                          f, ensure_ascii=False)
+            current = os.path.join(path, _CURRENT_FILE)
+            with open(f"{current}.{generation}", "w", encoding="utf-8") as f:
+                f.write(generation)
+            os.replace(f"{current}.{generation}", current)
+        except OSError as e:
+            logger.error(f"保存案例ANN索引失败: {str(e)}")
+            shutil.rmtree(directory, ignore_errors=True)
+            return False
+
+        # 一次赋值切换整组数组，并发的查询要么看到旧的一组，要么看到新的一组
+        self._state = _IndexState(offsets, ids, vectors, [[] for _ in range(len(self.centroids))])
+        self.fingerprint = fingerprint
+        _remove_old_generations(path, generation)
+        logger.info(f"保存案例ANN索引: {directory}, {len(ids)} 条")
+        return True
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CaseIVFIndex"]:
+        """
+        以内存映射方式加载索引
+
+        参数:
+            path: 索引目录
+
+        返回:
+            IVF索引，目录不存在或内容无效时返回None
+        """
+        if not os.path.exists(os.path.join(path, _CURRENT_FILE)):
+            return None
+        try:
+            with open(os.path.join(path, _CURRENT_FILE), encoding="utf-8") as f:
+                directory = os.path.join(path, f.read().strip())
+            with open(os.path.join(directory, _META_FILE), encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"加载案例ANN索引失败: {str(e)}")
+            return None
+        centroids, offsets, ids, vectors = arrays
+        # 簇中心和起止位置很小，读入内存；案例下标和特征向量保持内存映射
+        return cls(np.array(centroids), np.array(offsets), ids, vectors, meta.get("signature"), meta.get("fingerprint"))
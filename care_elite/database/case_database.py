@@ -8,8 +8,14 @@
 import logging
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from care_elite.database.case_ann import ANN_INDEX_PATH, ANN_MIN_CASES, CaseIVFIndex, matrix_fingerprint
+from care_elite.database.pagination import Cursor, decode_cursor, top_k_array_after
+from care_elite.database.scored_record import ScoredRecord
 from care_elite.database.user_profile import get_user_profile
 
 logger = logging.getLogger(__name__)
@@ -107,68 +113,409 @@ SUCCESS_CASES = [
     }
 ]
 
-def search_similar_cases(user_profile_id: str, case_type: str = "similar") -> List[Dict[str, Any]]:
+# 案例匹配权重：分娩方式一致、每个共同关注点、胎次一致
+CASE_MATCH_WEIGHTS = {
+    "delivery_type": 3,
+    "concern": 2,
+    "child_count": 1
+}
+
+class CaseFeatureMatrix:
+    """案例特征矩阵 - 分娩方式one-hot、关注点multi-hot、胎次one-hot编码"""
+
+    def __init__(self, cases: List[Dict[str, Any]]):
+        """
+        将案例列表编码为特征矩阵
+
+        参数:
+            cases: 案例列表，矩阵的行号即列表下标
+        """
+        self.cases = cases
+        self.delivery_type_columns: Dict[Any, int] = {}
+        self.concern_columns: Dict[Any, int] = {}
+        self.child_count_columns: Dict[Any, int] = {}
+
+        # 先收集取值，按分娩方式、关注点、胎次的顺序分配列
+        for case in cases:
+            case_info = case.get("customer_info", {})
+            self.delivery_type_columns.setdefault(case_info.get("delivery_type"), None)
+            for concern in case_info.get("initial_concerns", []):
+                self.concern_columns.setdefault(concern, None)
+            self.child_count_columns.setdefault(case_info.get("child_count"), None)
+
+        column = 0
+        for columns in (self.delivery_type_columns, self.concern_columns, self.child_count_columns):
+            for key in columns:
+                columns[key] = column
+                column += 1
+        self.width = column
+
+        # 收集所有非零元素的坐标后一次性写入，同时建立case_id -> 行号的索引
+        rows: List[int] = []
+        columns_hit: List[int] = []
+        self.case_positions: Dict[Any, int] = {}
+        for row, case in enumerate(cases):
+            case_columns = self._encode(case)
+            rows.extend([row] * len(case_columns))
+            columns_hit.extend(case_columns)
+            # case_id重复时与逐条查找一致，取第一条
+            self.case_positions.setdefault(case.get("case_id"), row)
+
+        self._size = len(cases)
+        self._buffer = np.zeros((max(self._size, 1), self.width), dtype=np.float32)
+        self._buffer[rows, columns_hit] = 1.0
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """当前有效的特征矩阵视图"""
+        return self._buffer[:self._size]
+
+    def feature_signature(self) -> List[List[Any]]:
+        """按列顺序排列的各特征取值，列布局相同的矩阵签名相同"""
+        return [list(self.delivery_type_columns), list(self.concern_columns), list(self.child_count_columns)]
+
+    def _encode(self, case: Dict[str, Any]) -> Optional[List[int]]:
+        """返回案例命中的列，存在未编码的取值时返回None"""
+        case_info = case.get("customer_info", {})
+        try:
+            columns = [
+                self.delivery_type_columns[case_info.get("delivery_type")],
+                self.child_count_columns[case_info.get("child_count")]
+            ]
+            columns.extend(self.concern_columns[concern] for concern in case_info.get("initial_concerns", []))
+        except (KeyError, TypeError):
+            return None
+        return columns
+
+    def _append_row(self, case: Dict[str, Any]) -> bool:
+        columns = self._encode(case)
+        if columns is None:
+            return False
+        if self._size == self._buffer.shape[0]:
+            # 容量翻倍，摊还追加成本
+            grown = np.zeros((self._buffer.shape[0] * 2, self.width), dtype=np.float32)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size, columns] = 1.0
+        self._size += 1
+        return True
+
+    def add(self, case: Dict[str, Any]) -> bool:
+        """
+        追加一条案例，取值均已编码时直接追加一行
+
+        参数:
+            case: 案例数据
+
+        返回:
+            是否追加成功；出现新的分娩方式/关注点/胎次时返回False，需重建矩阵
+        """
+        if not self._append_row(case):
+            return False
+        self.case_positions.setdefault(case.get("case_id"), len(self.cases))
+        self.cases.append(case)
+        return True
+
+    def profile_vector(self, delivery_type: Any, concerns: List[Any], child_count: Any,
+                       weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        将用户画像编码为带权重的查询向量
+
+        参数:
+            delivery_type: 分娩方式
+            concerns: 关注点列表，重复的关注点会重复计分
+            child_count: 胎次
+            weights: 匹配权重，缺省项使用CASE_MATCH_WEIGHTS
+
+        返回:
+            查询向量
+        """
+        weights = {**CASE_MATCH_WEIGHTS, **(weights or {})}
+        vector = np.zeros(self.width, dtype=np.float32)
+
+        if delivery_type and delivery_type in self.delivery_type_columns:
+            vector[self.delivery_type_columns[delivery_type]] += weights["delivery_type"]
+        for concern in concerns:
+            if concern in self.concern_columns:
+                vector[self.concern_columns[concern]] += weights["concern"]
+        if child_count and child_count in self.child_count_columns:
+            vector[self.child_count_columns[child_count]] += weights["child_count"]
+        return vector
+
+    def rank(self, vector: np.ndarray, top_k: Optional[int] = None,
+             cursor: Optional[Cursor] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次矩阵向量乘计算全部案例分数，返回分数大于0的案例排名
+
+        参数:
+            vector: 查询向量
+            top_k: 返回前k个，为None时返回全部匹配案例
+            cursor: 上一页最后一条的(分数, 行号)，只返回排在其后的案例
+
+        返回:
+            (案例行号数组, 分数数组)，按分数降序排列，同分按行号升序
+        """
+        scores = self.matrix @ vector
+        matched = np.flatnonzero(scores > 0)
+        return top_k_array_after(matched, scores[matched], top_k, cursor)
+
+
+_case_matrix: Optional[CaseFeatureMatrix] = None
+# 案例库整体替换的次数，与案例条数一起作为知识库版本
+_cases_generation = 0
+# 保护SUCCESS_CASES、_case_matrix和_cases_generation的切换与重建，读取时只在两者不一致时获取
+_case_matrix_lock = threading.Lock()
+
+def _matches(case_matrix: Optional[CaseFeatureMatrix], cases: List[Dict[str, Any]]) -> bool:
+    return case_matrix is not None and case_matrix.cases is cases and len(cases) == case_matrix.matrix.shape[0]
+
+def _sync_case_matrix() -> CaseFeatureMatrix:
+    """案例列表被直接修改后重建特征矩阵，调用方需持有_case_matrix_lock"""
+    global _case_matrix, _cases_generation
+    if not _matches(_case_matrix, SUCCESS_CASES):
+        if _case_matrix is not None and _case_matrix.cases is not SUCCESS_CASES:
+            # 案例列表被直接整体换掉，与replace_success_cases一样算作一次替换
+            _cases_generation += 1
+        _case_matrix = CaseFeatureMatrix(SUCCESS_CASES)
+    return _case_matrix
+
+def _get_case_matrix() -> CaseFeatureMatrix:
+    """获取案例特征矩阵，矩阵中的cases即对应的案例列表快照；案例列表变化后自动重建"""
+    cases = SUCCESS_CASES
+    case_matrix = _case_matrix
+    if _matches(case_matrix, cases):
+        return case_matrix
+    # 正在替换或追加时两者可能暂时不一致，在锁内等待完成后再检查，同一时间只重建一次
+    with _case_matrix_lock:
+        return _sync_case_matrix()
+
+def _case_matrix_snapshot() -> Tuple[CaseFeatureMatrix, int]:
+    """同时取得特征矩阵和它对应的案例库替换次数，用于生成和校验分页游标"""
+    with _case_matrix_lock:
+        return _sync_case_matrix(), _cases_generation
+
+_case_ann: Optional[CaseIVFIndex] = None
+# 构建_case_ann所用的特征矩阵，矩阵重建后索引随之重新加载或构建
+_case_ann_matrix: Optional[CaseFeatureMatrix] = None
+_case_ann_lock = threading.Lock()
+# 后台构建索引的线程及其对应的特征矩阵；构建失败的矩阵不再重试，案例库变化后重新构建
+_case_ann_builder: Optional[threading.Thread] = None
+_case_ann_building: Optional[CaseFeatureMatrix] = None
+_case_ann_failed: Optional[CaseFeatureMatrix] = None
+
+def _load_or_build_case_ann(case_matrix: CaseFeatureMatrix, path: str) -> CaseIVFIndex:
+    """优先加载与当前案例库一致的已保存索引，否则重新构建并保存"""
+    signature = case_matrix.feature_signature()
+    if path:
+        ann = CaseIVFIndex.load(path)
+        if (ann is not None and ann.signature == signature and ann.size <= len(case_matrix.matrix)
+                and ann.fingerprint == matrix_fingerprint(case_matrix.matrix[:ann.size])):
+            logger.info(f"加载案例ANN索引: {path}, {ann.size} 条")
+            return ann
+    ann = CaseIVFIndex.build(case_matrix.matrix, signature)
+    logger.info(f"构建案例ANN索引: {ann.size} 条, {len(ann.centroids)} 个簇")
+    if path:
+        ann.save(path)
+    return ann
+
+def _build_case_ann(case_matrix: CaseFeatureMatrix, path: str) -> None:
+    """后台线程中加载或构建索引，完成后切换；期间案例库已变化时丢弃结果"""
+    global _case_ann, _case_ann_matrix, _case_ann_builder, _case_ann_building, _case_ann_failed
+    try:
+        ann = _load_or_build_case_ann(case_matrix, path)
+    except Exception as e:
+        logger.error(f"构建案例ANN索引失败，继续使用精确检索: {str(e)}")
+        ann = None
+    with _case_ann_lock:
+        if _case_ann_building is not case_matrix:
+            return
+        if ann is None:
+            _case_ann_failed = case_matrix
+        else:
+            _case_ann, _case_ann_matrix = ann, case_matrix
+        _case_ann_builder, _case_ann_building = None, None
+
+def _schedule_case_ann_build(case_matrix: CaseFeatureMatrix, path: str) -> Optional[threading.Thread]:
+    """为特征矩阵启动后台构建，已在构建时返回同一线程，构建失败过时返回None；调用方需持有_case_ann_lock"""
+    global _case_ann_builder, _case_ann_building
+    if _case_ann_failed is case_matrix:
+        return None
+    if _case_ann_building is not case_matrix:
+        _case_ann_building = case_matrix
+        _case_ann_builder = threading.Thread(target=_build_case_ann, args=(case_matrix, path),
+                                             name="case-ann-builder", daemon=True)
+        _case_ann_builder.start()
+    return _case_ann_builder
+
+def _get_case_ann(case_matrix: CaseFeatureMatrix, path: str = ANN_INDEX_PATH,
+                  wait: bool = False) -> Optional[CaseIVFIndex]:
+    """
+    获取案例近似最近邻索引，案例数未达到ANN_MIN_CASES时返回None
+
+    参数:
+        case_matrix: 当前的案例特征矩阵
+        path: 索引保存目录，为空时只在内存中构建
+        wait: 索引尚未就绪时是否等待后台构建完成；为False时直接返回None，由调用方使用精确检索
+
+    返回:
+        与特征矩阵对应的IVF索引，矩阵追加的行会增量插入；尚未就绪时返回None
+    """
+    if len(case_matrix.matrix) < ANN_MIN_CASES:
+        return None
+    ann = _case_ann
+    if ann is not None and _case_ann_matrix is case_matrix and ann.size == len(case_matrix.matrix):
+        return ann
+    with _case_ann_lock:
+        builder = None
+        if _case_ann is None or _case_ann_matrix is not case_matrix:
+            # 加载或k-means构建耗时较长，放到后台线程中，不阻塞检索
+            builder = _schedule_case_ann_build(case_matrix, path)
+            if builder is None or not wait:
+                return None
+    if builder is not None:
+        builder.join()
+    with _case_ann_lock:
+        ann = _case_ann
+        if ann is None or _case_ann_matrix is not case_matrix:
+            return None
+        # 索引之后追加的案例增量插入
+        matrix = case_matrix.matrix
+        for position in range(ann.size, len(matrix)):
+            ann.add(position, matrix[position])
+    return ann
+
+def save_case_ann_index(path: str = ANN_INDEX_PATH) -> bool:
+    """
+    保存案例近似最近邻索引，增量插入的案例一并写入，供其他工作进程以内存映射方式加载
+
+    参数:
+        path: 索引保存目录
+
+    返回:
+        是否保存成功；未配置目录、案例数不足或索引构建失败时返回False；索引正在后台构建时等待完成
+    """
+    case_matrix = _get_case_matrix()
+    ann = _get_case_ann(case_matrix, path, wait=True)
+    if not path or ann is None:
+        return False
+    with _case_ann_lock:
+        return ann.save(path, matrix_fingerprint(case_matrix.matrix[:ann.size]))
+
+def add_success_case(case: Dict[str, Any]) -> None:
+    """
+    添加成功案例，并同步更新特征矩阵
+
+    参数:
+        case: 案例数据
+    """
+    with _case_matrix_lock:
+        if not _sync_case_matrix().add(case):
+            # 出现新的特征取值，下次检索时重建矩阵
+            SUCCESS_CASES.append(case)
+    logger.info(f"添加案例: {case.get('case_id')}")
+
+def replace_success_cases(cases: List[Dict[str, Any]]) -> None:
+    """
+    整体替换案例库，先构建好新的特征矩阵再切换
+
+    参数:
+        cases: 新的案例列表
+    """
+    global SUCCESS_CASES, _case_matrix, _cases_generation
+    case_matrix = CaseFeatureMatrix(cases)
+    # 在锁内一起切换，读取方不会把新的案例列表与旧的矩阵配对后重复重建
+    with _case_matrix_lock:
+        _case_matrix = case_matrix
+        SUCCESS_CASES = cases
+        _cases_generation += 1
+    logger.info(f"替换案例库: {len(cases)} 条")
+    # 热加载后立即在后台准备近似检索索引，就绪前检索使用精确打分
+    _get_case_ann(case_matrix)
+
+def success_cases_version() -> Tuple[int, int]:
+    """
+    成功案例库的版本，整体替换或新增案例后变化
+
+    返回:
+        (替换次数, 案例条数)
+    """
+    with _case_matrix_lock:
+        return _cases_generation, len(SUCCESS_CASES)
+
+def _as_score(value: Any) -> Any:
+    """将numpy分数转换为JSON友好的数值，整数分数保持int"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def _default_cases(case_matrix: CaseFeatureMatrix, case_type: str, limit: Optional[int],
+                   cursor: Optional[Cursor]) -> List[ScoredRecord]:
+    """无匹配时按原有顺序返回默认案例，分数为0，游标继续按下标翻页"""
+    # 与打分使用同一份案例快照，热加载切换期间下标保持一致
+    cases = case_matrix.cases
+    start = cursor[1] + 1 if cursor is not None else 0
+    end = min(1, len(cases)) if case_type == "best" else len(cases)
+    if limit is not None:
+        end = min(end, start + max(limit, 0))
+    return [ScoredRecord(cases[position], 0, position) for position in range(start, end)]
+
+def search_similar_cases(user_profile_id: str, case_type: str = "similar",
+                         weights: Optional[Dict[str, float]] = None, limit: Optional[int] = None,
+                         cursor: Optional[str] = None) -> List[ScoredRecord]:
     """
     搜索与用户情况相近的成功案例
     
     参数:
         user_profile_id: 用户画像ID
         case_type: 案例类型，可选值: "similar"(相似案例), "best"(最佳案例)
+        weights: 可选的匹配权重，缺省项使用CASE_MATCH_WEIGHTS；含负权重时不使用近似检索
+        limit: 返回条数，为None时返回全部匹配案例
+        cursor: 上一页返回的游标，可通过pagination.next_cursor生成，需传入success_cases_version()中的替换次数
         
     返回:
-        匹配的案例列表
+        匹配案例的只读视图列表，需要序列化时使用hydrate_results物化；
+        无匹配时返回分数为0的默认案例
+
+    异常:
+        ValueError: 游标无效，或游标生成之后案例库已被整体替换
     """
+    case_matrix, generation = _case_matrix_snapshot()
+    position_cursor = decode_cursor(cursor, generation)
+    # 分数为0的游标来自默认案例列表，直接按下标继续翻页
+    if position_cursor is not None and position_cursor[0] <= 0:
+        return _default_cases(case_matrix, case_type, limit, position_cursor)
+
     # 获取用户画像
     user_profile = get_user_profile(user_profile_id)
     
     if not user_profile:
         logger.warning(f"无法获取用户画像: {user_profile_id}")
         # 返回默认的热门案例
-        if case_type == "best":
-            return SUCCESS_CASES[:1]  # 返回最佳案例
-        return SUCCESS_CASES  # 返回所有案例
-    
-    # 根据用户画像匹配案例
-    results = []
+        return _default_cases(case_matrix, case_type, limit, None)
     
     # 提取用户关键信息
     delivery_type = user_profile.get("basic_info", {}).get("delivery_type", "")
     concerns = user_profile.get("basic_info", {}).get("concerns", [])
     child_count = user_profile.get("basic_info", {}).get("child_count", 0)
     
-    for case in SUCCESS_CASES:
-        match_score = 0
-        case_info = case.get("customer_info", {})
-        
-        # 分娩方式匹配
-        if delivery_type and case_info.get("delivery_type") == delivery_type:
-            match_score += 3
-        
-        # 关注点匹配
-        for concern in concerns:
-            if concern in case_info.get("initial_concerns", []):
-                match_score += 2
-        
-        # 胎次匹配
-        if child_count and case_info.get("child_count") == child_count:
-            match_score += 1
-        
-        # 如果匹配分数大于0，添加到结果中
-        if match_score > 0:
-            result = case.copy()
-            result["match_score"] = match_score
-            results.append(result)
-    
-    # 排序结果
-    results.sort(key=lambda x: x["match_score"], reverse=True)
+    # 根据用户画像匹配案例：一次矩阵向量乘打分，再取游标之后的前k个；
+    # 案例数达到ANN_MIN_CASES且IVF索引已在后台就绪后，只对索引中最相关的簇打分
+    top_k = 1 if case_type == "best" else limit
+    if case_type == "best" and position_cursor is not None:
+        top_k = 0
+    vector = case_matrix.profile_vector(delivery_type, concerns, child_count, weights)
+    # IVF索引按簇中心得分剪枝，要求查询向量非负；调用方传入负权重时使用精确检索
+    ranker = (_get_case_ann(case_matrix) if (vector >= 0).all() else None) or case_matrix
+    positions, scores = ranker.rank(vector, top_k, position_cursor)
     
-    # 根据case_type返回结果
-    if case_type == "best":
-        # 返回最佳匹配案例
-        return results[:1] if results else SUCCESS_CASES[:1]
+    results = [
+        ScoredRecord(case_matrix.cases[position], _as_score(match_score), position)
+        for position, match_score in zip(positions.tolist(), scores.tolist())
+    ]
     
-    # 返回相似案例
-    return results if results else SUCCESS_CASES
+    # 第一页无匹配时返回默认案例，翻页到末尾时返回空列表
+    if not results and position_cursor is None:
+        return _default_cases(case_matrix, case_type, limit, None)
+    return results
     
 def get_case_by_id(case_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -180,10 +527,12 @@ def get_case_by_id(case_id: str) -> Optional[Dict[str, Any]]:
     返回:
         案例信息，如果不存在则返回None
     """
-    for case in SUCCESS_CASES:
-        if case["case_id"] == case_id:
-            logger.info(f"获取案例: {case_id}")
-            return case
+    # 特征矩阵随案例库变化自动重建，case_id索引随之更新
+    case_matrix = _get_case_matrix()
+    position = case_matrix.case_positions.get(case_id)
+    if position is not None:
+        logger.info(f"获取案例: {case_id}")
+        return case_matrix.cases[position]
     
     logger.warning(f"案例不存在: {case_id}")
     return None 
\ No newline at end of file
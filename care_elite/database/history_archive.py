@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+对话历史归档 - 画像中只保留最近的若干轮对话，更早的对话压缩成归档段单独存储，按需分页读回
+"""
+
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from care_elite.database.profile_store import ProfileBackend
+from care_elite.database.records import to_plain
+
+logger = logging.getLogger(__name__)
+
+# 画像中保留的最近对话轮数
+HOT_TURNS = int(os.environ.get("CARE_ELITE_HISTORY_HOT_TURNS", "50"))
+# 每个归档段至少包含的对话轮数，超出保留轮数这么多之后才归档一次，避免每轮对话都产生一个归档段
+SEGMENT_TURNS = int(os.environ.get("CARE_ELITE_HISTORY_SEGMENT_TURNS", "50"))
+
+def configure_history_policy(hot_turns: Optional[int] = None, segment_turns: Optional[int] = None) -> None:
+    """
+    调整对话历史的归档策略，对之后的写入生效
+
+    参数:
+        hot_turns: 画像中保留的最近对话轮数
+        segment_turns: 每个归档段至少包含的对话轮数
+    """
+    global HOT_TURNS, SEGMENT_TURNS
+    if hot_turns is not None:
+        HOT_TURNS = max(hot_turns, 0)
+    if segment_turns is not None:
+        SEGMENT_TURNS = max(segment_turns, 1)
+    logger.info(f"对话历史归档策略: 保留{HOT_TURNS}轮，每段至少{SEGMENT_TURNS}轮")
+
+def compress_turns(turns: List[Any]) -> bytes:
+    """将一段对话记录压缩为归档段"""
+    return zlib.compress(json.dumps(to_plain(turns), ensure_ascii=False).encode("utf-8"))
+
+def decompress_turns(data: bytes) -> List[Dict[str, Any]]:
+    """解压归档段"""
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+def archive_cold_turns(backend: ProfileBackend, profile_id: str, profile: Dict[str, Any]) -> int:
+    """
+    将超出保留轮数的较早对话移入归档段，画像中只保留最近的HOT_TURNS轮
+
+    参数:
+        backend: 存储后端
+        profile_id: 用户画像ID
+        profile: 用户画像，原地修改conversation_history和archived_turns
+
+    返回:
+        本次归档的对话轮数
+    """
+    history = profile.get("conversation_history")
+    if not history or len(history) < HOT_TURNS + SEGMENT_TURNS:
+        return 0
+
+    count = len(history) - HOT_TURNS
+    first_turn = profile.get("archived_turns", 0)
+    # 先写归档段再截断画像，中途失败时最多重复归档，不会丢失对话
+    backend.append_archive(profile_id, first_turn, count, compress_turns(history[:count]))
+    del history[:count]
+    profile["archived_turns"] = first_turn + count
+
+    logger.info(f"归档对话历史: {profile_id}, 第{first_turn}至{first_turn + count - 1}轮")
+    return count
+
+def iter_archived_turns(backend: ProfileBackend, profile_id: str, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    按时间顺序遍历已归档的对话，只解压包含所需轮次的归档段
+
+    参数:
+        backend: 存储后端
+        profile_id: 用户画像ID
+        start: 起始轮次(从0开始，按全部对话计数)
+
+    返回:
+        对话记录的迭代器
+    """
+    for first_turn, turn_count, data in backend.iter_archive(profile_id, start):
+        turns = decompress_turns(data)
+        yield from turns[max(start - first_turn, 0):]
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+知识库热加载 - 从JSON/JSON lines文件加载销售心得和成功案例，文件变化后在后台重建索引并整体切换
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from care_elite.database.case_database import replace_success_cases
+from care_elite.database.sales_experience import replace_sales_experiences
+from care_elite.utils.common import load_json_from_file
+
+logger = logging.getLogger(__name__)
+
+# 知识库文件路径，未配置时使用代码中的默认数据
+SALES_EXPERIENCES_FILE = os.environ.get("CARE_ELITE_SALES_EXPERIENCES_FILE", "")
+SUCCESS_CASES_FILE = os.environ.get("CARE_ELITE_SUCCESS_CASES_FILE", "")
+# 检查文件变化的间隔(秒)
+RELOAD_INTERVAL = float(os.environ.get("CARE_ELITE_KB_RELOAD_INTERVAL", "5"))
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class KnowledgeSource:
+    """一个知识库文件及其替换函数，记录上次加载时的文件状态"""
+
+    def __init__(self, name: str, path: str, key_field: str,
+                 replace: Callable[[List[Dict[str, Any]]], None]):
+        """
+        参数:
+            name: 数据名称，用于日志
+            path: JSON或JSON lines文件路径
+            key_field: 每条记录必须包含的字段
+            replace: 构建好索引后整体替换数据的函数
+        """
+        self.name = name
+        self.path = path
+        self.key_field = key_field
+        self.replace = replace
+        # 上次成功加载时的(修改时间, 大小)和内容哈希
+        self.stat: Optional[Tuple[int, int]] = None
+        self.digest: Optional[str] = None
+        # changed()发现变化后、加载成功前的文件状态，加载成功后才记为已加载
+        self._pending: Optional[Tuple[Tuple[int, int], str]] = None
+
+    def changed(self) -> bool:
+        """先比较修改时间和大小，变化后再比较内容哈希，只是touch过的文件不会重新加载"""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            logger.error(f"读取{self.name}文件状态失败: {str(e)}")
+            return False
+        current = (stat.st_mtime_ns, stat.st_size)
+        if current == self.stat:
+            return False
+        digest = _file_digest(self.path)
+        if digest == self.digest:
+            # 内容与已加载的一致，只更新文件状态
+            self.stat = current
+            return False
+        self._pending = (current, digest)
+        return True
+
+    def load(self) -> bool:
+        """
+        加载文件并替换数据；文件内容无效或替换失败时保留当前数据，下次检查时重试
+
+        返回:
+            是否完成替换
+        """
+        pending, self._pending = self._pending, None
+        records = load_json_from_file(self.path)
+        if not isinstance(records, list) or not all(
+            isinstance(record, dict) and self.key_field in record for record in records
+        ):
+            logger.error(f"{self.name}文件格式无效，保留当前数据: {self.path}")
+            return False
+        # replace_*先构建新的索引再切换，查询要么看到旧数据，要么看到完整的新数据
+        self.replace(records)
+        if pending is not None:
+            self.stat, self.digest = pending
+        logger.info(f"已加载{self.name}: {self.path}, {len(records)} 条")
+        return True
+
+
+class KnowledgeBaseReloader:
+    """后台线程定期检查知识库文件，变化后重新加载"""
+
+    def __init__(self, sources: List[KnowledgeSource], interval: float = RELOAD_INTERVAL):
+        """
+        参数:
+            sources: 知识库文件列表
+            interval: 检查间隔(秒)
+        """
+        self.sources = sources
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> List[str]:
+        """
+        检查全部文件，加载发生变化的文件
+
+        返回:
+            本次重新加载的数据名称
+        """
+        reloaded = []
+        for source in self.sources:
+            try:
+                if source.changed() and source.load():
+                    reloaded.append(source.name)
+            except Exception as e:
+                logger.error(f"重新加载{source.name}失败: {str(e)}")
+        return reloaded
+
+    def start(self) -> "KnowledgeBaseReloader":
+        """同步完成首次加载，再启动后台检查线程"""
+        self.check()
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="knowledge-base-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        """停止后台检查线程"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def start_knowledge_base_reloader(sales_experiences_file: str = SALES_EXPERIENCES_FILE,
+                                  success_cases_file: str = SUCCESS_CASES_FILE,
+                                  interval: float = RELOAD_INTERVAL) -> Optional[KnowledgeBaseReloader]:
+    """
+    按配置的文件路径加载知识库并启动热加载
+
+    参数:
+        sales_experiences_file: 销售心得文件路径，为空时不加载
+        success_cases_file: 成功案例文件路径，为空时不加载
+        interval: 检查间隔(秒)，不大于0时只加载一次
+
+    返回:
+        热加载器，两个路径都为空时返回None
+    """
+    sources = []
+    if sales_experiences_file:
+        sources.append(KnowledgeSource("销售心得", sales_experiences_file, "id", replace_sales_experiences))
+    if success_cases_file:
+        sources.append(KnowledgeSource("成功案例", success_cases_file, "case_id", replace_success_cases))
+    if not sources:
+        return None
+    return KnowledgeBaseReloader(sources, interval).start()
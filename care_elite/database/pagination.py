@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+检索结果分页 - 有界堆取前k个，游标记录上一页最后一条的(分数, 下标)和知识库的替换次数
+"""
+
+import base64
+import heapq
+import json
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from care_elite.database.scored_record import ScoredRecord
+
+# 排名顺序为分数降序、下标升序，游标之后的结果在该顺序中严格靠后
+Cursor = Tuple[float, int]
+
+def encode_cursor(score: Any, position: int, generation: int = 0) -> str:
+    """
+    将上一页最后一条结果编码为游标
+
+    参数:
+        score: 匹配分数
+        position: 记录下标
+        generation: 检索时知识库的整体替换次数，替换后下标不再对应原来的记录
+
+    返回:
+        URL安全的游标字符串
+    """
+    payload = json.dumps([score, position, generation], separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str], generation: Optional[int] = None) -> Optional[Cursor]:
+    """
+    解析游标
+
+    参数:
+        cursor: 游标字符串，为空时表示第一页
+        generation: 当前知识库的整体替换次数，为None时不校验
+
+    返回:
+        (分数, 下标)，游标为空时返回None
+
+    异常:
+        ValueError: 游标格式无效，或生成游标之后知识库已被整体替换
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, position, cursor_generation = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        decoded = float(score), int(position)
+        cursor_generation = int(cursor_generation)
+    except (ValueError, TypeError, UnicodeEncodeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if generation is not None and cursor_generation != generation:
+        # 热加载后下标对应的记录已经变化，继续翻页会跳过或重复结果
+        raise ValueError("分页游标已失效: 知识库已更新，请从第一页重新查询")
+    return decoded
+
+def is_after(score: Any, position: int, cursor: Optional[Cursor]) -> bool:
+    """判断(分数, 下标)在排名中是否位于游标之后"""
+    if cursor is None:
+        return True
+    cursor_score, cursor_position = cursor
+    return score < cursor_score or (score == cursor_score and position > cursor_position)
+
+def top_k_after(scores: Mapping[int, Any], limit: Optional[int] = None,
+                cursor: Optional[Cursor] = None) -> List[int]:
+    """
+    取游标之后排名前limit的下标，使用有界堆，不对全部候选排序
+
+    参数:
+        scores: 下标 -> 匹配分数
+        limit: 返回条数，为None时返回游标之后的全部结果
+        cursor: 上一页游标
+
+    返回:
+        按分数降序、下标升序排列的下标列表
+    """
+    candidates = (
+        (-score, position) for position, score in scores.items()
+        if is_after(score, position, cursor)
+    )
+    if limit is None:
+        return [position for _, position in sorted(candidates)]
+    return [position for _, position in heapq.nsmallest(max(limit, 0), candidates)]
+
+def top_k_array_after(positions: np.ndarray, scores: np.ndarray, limit: Optional[int] = None,
+                      cursor: Optional[Cursor] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    top_k_after的数组版本，用argpartition取游标之后排名前limit的下标
+
+    参数:
+        positions: 候选下标数组，不要求有序
+        scores: 与positions对应的分数数组
+        limit: 返回条数，为None时返回游标之后的全部结果
+        cursor: 上一页游标
+
+    返回:
+        (下标数组, 分数数组)，按分数降序、下标升序排列
+    """
+    if cursor is not None:
+        cursor_score, cursor_position = cursor
+        after = (scores < cursor_score) | ((scores == cursor_score) & (positions > cursor_position))
+        positions = positions[after]
+        scores = scores[after]
+
+    if limit is not None and len(positions) > limit:
+        if limit <= 0:
+            return positions[:0], scores[:0]
+        # argpartition找到第k大的分数，分数相同的取下标较小者，保证与稳定排序一致
+        kth = scores[np.argpartition(-scores, limit - 1)[limit - 1]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)
+        ties = ties[np.argsort(positions[ties], kind="stable")][:limit - len(above)]
+        keep = np.concatenate([above, ties])
+        positions = positions[keep]
+        scores = scores[keep]
+
+    order = np.lexsort((positions, -scores))
+    return positions[order], scores[order]
+
+def next_cursor(page: Sequence[ScoredRecord], limit: Optional[int], generation: int = 0) -> Optional[str]:
+    """
+    根据当前页生成下一页游标
+
+    参数:
+        page: 当前页结果
+        limit: 每页条数
+        generation: 检索时知识库的整体替换次数
+
+    返回:
+        下一页游标，当前页未取满时说明已无更多结果，返回None
+    """
+    if limit is None or not page or len(page) < limit:
+        return None
+    last = page[-1]
+    return encode_cursor(last.score, last.position, generation)
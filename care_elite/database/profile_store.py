@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+用户画像存储后端 - 内存存储与基于SQLite(WAL模式)的持久化存储
+"""
+
+import abc
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from care_elite.database.records import UserProfile, json_default
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class LockStripes:
+    """
+    分段锁：按画像ID的哈希把画像分配到固定数量的可重入锁上
+
+    同一画像的读改写在同一把锁内串行，不同画像大概率落在不同的锁上，互不阻塞。
+    """
+
+    def __init__(self, stripes: int = 64):
+        """
+        参数:
+            stripes: 锁的数量
+        """
+        self._locks = [threading.RLock() for _ in range(max(stripes, 1))]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def for_key(self, key: str) -> threading.RLock:
+        """取得某个画像ID对应的锁"""
+        return self._locks[hash(key) % len(self._locks)]
+
+
+class ProfileBackend(abc.ABC):
+    """用户画像存储后端接口，未实现全部抽象方法的后端在创建时报错"""
+
+    @abc.abstractmethod
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """读取用户画像，不存在时返回None"""
+
+    @abc.abstractmethod
+    def put(self, profile_id: str, profile: Dict[str, Any]) -> None:
+        """写入用户画像"""
+
+    @abc.abstractmethod
+    def delete(self, profile_id: str) -> bool:
+        """删除用户画像，返回是否存在"""
+
+    @abc.abstractmethod
+    def ids(self) -> Iterator[str]:
+        """遍历全部用户画像ID"""
+
+    @abc.abstractmethod
+    def append_archive(self, profile_id: str, first_turn: int, turn_count: int, data: bytes) -> None:
+        """写入一个对话历史归档段"""
+
+    @abc.abstractmethod
+    def iter_archive(self, profile_id: str, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+        """按起始轮次遍历包含start及之后轮次的归档段，返回(起始轮次, 轮数, 压缩数据)"""
+
+    def flush(self) -> None:
+        """将尚未落盘的写入持久化"""
+
+    def close(self) -> None:
+        """关闭存储后端"""
+
+
+class MemoryProfileBackend(ProfileBackend):
+    """内存存储后端，进程重启后数据丢失"""
+
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        参数:
+            profiles: 作为存储的字典，默认新建
+        """
+        self.profiles = profiles if profiles is not None else {}
+        self.archives: Dict[str, List[Tuple[int, int, bytes]]] = {}
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles.get(profile_id)
+
+    def put(self, profile_id: str, profile: Dict[str, Any]) -> None:
+        self.profiles[profile_id] = profile
+
+    def delete(self, profile_id: str) -> bool:
+        self.archives.pop(profile_id, None)
+        return self.profiles.pop(profile_id, None) is not None
+
+    def ids(self) -> Iterator[str]:
+        return iter(list(self.profiles))
+
+    def append_archive(self, profile_id: str, first_turn: int, turn_count: int, data: bytes) -> None:
+        self.archives.setdefault(profile_id, []).append((first_turn, turn_count, data))
+
+    def iter_archive(self, profile_id: str, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+        return iter([segment for segment in self.archives.get(profile_id, ()) if segment[0] + segment[1] > start])
+
+
+class SQLiteProfileBackend(ProfileBackend):
+    """
+    SQLite持久化存储后端
+
+    数据库运行在WAL模式、synchronous=FULL下，每次提交对应一次fsync。写入先在内存中
+    合并（同一画像多次写入只保留最后一次），由后台线程在累计batch_size条或距首条
+    未提交写入超过flush_interval秒时一次性提交，使每轮对话不必各自等待一次磁盘同步。
+
+    多个进程可以打开同一个数据库文件：读取前检查PRAGMA data_version，其它连接提交过写入时
+    清空已加载的画像缓存，之后从数据库重新读取。画像锁只在本进程内有效，多个进程同时修改
+    同一画像时以最后提交的写入为准；本进程尚未提交的写入对其它进程不可见。
+    """
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 0.05,
+                 cache_size: int = 10000):
+        """
+        参数:
+            path: 数据库文件路径
+            batch_size: 累计多少条未提交写入后立即提交
+            flush_interval: 未提交写入最长等待时间(秒)
+            cache_size: 内存中缓存的画像数量上限
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_profiles ("
+                "profile_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            # 对话历史归档段单独存放，读取画像时不加载
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_archive ("
+                "profile_id TEXT NOT NULL, first_turn INTEGER NOT NULL, turn_count INTEGER NOT NULL, "
+                "data BLOB NOT NULL, PRIMARY KEY (profile_id, first_turn))"
+            )
+            # 其它连接每提交一次写入，data_version就会变化
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            # 初始化失败时关闭连接，不留下打开的数据库文件
+            self._conn.close()
+            raise
+
+        # 已加载的画像缓存（按最近使用排序）与待提交的写入（None表示删除）
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[str, Optional[str]] = {}
+        self._inflight: Dict[str, Optional[str]] = {}
+        self._pending_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="profile-store-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+        logger.info(f"SQLite用户画像存储已打开: {path}")
+
+    def _remember(self, profile_id: str, profile: Dict[str, Any]) -> None:
+        self._cache[profile_id] = profile
+        self._cache.move_to_end(profile_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _get_loaded(self, profile_id: str) -> Any:
+        """从缓存或未落库的写入中读取，调用方需持有self._lock；都没有时返回_MISSING"""
+        if profile_id in self._cache:
+            self._cache.move_to_end(profile_id)
+            return self._cache[profile_id]
+        # 正在提交的批次尚未写入数据库，同样需要可见
+        for writes in (self._pending, self._inflight):
+            if profile_id not in writes:
+                continue
+            data = writes[profile_id]
+            if data is None:
+                return None
+            profile = UserProfile.coerce(json.loads(data))
+            self._remember(profile_id, profile)
+            return profile
+        return _MISSING
+
+    def _drop_stale_cache(self) -> None:
+        """其它进程提交过写入时清空已加载的画像缓存，未提交的写入不受影响"""
+        with self._db_lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            with self._lock:
+                self._data_version = data_version
+                self._cache.clear()
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        self._drop_stale_cache()
+        with self._lock:
+            profile = self._get_loaded(profile_id)
+        if profile is not _MISSING:
+            return profile
+
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT data FROM user_profiles WHERE profile_id = ?", (profile_id,)
+            ).fetchone()
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if row is None:
+            return None
+
+        with self._lock:
+            # 读库期间可能有新的写入，以内存中的版本为准
+            profile = self._get_loaded(profile_id)
+            if profile is _MISSING:
+                profile = UserProfile.coerce(json.loads(row[0]))
+                # 读到的行已被其它进程的写入取代时不缓存
+                if data_version == self._data_version:
+                    self._remember(profile_id, profile)
+        return profile
+
+    def _enqueue(self, profile_id: str, data: Optional[str]) -> None:
+        """调用方需持有self._lock"""
+        if self._closed:
+            raise RuntimeError("用户画像存储已关闭")
+        self._pending[profile_id] = data
+        if self._pending_since is None:
+            # 首条未提交写入开始计时
+            self._pending_since = time.monotonic()
+            self._wakeup.notify()
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.notify()
+
+    def put(self, profile_id: str, profile: Dict[str, Any]) -> None:
+        # 写入时序列化，保存调用时刻的快照
+        data = json.dumps(profile, ensure_ascii=False, default=json_default)
+        with self._lock:
+            self._remember(profile_id, profile)
+            self._enqueue(profile_id, data)
+
+    def delete(self, profile_id: str) -> bool:
+        existed = self.get(profile_id) is not None
+        with self._lock:
+            self._cache.pop(profile_id, None)
+            self._enqueue(profile_id, None)
+        return existed
+
+    def ids(self) -> Iterator[str]:
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute("SELECT profile_id FROM user_profiles ORDER BY profile_id").fetchall()
+        return iter([row[0] for row in rows])
+
+    def append_archive(self, profile_id: str, first_turn: int, turn_count: int, data: bytes) -> None:
+        # 归档段很少写入，直接单独提交，保证在截断后的画像落盘之前已经持久化
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("用户画像存储已关闭")
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO conversation_archive (profile_id, first_turn, turn_count, data) "
+                    "VALUES (?, ?, ?, ?)",
+                    (profile_id, first_turn, turn_count, data)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def iter_archive(self, profile_id: str, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+        # 先只读取各段的范围，遍历到时再逐段读取数据
+        with self._db_lock:
+            segments = self._conn.execute(
+                "SELECT first_turn, turn_count FROM conversation_archive "
+                "WHERE profile_id = ? AND first_turn + turn_count > ? ORDER BY first_turn",
+                (profile_id, start)
+            ).fetchall()
+        for first_turn, turn_count in segments:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT data FROM conversation_archive WHERE profile_id = ? AND first_turn = ?",
+                    (profile_id, first_turn)
+                ).fetchone()
+            if row is not None:
+                yield first_turn, turn_count, row[0]
+
+    def _take_batch(self) -> Dict[str, Optional[str]]:
+        """调用方需持有self._lock"""
+        batch = self._pending
+        self._pending = {}
+        self._pending_since = None
+        self._inflight = batch
+        return batch
+
+    def _commit(self, batch: Dict[str, Optional[str]]) -> None:
+        """在一个事务中提交一批写入，对应一次fsync；失败时放回待提交队列"""
+        now = time.time()
+        upserts = [(profile_id, data, now) for profile_id, data in batch.items() if data is not None]
+        deletes = [(profile_id,) for profile_id, data in batch.items() if data is None]
+        try:
+            with self._db_lock:
+                self._conn.execute("BEGIN")
+                try:
+                    if upserts:
+                        self._conn.executemany(
+                            "INSERT INTO user_profiles (profile_id, data, updated_at) VALUES (?, ?, ?) "
+                            "ON CONFLICT(profile_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                            upserts
+                        )
+                    if deletes:
+                        self._conn.executemany("DELETE FROM user_profiles WHERE profile_id = ?", deletes)
+                        self._conn.executemany("DELETE FROM conversation_archive WHERE profile_id = ?", deletes)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except Exception:
+            with self._lock:
+                # 放回队列，期间产生的较新写入优先
+                for profile_id, data in batch.items():
+                    self._pending.setdefault(profile_id, data)
+                if self._pending_since is None:
+                    self._pending_since = time.monotonic()
+            raise
+        finally:
+            with self._lock:
+                self._inflight = {}
+        logger.debug(f"提交用户画像写入: {len(batch)} 条")
+
+    def flush(self) -> None:
+        # 同一时间只有一个批次处于提交中，保证未落库的写入始终对读取可见
+        with self._commit_lock:
+            with self._lock:
+                batch = self._take_batch()
+            if batch:
+                self._commit(batch)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if self._pending_since is not None:
+                        remaining = self._pending_since + self.flush_interval - time.monotonic()
+                        if remaining <= 0 or len(self._pending) >= self.batch_size:
+                            break
+                        self._wakeup.wait(remaining)
+                    else:
+                        self._wakeup.wait()
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"提交用户画像写入失败: {str(e)}")
+                time.sleep(self.flush_interval)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify_all()
+        self._flusher.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+        atexit.unregister(self.close)
+        logger.info(f"SQLite用户画像存储已关闭: {self.path}")
+
+
+def create_profile_backend(url: str, profiles: Optional[Dict[str, Dict[str, Any]]] = None) -> ProfileBackend:
+    """
+    根据URL创建存储后端
+
+    参数:
+        url: "memory" 或 "sqlite:///path/to/profiles.db"
+        profiles: 内存存储使用的字典，传入user_profile.USER_PROFILES可保持与默认后端共用数据
+
+    返回:
+        存储后端实例
+    """
+    if url in ("", "memory"):
+        return MemoryProfileBackend(profiles)
+    if url.startswith("sqlite:///"):
+        return SQLiteProfileBackend(url[len("sqlite:///"):])
+    raise ValueError(f"不支持的用户画像存储: {url}")
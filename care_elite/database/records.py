@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+紧凑的用户画像记录 - 固定字段存放在__slots__中，对外保持字典兼容的读写与序列化
+"""
+
+import copy
+import sys
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Optional, Tuple
+
+# 槽位未赋值的标记，与字典中不存在该键等价
+_UNSET = object()
+
+def _intern(value: Any) -> Any:
+    """低基数的字符串字段共享同一个对象"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class SlottedRecord(MutableMapping):
+    """
+    以__slots__存储固定字段的记录，按字典方式读写
+
+    FIELDS之外的键存放在按需创建的_extra字典中；INTERNED中的字符串字段写入时驻留。
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: FrozenSet[str] = frozenset()
+
+    def __init__(self, **fields: Any):
+        # 加载画像时每个字段都会经过这里，直接写槽位，不逐个经过__setitem__
+        store = self._store
+        for field in self.FIELDS:
+            value = fields.pop(field, _UNSET)
+            object.__setattr__(self, field, value if value is _UNSET else store(field, value))
+        self._extra: Optional[Dict[str, Any]] = fields or None
+
+    @classmethod
+    def coerce(cls, value: Any) -> Any:
+        """将字典转换为记录，已是记录或非字典的值原样返回"""
+        # JSON解析出的普通字典最常见，先按类型判断，省去抽象基类的isinstance检查
+        if type(value) is dict:
+            return cls(**value)
+        if isinstance(value, cls) or not isinstance(value, Mapping):
+            return value
+        return cls(**value)
+
+    def _store(self, key: str, value: Any) -> Any:
+        """写入前的转换，子类可覆盖"""
+        return _intern(value) if key in self.INTERNED else value
+
+    def _load(self, key: str, value: Any) -> Any:
+        """读取时的转换，子类可覆盖"""
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is _UNSET:
+                raise KeyError(key)
+            return self._load(key, value)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            object.__setattr__(self, key, self._store(key, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.FIELDS:
+            if getattr(self, key) is _UNSET:
+                raise KeyError(key)
+            object.__setattr__(self, key, _UNSET)
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field) is not _UNSET:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(getattr(self, field) is not _UNSET for field in self.FIELDS)
+        return count + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SlottedRecord":
+        # 直接复制存储形式的字段值，不经过to_dict/_store的转换
+        clone = object.__new__(type(self))
+        memo[id(self)] = clone
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            object.__setattr__(clone, field, value if value is _UNSET else copy.deepcopy(value, memo))
+        clone._extra = copy.deepcopy(self._extra, memo)
+        return clone
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """递归转换为普通字典，用于MCP响应和JSON序列化"""
+        return {key: to_plain(self[key]) for key in self}
+
+
+class ConversationTurn(SlottedRecord):
+    """一轮对话，角色字符串驻留，不带时区的时间戳以浮点秒存储，读取时仍为ISO格式字符串"""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    FIELDS = ("role", "content", "timestamp")
+    INTERNED = frozenset({"role"})
+
+    def __init__(self, role: Any = _UNSET, content: Any = _UNSET, timestamp: Any = _UNSET, **extra: Any):
+        # 对话轮数远多于画像数，单独展开三个字段，加载时少走一层通用循环
+        object.__setattr__(self, "role", role if role is _UNSET else _intern(role))
+        object.__setattr__(self, "content", content)
+        object.__setattr__(self, "timestamp", timestamp if timestamp is _UNSET else _compact_timestamp(timestamp))
+        self._extra = extra or None
+
+    def _store(self, key: str, value: Any) -> Any:
+        if key == "timestamp":
+            return _compact_timestamp(value)
+        if key == "role":
+            return _intern(value)
+        return value
+
+    def _load(self, key: str, value: Any) -> Any:
+        if key == "timestamp" and isinstance(value, float):
+            return datetime.fromtimestamp(value).isoformat()
+        return value
+
+
+def _compact_timestamp(value: Any) -> Any:
+    """能原样还原的本地时间戳转换为浮点秒，带时区偏移、无法解析等其它写法保留原值"""
+    if type(value) is not str:
+        if not isinstance(value, datetime):
+            return value
+        value = value.isoformat()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        return value
+    # 与isoformat写法不同的字符串(如空格分隔)，以及夏令时切换等无法还原的本地时间保留原字符串
+    if parsed.isoformat() != value:
+        return value
+    seconds = parsed.timestamp()
+    return seconds if datetime.fromtimestamp(seconds) == parsed else value
+
+
+class ConversationHistory(list):
+    """对话历史列表，追加的字典自动转换为ConversationTurn"""
+
+    __slots__ = ()
+
+    def __init__(self, turns: Iterable[Any] = ()):
+        super().__init__(ConversationTurn.coerce(turn) for turn in turns)
+
+    def append(self, turn: Any) -> None:
+        super().append(ConversationTurn.coerce(turn))
+
+    def extend(self, turns: Iterable[Any]) -> None:
+        super().extend(ConversationTurn.coerce(turn) for turn in turns)
+
+    def insert(self, index: int, turn: Any) -> None:
+        super().insert(index, ConversationTurn.coerce(turn))
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        if isinstance(index, slice):
+            value = [ConversationTurn.coerce(turn) for turn in value]
+        else:
+            value = ConversationTurn.coerce(value)
+        super().__setitem__(index, value)
+
+    def __iadd__(self, turns: Iterable[Any]) -> "ConversationHistory":
+        self.extend(turns)
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (ConversationHistory, (list(self),))
+
+
+class BasicInfo(SlottedRecord):
+    """用户基本信息"""
+
+    __slots__ = ("pregnancy_status", "delivery_type", "child_count", "concerns")
+
+    FIELDS = ("pregnancy_status", "delivery_type", "child_count", "concerns")
+    INTERNED = frozenset({"pregnancy_status", "delivery_type"})
+
+    def _store(self, key: str, value: Any) -> Any:
+        if key == "concerns" and isinstance(value, list):
+            return [_intern(concern) for concern in value]
+        return super()._store(key, value)
+
+
+class Preferences(SlottedRecord):
+    """用户偏好"""
+
+    __slots__ = ("budget_level", "stay_duration", "dietary_restrictions")
+
+    FIELDS = ("budget_level", "stay_duration", "dietary_restrictions")
+    INTERNED = frozenset({"budget_level", "stay_duration"})
+
+
+class UserProfile(SlottedRecord):
+    """用户画像，嵌套的基本信息、偏好和对话历史写入时转换为紧凑记录"""
+
+    __slots__ = ("profile_id", "version", "basic_info", "preferences", "conversation_history", "archived_turns")
+
+    FIELDS = ("profile_id", "version", "basic_info", "preferences", "conversation_history", "archived_turns")
+
+    def _store(self, key: str, value: Any) -> Any:
+        if key == "basic_info":
+            return BasicInfo.coerce(value)
+        if key == "preferences":
+            return Preferences.coerce(value)
+        if key == "conversation_history" and isinstance(value, list) and not isinstance(value, ConversationHistory):
+            return ConversationHistory(value)
+        return super()._store(key, value)
+
+
+def as_profile_record(profile: Mapping) -> UserProfile:
+    """
+    将字典形式的用户画像转换为紧凑记录
+
+    参数:
+        profile: 用户画像，已是UserProfile时原样返回
+
+    返回:
+        用户画像记录
+    """
+    return UserProfile.coerce(profile)
+
+def to_plain(value: Any) -> Any:
+    """
+    递归地将记录转换为普通的字典和列表
+
+    参数:
+        value: 任意值
+
+    返回:
+        可直接JSON序列化的值
+    """
+    if isinstance(value, SlottedRecord):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    return value
+
+def json_default(value: Any) -> Any:
+    """json.dumps的default钩子，遇到记录时展开为字典，嵌套记录会再次经过本钩子"""
+    if isinstance(value, SlottedRecord):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -8,10 +8,23 @@
 import logging
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from care_elite.database.pagination import decode_cursor, top_k_after
+from care_elite.database.scored_record import ScoredRecord
+from care_elite.database.semantic_index import SemanticIndex, top_similar
 
 logger = logging.getLogger(__name__)
 
+# 自由文本查询的语义相似度权重，相似度在0-1之间，与画像匹配分数相加
+SEMANTIC_WEIGHT = float(os.environ.get("CARE_ELITE_SEMANTIC_WEIGHT", "3"))
+# 仅靠语义命中的候选条数上限，画像已命中的心得总会叠加语义分数
+SEMANTIC_TOP_K = int(os.environ.get("CARE_ELITE_SEMANTIC_TOP_K", "20"))
+# 低于该相似度的语义命中视为噪声
+SEMANTIC_MIN_SIMILARITY = float(os.environ.get("CARE_ELITE_SEMANTIC_MIN_SIMILARITY", "0.05"))
+
 # 模拟销售心得数据库，实际项目中应使用向量数据库存储
 SALES_EXPERIENCES = [
     {
@@ -57,83 +70,374 @@ SALES_EXPERIENCES = [
     }
 ]
 
-def search_sales_experience(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+def experience_text(exp: Dict[str, Any]) -> str:
+    """拼接销售心得的标题、心得内容和话术内容，作为语义检索的文本"""
+    parts = [exp.get("title", ""), exp.get("experience", "")]
+    parts.extend(script.get("content", "") for script in exp.get("scripts", []))
+    return "\n".join(part for part in parts if part)
+
+
+class SalesExperienceIndex:
+    """销售心得倒排索引 - 按标签、分娩方式、关注点和预算级别维护倒排表"""
+
+    def __init__(self, experiences: List[Dict[str, Any]], generation: int = 0):
+        """
+        基于销售心得列表构建倒排索引
+
+        参数:
+            experiences: 销售心得列表，索引中的位置即列表下标
+            generation: 心得库的整体替换次数，分页游标只在同一次替换内有效
+        """
+        self.experiences = experiences
+        self.generation = generation
+        self.tag_postings: Dict[str, List[int]] = defaultdict(list)
+        self.delivery_type_postings: Dict[str, List[int]] = defaultdict(list)
+        self.concern_postings: Dict[str, List[int]] = defaultdict(list)
+        self.budget_level_postings: Dict[str, List[int]] = defaultdict(list)
+        # 话术ID "{experience_id}_{scenario}" -> 话术
+        self.scripts: Dict[str, Dict[str, Any]] = {}
+        self.size = 0
+        # 语义索引在第一次出现自由文本查询时构建
+        self._semantic: Optional[SemanticIndex] = None
+        self._semantic_lock = threading.Lock()
+
+        for position, exp in enumerate(experiences):
+            self._index_entry(position, exp)
+
+    def _index_entry(self, position: int, exp: Dict[str, Any]) -> None:
+        """将单条销售心得写入各倒排表"""
+        self.size += 1
+        # 按完整的话术ID建索引，经验ID或场景名中含有下划线也能精确查找；重复时保留先出现的
+        for script in exp.get("scripts", []):
+            self.scripts.setdefault(f"{exp.get('id')}_{script.get('scenario')}", script)
+
+        # 同一条心得中重复的标签/关注点只记录一次，与原先的成员判断保持一致
+        for tag in dict.fromkeys(exp.get("tags", [])):
+            self.tag_postings[tag].append(position)
+
+        persona = exp.get("persona")
+        if persona is None:
+            return
+
+        if "delivery_type" in persona:
+            self.delivery_type_postings[persona["delivery_type"]].append(position)
+        for concern in dict.fromkeys(persona.get("concerns", [])):
+            self.concern_postings[concern].append(position)
+        if "budget_level" in persona:
+            self.budget_level_postings[persona["budget_level"]].append(position)
+
+    def add(self, exp: Dict[str, Any]) -> int:
+        """
+        追加一条销售心得并更新倒排表
+
+        参数:
+            exp: 销售心得数据
+
+        返回:
+            新心得在列表中的位置
+        """
+        position = len(self.experiences)
+        self.experiences.append(exp)
+        self.catch_up()
+        return position
+
+    def catch_up(self) -> None:
+        """将直接追加到心得列表、尚未建索引的心得补入倒排表和语义索引"""
+        for position in range(self.size, len(self.experiences)):
+            self._index_entry(position, self.experiences[position])
+        with self._semantic_lock:
+            if self._semantic is not None:
+                self._catch_up_semantic(self._semantic)
+
+    def _catch_up_semantic(self, semantic: SemanticIndex) -> None:
+        """将语义索引之后追加的心得补入索引，调用方需持有_semantic_lock"""
+        for position in range(semantic.size, len(self.experiences)):
+            semantic.add(experience_text(self.experiences[position]))
+
+    def semantic_index(self) -> SemanticIndex:
+        """获取标题、心得和话术文本的语义索引，首次使用时构建，并发的首次查询只构建一次"""
+        semantic = self._semantic
+        if semantic is None:
+            with self._semantic_lock:
+                semantic = self._semantic
+                if semantic is None:
+                    # 构建期间追加的心得由构建完成后的补入处理，行号与心得位置一一对应
+                    count = len(self.experiences)
+                    semantic = SemanticIndex(experience_text(exp) for exp in self.experiences[:count])
+                    self._catch_up_semantic(semantic)
+                    self._semantic = semantic
+        return semantic
+
+    def _blend_semantic(self, scores: Counter, text: str,
+                        similarities: Optional[Dict[str, Any]] = None) -> None:
+        """
+        将自由文本查询的语义相似度按SEMANTIC_WEIGHT叠加到匹配分数上
+
+        参数:
+            scores: 画像匹配分数，原地修改
+            text: 自由文本查询
+            similarities: 查询文本 -> 相似度数组的缓存，批量查询间共享
+        """
+        sims = similarities.get(text) if similarities is not None else None
+        if sims is None:
+            sims = self.semantic_index().similarities(text)
+            if similarities is not None:
+                similarities[text] = sims
+        # 画像已命中的心得叠加语义分数，其余只取最相似的前SEMANTIC_TOP_K条
+        candidates = set(scores)
+        candidates.update(top_similar(sims, SEMANTIC_TOP_K, SEMANTIC_MIN_SIMILARITY))
+        for position in candidates:
+            # 查询期间新追加的心得还没有相似度
+            if position >= len(sims):
+                continue
+            similarity = float(sims[position])
+            if similarity > SEMANTIC_MIN_SIMILARITY:
+                scores[position] += SEMANTIC_WEIGHT * similarity
+
+    def score(self, query: Dict[str, Any]) -> Counter:
+        """
+        只对倒排表命中的候选心得计算匹配分数
+
+        参数:
+            query: 查询条件，可包含tags、persona等字段，text为自由文本
+
+        返回:
+            候选心得位置 -> 匹配分数
+        """
+        # Counter.update按元素计数，权重为n的倒排表累加n次
+        scores: Counter = Counter()
+
+        # 标签匹配
+        for tag in query.get("tags", []):
+            scores.update(self.tag_postings.get(tag, ()))
+
+        persona_query = query.get("persona")
+        if persona_query:
+            # 分娩方式匹配
+            if "delivery_type" in persona_query:
+                postings = self.delivery_type_postings.get(persona_query["delivery_type"], ())
+                scores.update(postings)
+                scores.update(postings)
+
+            # 关注点匹配
+            for concern in persona_query.get("concerns", []):
+                postings = self.concern_postings.get(concern, ())
+                scores.update(postings)
+                scores.update(postings)
+
+            # 预算级别匹配
+            if "budget_level" in persona_query:
+                scores.update(self.budget_level_postings.get(persona_query["budget_level"], ()))
+
+        # 自由文本语义匹配
+        if query.get("text"):
+            self._blend_semantic(scores, query["text"])
+
+        return scores
+
+    def _weighted_postings(self, query: Dict[str, Any]) -> List[Tuple[str, Any, int]]:
+        """将查询条件展开为(倒排表名, 取值, 权重)，与score的计分规则一致"""
+        terms = [("tag", tag, 1) for tag in query.get("tags", [])]
+
+        persona_query = query.get("persona")
+        if persona_query:
+            if "delivery_type" in persona_query:
+                terms.append(("delivery_type", persona_query["delivery_type"], 2))
+            terms.extend(("concern", concern, 2) for concern in persona_query.get("concerns", []))
+            if "budget_level" in persona_query:
+                terms.append(("budget_level", persona_query["budget_level"], 1))
+        return terms
+
+    def score_many(self, queries: List[Dict[str, Any]]) -> List[Counter]:
+        """
+        批量计算多个查询的匹配分数，每个用到的倒排表在整批查询中只遍历一次
+
+        参数:
+            queries: 查询条件列表
+
+        返回:
+            与queries一一对应的 候选心得位置 -> 匹配分数
+        """
+        postings_tables = {
+            "tag": self.tag_postings,
+            "delivery_type": self.delivery_type_postings,
+            "concern": self.concern_postings,
+            "budget_level": self.budget_level_postings
+        }
+        # (倒排表名, 取值) -> 用到该倒排表的[(查询下标, 权重)]
+        subscribers: Dict[Tuple[str, Any], List[Tuple[int, int]]] = {}
+        for index, query in enumerate(queries):
+            for field, key, weight in self._weighted_postings(query):
+                subscribers.setdefault((field, key), []).append((index, weight))
+
+        # 遍历一次倒排表，把每个命中位置的分数同时累加到所有用到它的查询上
+        results: List[Counter] = [Counter() for _ in queries]
+        for (field, key), subscribed in subscribers.items():
+            for position in postings_tables[field].get(key, ()):
+                for index, weight in subscribed:
+                    results[index][position] += weight
+
+        # 查询文本 -> 语义相似度，相同的文本只计算一次
+        similarities: Dict[str, Any] = {}
+        for query, scores in zip(queries, results):
+            if query.get("text"):
+                self._blend_semantic(scores, query["text"], similarities)
+        return results
+
+    def search(self, query: Dict[str, Any], limit: Optional[int] = None,
+               cursor: Optional[str] = None) -> List[ScoredRecord]:
+        """
+        搜索匹配的销售心得，结果按匹配分数降序排列，同分保持原有顺序
+
+        参数:
+            query: 查询条件，可包含tags、persona等字段
+            limit: 返回条数，为None时返回全部匹配结果
+            cursor: 上一页返回的游标，从该位置之后继续取
+
+        返回:
+            匹配结果的只读视图列表，引用原始心得而不复制
+
+        异常:
+            ValueError: 游标无效，或游标生成之后心得库已被整体替换
+        """
+        position_cursor = decode_cursor(cursor, self.generation)
+        scores = self.score(query)
+        # 有界堆只保留前limit个，同分按位置升序，与原有顺序一致
+        ranked = top_k_after(scores, limit, position_cursor)
+        return [ScoredRecord(self.experiences[position], scores[position], position) for position in ranked]
+
+    def search_many(self, queries: List[Dict[str, Any]], limit: Optional[int] = None) -> List[List[ScoredRecord]]:
+        """
+        批量搜索销售心得，每个查询的结果排序与search一致
+
+        参数:
+            queries: 查询条件列表
+            limit: 每个查询返回的条数，为None时返回全部匹配结果
+
+        返回:
+            与queries一一对应的匹配结果列表
+        """
+        return [
+            [ScoredRecord(self.experiences[position], scores[position], position)
+             for position in top_k_after(scores, limit)]
+            for scores in self.score_many(queries)
+        ]
+
+
+# 首次检索时构建索引，新增心得时增量维护
+_SALES_INDEX: Optional[SalesExperienceIndex] = None
+# 心得库整体替换的次数，与心得条数一起作为知识库版本
+_SALES_GENERATION = 0
+# 追加心得(列表追加与建索引)、补建索引和整体替换互斥
+_SALES_LOCK = threading.Lock()
+
+def _get_sales_index() -> SalesExperienceIndex:
+    """获取销售心得索引，首次使用或心得列表被整体换掉后重建，列表被直接追加时只补建新增的心得"""
+    global _SALES_INDEX, _SALES_GENERATION
+    index = _SALES_INDEX
+    if index is not None and index.experiences is SALES_EXPERIENCES and index.size == len(SALES_EXPERIENCES):
+        return index
+    with _SALES_LOCK:
+        if _SALES_INDEX is None or _SALES_INDEX.experiences is not SALES_EXPERIENCES:
+            if _SALES_INDEX is not None:
+                # 心得列表被直接整体换掉，与replace_sales_experiences一样算作一次替换
+                _SALES_GENERATION += 1
+            _SALES_INDEX = SalesExperienceIndex(SALES_EXPERIENCES, _SALES_GENERATION)
+        else:
+            _SALES_INDEX.catch_up()
+        return _SALES_INDEX
+
+def add_sales_experience(exp: Dict[str, Any]) -> None:
+    """
+    添加销售心得，并同步更新倒排索引
+
+    参数:
+        exp: 销售心得数据
+    """
+    _get_sales_index()
+    with _SALES_LOCK:
+        # 列表追加与建索引在同一把锁内完成，读取方不会看到只追加了一半的心得
+        _SALES_INDEX.add(exp)
+    logger.info(f"添加销售心得: {exp.get('id')}")
+
+def replace_sales_experiences(experiences: List[Dict[str, Any]]) -> None:
+    """
+    整体替换销售心得库，先构建好新索引再切换
+
+    参数:
+        experiences: 新的销售心得列表
+    """
+    global SALES_EXPERIENCES, _SALES_INDEX, _SALES_GENERATION
+    index = SalesExperienceIndex(experiences)
+    with _SALES_LOCK:
+        _SALES_GENERATION += 1
+        index.generation = _SALES_GENERATION
+        SALES_EXPERIENCES = experiences
+        _SALES_INDEX = index
+    logger.info(f"替换销售心得库: {len(experiences)} 条")
+
+def sales_experience_version() -> Tuple[int, int]:
+    """
+    销售心得库的版本，整体替换或新增心得后变化
+
+    返回:
+        (替换次数, 心得条数)
+    """
+    return _SALES_GENERATION, len(SALES_EXPERIENCES)
+
+def search_sales_experience(query: Dict[str, Any], limit: Optional[int] = None,
+                            cursor: Optional[str] = None) -> List[ScoredRecord]:
     """
     搜索匹配的销售心得
     
     参数:
-        query: 查询条件，可包含tags、persona等字段
+        query: 查询条件，可包含tags、persona等字段，text为自由文本，按语义相似度加分
+        limit: 返回条数，为None时返回全部匹配结果
+        cursor: 上一页返回的游标，可通过pagination.next_cursor生成，需传入sales_experience_version()中的替换次数
         
     返回:
-        匹配的销售心得列表
+        匹配结果的只读视图列表，需要序列化时使用hydrate_results物化
+
+    异常:
+        ValueError: 游标无效，或游标生成之后心得库已被整体替换
     """
-    results = []
-    
-    # 简单匹配逻辑，实际项目中应使用向量搜索
-    for exp in SALES_EXPERIENCES:
-        match_score = 0
-        
-        # 检查标签匹配
-        if "tags" in query and "tags" in exp:
-            for tag in query["tags"]:
-                if tag in exp["tags"]:
-                    match_score += 1
-        
-        # 检查客户画像匹配
-        if "persona" in query and "persona" in exp:
-            persona_query = query["persona"]
-            persona_exp = exp["persona"]
-            
-            # 分娩方式匹配
-            if "delivery_type" in persona_query and "delivery_type" in persona_exp:
-                if persona_query["delivery_type"] == persona_exp["delivery_type"]:
-                    match_score += 2
-            
-            # 关注点匹配
-            if "concerns" in persona_query and "concerns" in persona_exp:
-                for concern in persona_query["concerns"]:
-                    if concern in persona_exp["concerns"]:
-                        match_score += 2
-            
-            # 预算级别匹配
-            if "budget_level" in persona_query and "budget_level" in persona_exp:
-                if persona_query["budget_level"] == persona_exp["budget_level"]:
-                    match_score += 1
-        
-        # 如果匹配分数大于0，添加到结果中
-        if match_score > 0:
-            result = exp.copy()
-            result["match_score"] = match_score
-            results.append(result)
-    
-    # 按匹配分数排序
-    results.sort(key=lambda x: x["match_score"], reverse=True)
+    # 通过倒排索引只对候选心得打分，自由文本在本地语义索引中检索
+    results = _get_sales_index().search(query, limit, cursor)
     
     logger.info(f"搜索销售心得: 找到 {len(results)} 条匹配结果")
     return results
 
+def search_sales_experience_batch(queries: List[Dict[str, Any]],
+                                  limit: Optional[int] = None) -> List[List[ScoredRecord]]:
+    """
+    批量搜索匹配的销售心得，多个查询共享倒排表查找
+
+    参数:
+        queries: 查询条件列表
+        limit: 每个查询返回的条数，为None时返回全部匹配结果
+
+    返回:
+        与queries一一对应的匹配结果列表
+    """
+    results = _get_sales_index().search_many(queries, limit)
+
+    logger.info(f"批量搜索销售心得: {len(queries)} 个查询")
+    return results
+
 def get_sales_script(script_id: str) -> Optional[Dict[str, Any]]:
     """
     获取特定销售话术
     
     参数:
-        script_id: 话术ID，格式为"{experience_id}_{scenario}"
+        script_id: 话术ID，格式为"{experience_id}_{scenario}"，按完整ID查找，不拆分
         
     返回:
         话术信息，如果不存在则返回None
     """
-    try:
-        exp_id, scenario = script_id.split("_", 1)
-        
-        for exp in SALES_EXPERIENCES:
-            if exp["id"] == exp_id:
-                for script in exp["scripts"]:
-                    if script["scenario"] == scenario:
-                        logger.info(f"获取销售话术: {script_id}")
-                        return script
-        
+    script = _get_sales_index().scripts.get(script_id)
+    if script is None:
         logger.warning(f"销售话术不存在: {script_id}")
         return None
-    except Exception as e:
-        logger.error(f"获取销售话术失败: {str(e)}")
-        return None 
\ No newline at end of file
+    
+    logger.info(f"获取销售话术: {script_id}")
+    return script
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+带分数的检索结果 - 只读视图引用原始记录，按需物化为可序列化的字典
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+SCORE_FIELD = "match_score"
+
+
+class ScoredRecord(Mapping):
+    """检索结果的只读视图，组合原始记录引用与匹配分数，不复制记录内容"""
+
+    __slots__ = ("record", "score", "position")
+
+    def __init__(self, record: Dict[str, Any], score: Any, position: Optional[int] = None):
+        """
+        参数:
+            record: 原始记录，视图只持有引用
+            score: 匹配分数，以match_score字段对外呈现
+            position: 记录在数据列表中的下标，用于生成分页游标
+        """
+        self.record = record
+        self.score = score
+        self.position = position
+
+    def __getitem__(self, key: str) -> Any:
+        if key == SCORE_FIELD:
+            return self.score
+        return self.record[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.record:
+            if key != SCORE_FIELD:
+                yield key
+        yield SCORE_FIELD
+
+    def __len__(self) -> int:
+        return len(self.record) + (SCORE_FIELD not in self.record)
+
+    def __repr__(self) -> str:
+        return f"ScoredRecord({self.record!r}, score={self.score!r})"
+
+    def hydrate(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        物化为字典，只拷贝顶层的指定字段，嵌套内容仍为引用
+
+        参数:
+            fields: 需要的字段，为None时包含全部字段；match_score总是包含
+
+        返回:
+            可序列化的结果字典
+        """
+        if fields is None:
+            result = dict(self.record)
+        else:
+            result = {field: self.record[field] for field in fields if field in self.record}
+        result[SCORE_FIELD] = self.score
+        return result
+
+
+def hydrate_results(results: Iterable[Mapping], fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    将检索结果批量物化为字典列表
+
+    参数:
+        results: 检索结果，ScoredRecord或普通字典
+        fields: 需要的字段，为None时包含全部字段
+
+    返回:
+        结果字典列表
+    """
+    fields = None if fields is None else list(fields)
+    hydrated = []
+    for result in results:
+        if isinstance(result, ScoredRecord):
+            hydrated.append(result.hydrate(fields))
+        elif fields is None:
+            hydrated.append(dict(result))
+        else:
+            hydrated.append({field: result[field] for field in fields if field in result})
+    return hydrated
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地语义检索 - 中文字符n-gram按语料词表编号，以稀疏倒排形式存储词频，按TF-IDF加权后计算余弦相似度，不依赖网络或外部模型
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 中文按单字和相邻两字切分
+NGRAM_SIZES = (1, 2)
+
+# 连续的汉字切分为字符n-gram，连续的字母数字作为一个词
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[a-z0-9]+")
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索用的词项
+
+    参数:
+        text: 任意文本
+
+    返回:
+        汉字的字符n-gram和字母数字词
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if not _CJK_PATTERN.match(run):
+            tokens.append(run)
+            continue
+        for n in NGRAM_SIZES:
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return tokens
+
+def _log_tf(counts: Counter) -> Tuple[List[str], List[float]]:
+    """返回词项及其对数词频"""
+    terms = list(counts)
+    return terms, [1.0 + math.log(counts[term]) for term in terms]
+
+
+class SemanticIndex:
+    """
+    文本的稀疏词频矩阵，查询时按当前文档频率计算TF-IDF余弦相似度
+
+    词项按在语料中首次出现的顺序编号，不同词项不会共用同一维；查询中语料没有的词项只计入查询向量的范数。
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        """
+        将文本编码为词频矩阵
+
+        参数:
+            texts: 文本序列，矩阵的行号即序列下标
+        """
+        # 词项 -> 列号
+        self.vocabulary: Dict[str, int] = {}
+        self._doc_freq: List[int] = []
+        self._size = 0
+        # 每行命中的列号和对数词频，查询前合并为按列排序的倒排数组
+        self._row_columns: List[np.ndarray] = []
+        self._row_weights: List[np.ndarray] = []
+
+        # 按列排序的倒排数组: 列c的行号和词频位于 [_column_starts[c], _column_starts[c + 1])
+        self._posting_rows = np.zeros(0, dtype=np.int32)
+        self._posting_weights = np.zeros(0, dtype=np.float32)
+        self._column_starts = np.zeros(1, dtype=np.int64)
+        self._idf: Optional[np.ndarray] = None
+        self._row_norms: Optional[np.ndarray] = None
+        # 追加文本与重建倒排数组互斥，查询拿到的始终是完整的一组数组
+        self._lock = threading.Lock()
+
+        for text in texts:
+            self._append(text)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _append(self, text: str) -> int:
+        terms, weights = _log_tf(Counter(tokenize(text)))
+        columns = []
+        for term in terms:
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = len(self.vocabulary)
+                self.vocabulary[term] = column
+                self._doc_freq.append(0)
+            self._doc_freq[column] += 1
+            columns.append(column)
+        self._row_columns.append(np.array(columns, dtype=np.int32))
+        self._row_weights.append(np.array(weights, dtype=np.float32))
+        self._size += 1
+        # 文档频率变化，下次查询时重新计算IDF、行范数和倒排数组
+        self._idf = None
+        return self._size - 1
+
+    def add(self, text: str) -> int:
+        """
+        追加一条文本
+
+        参数:
+            text: 文本
+
+        返回:
+            新文本的行号
+        """
+        with self._lock:
+            return self._append(text)
+
+    def _weights(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """返回(IDF, 行范数, 倒排行号, 倒排词频, 列起点)，文本变化后在锁内重建一次"""
+        with self._lock:
+            if self._idf is None:
+                doc_freq = np.array(self._doc_freq, dtype=np.float32)
+                idf = np.log((1.0 + self._size) / (1.0 + doc_freq)).astype(np.float32) + 1.0
+                lengths = np.array([len(columns) for columns in self._row_columns], dtype=np.int64)
+                rows = np.repeat(np.arange(self._size, dtype=np.int32), lengths)
+                columns = np.concatenate(self._row_columns) if self._row_columns else np.zeros(0, dtype=np.int32)
+                weights = np.concatenate(self._row_weights) if self._row_weights else np.zeros(0, dtype=np.float32)
+
+                # 行向量 tf * idf 的范数
+                self._row_norms = np.sqrt(np.bincount(rows, weights=(weights * idf[columns]) ** 2,
+                                                      minlength=self._size)).astype(np.float32)
+                order = np.argsort(columns, kind="stable")
+                self._posting_rows = rows[order]
+                self._posting_weights = weights[order]
+                self._column_starts = np.concatenate(
+                    ([0], np.cumsum(np.bincount(columns, minlength=len(doc_freq))))
+                )
+                self._idf = idf
+            return self._idf, self._row_norms, self._posting_rows, self._posting_weights, self._column_starts
+
+    def similarities(self, text: str) -> np.ndarray:
+        """
+        计算查询文本与全部文本的余弦相似度
+
+        参数:
+            text: 查询文本
+
+        返回:
+            与行号对应的相似度数组，查询中没有可检索的词项时全为0
+        """
+        idf, row_norms, posting_rows, posting_weights, column_starts = self._weights()
+        size = len(row_norms)
+        terms, weights = _log_tf(Counter(tokenize(text)))
+        if not terms or size == 0:
+            return np.zeros(size, dtype=np.float32)
+
+        # 语料中没有出现过的词项(文档频率为0)的IDF
+        unseen_idf = math.log(1.0 + size) + 1.0
+        norm_squared = 0.0
+        rows: List[np.ndarray] = []
+        contributions: List[np.ndarray] = []
+        for term, weight in zip(terms, weights):
+            column = self.vocabulary.get(term)
+            if column is None or column >= len(idf):
+                norm_squared += (weight * unseen_idf) ** 2
+                continue
+            term_idf = float(idf[column])
+            norm_squared += (weight * term_idf) ** 2
+            # (tf * idf) · (q * idf) = tf · (q * idf * idf)，只遍历查询词项的倒排
+            start, end = column_starts[column], column_starts[column + 1]
+            rows.append(posting_rows[start:end])
+            contributions.append(posting_weights[start:end] * (weight * term_idf * term_idf))
+
+        if not rows:
+            return np.zeros(size, dtype=np.float32)
+        dots = np.bincount(np.concatenate(rows), weights=np.concatenate(contributions), minlength=size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims = (dots / (row_norms * math.sqrt(norm_squared))).astype(np.float32)
+        return np.nan_to_num(sims, copy=False)
+
+
+def top_similar(sims: np.ndarray, k: int, min_similarity: float = 0.0) -> List[int]:
+    """
+    取相似度最高的k个行号
+
+    参数:
+        sims: SemanticIndex.similarities返回的相似度数组
+        k: 返回条数
+        min_similarity: 相似度下限，不超过该值的行不返回
+
+    返回:
+        按相似度降序排列的行号，同分按行号升序
+    """
+    matched = np.flatnonzero(sims > min_similarity)
+    if len(matched) > k:
+        if k <= 0:
+            return []
+        kth = sims[matched[np.argpartition(-sims[matched], k - 1)[k - 1]]]
+        above = matched[sims[matched] > kth]
+        ties = matched[sims[matched] == kth][:k - len(above)]
+        matched = np.concatenate([above, ties])
+    order = np.lexsort((matched, -sims[matched]))
+    return matched[order].tolist()
@@ -5,24 +5,152 @@
 用户画像数据库 - 处理用户画像的存储和检索
 """
 
+import copy
 import logging
 import os
 import json
-from typing import Any, Dict, List, Optional
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+from itertools import chain, count, islice
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from care_elite.database import history_archive
+from care_elite.database.profile_store import LockStripes, MemoryProfileBackend, ProfileBackend
+from care_elite.database.records import ConversationTurn, as_profile_record
+from care_elite.utils.executor import run_in_thread
+from care_elite.utils.id_generator import new_profile_id
 
 logger = logging.getLogger(__name__)
 
-# 模拟数据库，实际项目中应当使用MongoDB等数据库
-# 存储结构为 user_id -> profile_data
+# 默认的内存存储，存储结构为 user_id -> UserProfile记录
+# 需要持久化时通过set_profile_backend切换到SQLite等后端
 USER_PROFILES = {}
 
+_backend: ProfileBackend = MemoryProfileBackend(USER_PROFILES)
+
+# 同一画像的读改写在同一把分段锁内串行，不同画像之间不使用全局锁
+PROFILE_LOCK_STRIPES = int(os.environ.get("CARE_ELITE_PROFILE_LOCK_STRIPES", "64"))
+_profile_locks = LockStripes(PROFILE_LOCK_STRIPES)
+
+# 画像变化监听器，每次写入后以(画像ID, 新版本号)调用
+_profile_listeners: List[Callable[[str, int], None]] = []
+
+# 本进程内只增不减的写入序号，画像ID -> 最近一次写入时取得的序号，用作结果缓存的画像版本
+_write_sequence = count(1)
+# 记录写入序号的画像数上限，超出时淘汰最久未写入的画像
+PROFILE_REVISION_LIMIT = int(os.environ.get("CARE_ELITE_PROFILE_REVISION_LIMIT", "100000"))
+_profile_revisions: "OrderedDict[str, int]" = OrderedDict()
+# 已淘汰画像中最大的写入序号，没有记录的画像以它作为序号
+_revision_floor = 0
+_revisions_lock = threading.Lock()
+
+def get_profile_backend() -> ProfileBackend:
+    """获取当前的用户画像存储后端"""
+    return _backend
+
+def set_profile_backend(backend: ProfileBackend) -> ProfileBackend:
+    """
+    切换用户画像存储后端
+
+    参数:
+        backend: 新的存储后端
+
+    返回:
+        原有的存储后端，由调用方决定是否关闭
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    logger.info(f"用户画像存储后端: {type(backend).__name__}")
+    return previous
+
+def profile_lock(profile_id: str) -> Any:
+    """
+    获取画像对应的分段锁（可重入），持有期间其它线程不能修改该画像
+    
+    参数:
+        profile_id: 用户画像ID
+        
+    返回:
+        可用于with语句的锁
+    """
+    return _profile_locks.for_key(profile_id)
+
+def add_profile_listener(listener: Callable[[str, int], None]) -> None:
+    """
+    注册画像变化监听器，save/update/add_conversation_history等写入完成后调用
+
+    参数:
+        listener: 接收(画像ID, 新版本号)的函数；在持有画像锁的写入线程中调用，不应阻塞
+    """
+    _profile_listeners.append(listener)
+
+def remove_profile_listener(listener: Callable[[str, int], None]) -> None:
+    """
+    移除画像变化监听器
+
+    参数:
+        listener: 之前注册的函数
+    """
+    try:
+        _profile_listeners.remove(listener)
+    except ValueError:
+        pass
+
+def _notify_profile_changed(profile_id: str, version: int) -> None:
+    for listener in list(_profile_listeners):
+        try:
+            listener(profile_id, version)
+        except Exception as e:
+            logger.error(f"画像变化监听器执行失败: {str(e)}")
+
+def _write_profile(profile_id: str, profile: Dict[str, Any]) -> None:
+    """在存储中的版本号上加一、归档较早的对话并写入存储后端，再通知监听器，调用方需持有画像锁"""
+    # 版本号以存储中的记录为准，传入的新字典不会把版本号重置为1
+    stored = _backend.get(profile_id)
+    profile["version"] = (stored.get("version", 0) if stored else 0) + 1
+    history_archive.archive_cold_turns(_backend, profile_id, profile)
+    _backend.put(profile_id, profile)
+    # 写入存储之后再更新序号：先读序号再读画像的一方最多把新画像的结果记在旧序号下，不会反过来
+    _record_revision(profile_id)
+    _notify_profile_changed(profile_id, profile["version"])
+
+def _record_revision(profile_id: str) -> None:
+    """为画像取得新的写入序号，并淘汰超出上限的最久未写入的记录"""
+    global _revision_floor
+    with _revisions_lock:
+        _profile_revisions[profile_id] = next(_write_sequence)
+        _profile_revisions.move_to_end(profile_id)
+        while len(_profile_revisions) > PROFILE_REVISION_LIMIT:
+            _, revision = _profile_revisions.popitem(last=False)
+            _revision_floor = max(_revision_floor, revision)
+
+def profile_revision(profile_id: str) -> int:
+    """
+    画像在本进程内最近一次写入的序号，每次写入都变大，画像删除后重建也不会与之前的序号重复
+
+    需要与画像内容对应时先取序号再读画像。没有记录的画像(本进程未写入过或记录已被淘汰)返回
+    已淘汰记录中最大的序号：它不小于该画像以前取得的任何序号，且小于之后的写入取得的序号，
+    同一个值对应的画像内容始终相同。
+
+    参数:
+        profile_id: 用户画像ID
+
+    返回:
+        写入序号
+    """
+    with _revisions_lock:
+        return _profile_revisions.get(profile_id, _revision_floor)
+
 def save_user_profile(profile_data: Dict[str, Any]) -> str:
     """
     保存用户画像到数据库
     
     参数:
-        profile_data: 用户画像数据
+        profile_data: 用户画像数据，字典或UserProfile记录；保存的是转换后的记录，
+            之后需通过get_user_profile取得记录再修改
         
     返回:
         用户画像ID
@@ -30,12 +158,14 @@ def save_user_profile(profile_data: Dict[str, Any]) -> str:
     profile_id = profile_data.get("profile_id")
     
     if not profile_id:
-        # 生成新的profile_id
-        profile_id = f"user_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        # 生成新的profile_id，按时间排序且并发创建时不会冲突
+        profile_id = new_profile_id()
         profile_data["profile_id"] = profile_id
     
-    # 保存到模拟数据库
-    USER_PROFILES[profile_id] = profile_data
+    # 以紧凑记录保存到存储后端，字典形式的画像在此转换一次
+    profile = as_profile_record(profile_data)
+    with profile_lock(profile_id):
+        _write_profile(profile_id, profile)
     
     logger.info(f"保存用户画像: {profile_id}")
     return profile_id
@@ -50,7 +180,7 @@ def get_user_profile(profile_id: str) -> Optional[Dict[str, Any]]:
     返回:
         用户画像数据，如果不存在则返回None
     """
-    profile = USER_PROFILES.get(profile_id)
+    profile = _backend.get(profile_id)
     
     if not profile:
         logger.warning(f"用户画像不存在: {profile_id}")
@@ -59,35 +189,106 @@ def get_user_profile(profile_id: str) -> Optional[Dict[str, Any]]:
     logger.info(f"获取用户画像: {profile_id}")
     return profile
 
-def update_user_profile(profile_id: str, update_data: Dict[str, Any]) -> bool:
+def _merge(original: MutableMapping, update: Mapping) -> None:
+    """递归合并嵌套字典"""
+    for key, value in update.items():
+        if key in original and isinstance(original[key], MutableMapping) and isinstance(value, Mapping):
+            _merge(original[key], value)
+        else:
+            original[key] = value
+
+def modify_user_profile(profile_id: str, modifier: Callable[[Dict[str, Any]], Any],
+                        expected_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    在画像锁内原子地读改写用户画像
+    
+    参数:
+        profile_id: 用户画像ID
+        modifier: 原地修改画像副本的函数，返回False或抛出异常时放弃写入，存储中的画像不受影响
+        expected_version: 期望的画像版本，与当前版本不一致时不修改
+        
+    返回:
+        修改后的用户画像；画像不存在、版本不一致或放弃写入时返回None
+    """
+    with profile_lock(profile_id):
+        profile = _backend.get(profile_id)
+        if not profile:
+            logger.warning(f"修改失败，用户画像不存在: {profile_id}")
+            return None
+        if expected_version is not None and profile.get("version", 0) != expected_version:
+            logger.warning(f"修改失败，用户画像版本已变化: {profile_id}")
+            return None
+        # 在副本上修改，成功后整体替换；读者只会看到修改前或修改后的完整画像
+        profile = copy.deepcopy(profile)
+        if modifier(profile) is False:
+            return None
+        _write_profile(profile_id, profile)
+        return profile
+
+async def modify_user_profile_async(profile_id: str, modifier: Callable[[Dict[str, Any]], Any],
+                                    expected_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
     """
-    更新用户画像信息
+    modify_user_profile的异步版本，在线程池中等待画像锁，不阻塞事件循环
+    
+    参数:
+        profile_id: 用户画像ID
+        modifier: 原地修改画像副本的函数，返回False时放弃写入
+        expected_version: 期望的画像版本
+        
+    返回:
+        修改后的用户画像；未修改时返回None
+    """
+    return await run_in_thread(modify_user_profile, profile_id, modifier, expected_version)
+
+def update_user_profile(profile_id: str, update_data: Dict[str, Any],
+                        expected_version: Optional[int] = None) -> bool:
+    """
+    原子地将更新数据深度合并到用户画像
     
     参数:
         profile_id: 用户画像ID
         update_data: 要更新的用户画像数据
+        expected_version: 可选的期望画像版本，与当前版本不一致时不更新
         
     返回:
         更新是否成功
     """
-    profile = get_user_profile(profile_id)
-    
-    if not profile:
-        logger.warning(f"更新失败，用户画像不存在: {profile_id}")
+    if modify_user_profile(profile_id, lambda profile: _merge(profile, update_data), expected_version) is None:
+        logger.warning(f"更新失败: {profile_id}")
         return False
     
-    # 递归更新嵌套字典
-    def update_dict(original, update):
-        for key, value in update.items():
-            if key in original and isinstance(original[key], dict) and isinstance(value, dict):
-                update_dict(original[key], value)
-            else:
-                original[key] = value
+    logger.info(f"更新用户画像: {profile_id}")
+    return True
+
+async def update_user_profile_async(profile_id: str, update_data: Dict[str, Any],
+                                    expected_version: Optional[int] = None) -> bool:
+    """update_user_profile的异步版本，在线程池中等待画像锁"""
+    return await run_in_thread(update_user_profile, profile_id, update_data, expected_version)
+
+def compare_and_set_profile(profile_id: str, expected_version: int, profile_data: Dict[str, Any]) -> bool:
+    """
+    当画像的当前版本等于expected_version时整体替换画像
     
-    update_dict(profile, update_data)
-    USER_PROFILES[profile_id] = profile
+    参数:
+        profile_id: 用户画像ID
+        expected_version: 期望的画像版本，画像不存在时视为0
+        profile_data: 新的画像数据
+        
+    返回:
+        是否替换成功
+    """
+    with profile_lock(profile_id):
+        current = _backend.get(profile_id)
+        current_version = current.get("version", 0) if current else 0
+        if current_version != expected_version:
+            logger.warning(f"替换失败，用户画像版本已变化: {profile_id} {expected_version} -> {current_version}")
+            return False
+        
+        profile = as_profile_record(profile_data)
+        profile["profile_id"] = profile_id
+        _write_profile(profile_id, profile)
     
-    logger.info(f"更新用户画像: {profile_id}")
+    logger.info(f"替换用户画像: {profile_id}")
     return True
 
 def add_conversation_history(profile_id: str, role: str, content: str) -> bool:
@@ -102,25 +303,54 @@ def add_conversation_history(profile_id: str, role: str, content: str) -> bool:
     返回:
         添加是否成功
     """
-    profile = get_user_profile(profile_id)
+    # 添加对话记录
+    conversation_entry = ConversationTurn(role=role, content=content, timestamp=time.time())
     
-    if not profile:
+    def append_turn(profile: Dict[str, Any]) -> None:
+        # 确保conversation_history字段存在
+        if "conversation_history" not in profile:
+            profile["conversation_history"] = []
+        profile["conversation_history"].append(conversation_entry)
+    
+    if modify_user_profile(profile_id, append_turn) is None:
         logger.warning(f"添加对话历史失败，用户画像不存在: {profile_id}")
         return False
     
-    # 确保conversation_history字段存在
-    if "conversation_history" not in profile:
-        profile["conversation_history"] = []
+    logger.info(f"添加对话历史: {profile_id}, 角色: {role}")
+    return True 
+
+def iter_archived_turns(profile_id: str, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    按需读回已归档的对话历史
     
-    # 添加对话记录
-    conversation_entry = {
-        "role": role,
-        "content": content,
-        "timestamp": datetime.now().isoformat()
-    }
+    参数:
+        profile_id: 用户画像ID
+        start: 起始轮次(从0开始，按全部对话计数)
+        
+    返回:
+        已归档对话记录的迭代器，不包含画像中保留的最近对话
+    """
+    return history_archive.iter_archived_turns(_backend, profile_id, start)
+
+def iter_conversation_history(profile_id: str, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    按时间顺序遍历完整的对话历史，先读归档段，再接上画像中保留的最近对话
     
-    profile["conversation_history"].append(conversation_entry)
-    USER_PROFILES[profile_id] = profile
+    参数:
+        profile_id: 用户画像ID
+        start: 起始轮次(从0开始，按全部对话计数)
+        
+    返回:
+        对话记录的迭代器
+    """
+    profile = get_user_profile(profile_id)
+    if not profile:
+        return iter(())
     
-    logger.info(f"添加对话历史: {profile_id}, 角色: {role}")
-    return True 
\ No newline at end of file
+    archived = profile.get("archived_turns", 0)
+    hot_turns = profile.get("conversation_history", [])[max(start - archived, 0):]
+    if start >= archived:
+        return iter(hot_turns)
+    # 只读取画像快照之前归档的轮次，遍历期间新归档的对话不会与保留部分重复
+    archived_turns = islice(history_archive.iter_archived_turns(_backend, profile_id, start), archived - start)
+    return chain(archived_turns, hot_turns)
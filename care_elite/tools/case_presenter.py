@@ -6,82 +6,78 @@
 """
 
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from care_elite.database.user_profile import get_user_profile
-from care_elite.database.case_database import search_similar_cases
+from care_elite.database.case_database import search_similar_cases, success_cases_version
+from care_elite.database.pagination import next_cursor
+from care_elite.database.scored_record import hydrate_results
+from care_elite.database.user_profile import profile_revision
+from care_elite.utils.result_cache import RECOMMENDATION_CACHE
 
 logger = logging.getLogger(__name__)
 
-async def present_case(user_profile_id: str, case_type: str = "similar") -> Dict[str, Any]:
+# 每页默认返回的案例条数
+DEFAULT_CASE_LIMIT = 5
+
+async def present_case(user_profile_id: str, case_type: str = "similar", limit: Optional[int] = DEFAULT_CASE_LIMIT,
+                       cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     展示与用户情况相近的成功合作案例
     
     参数:
         user_profile_id: 用户画像ID
         case_type: 案例类型，可选值: "similar"(相似案例), "best"(最佳案例)
+        limit: 每页返回的案例条数
+        cursor: 上一页返回的next_cursor，为空时返回第一页
     
     返回:
-        匹配的案例信息
+        匹配的案例信息；画像和案例库未变化时直接返回缓存的结果
     """
     logger.info(f"为用户 {user_profile_id} 展示{case_type}案例...")
     
-    # TODO: 实际实现案例匹配和展示
-    # 以下为mock实现
+    cache_version = (profile_revision(user_profile_id), success_cases_version())
+    cached = RECOMMENDATION_CACHE.get(("present_case", user_profile_id, case_type, limit, cursor), cache_version)
+    if cached is not None:
+        logger.info(f"命中案例结果缓存: {user_profile_id}")
+        return cached
+    return compute_case_presentation(user_profile_id, case_type, limit, cursor)
+
+def compute_case_presentation(user_profile_id: str, case_type: str = "similar",
+                              limit: Optional[int] = DEFAULT_CASE_LIMIT,
+                              cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    计算案例展示结果并写入推荐结果缓存，不读取缓存，也不计入缓存的命中统计；同步执行，可在线程池中调用
+
+    参数:
+        与present_case相同
+
+    返回:
+        与present_case相同的结果，检索失败时的错误结果不写入缓存
+    """
+    # 先取画像的写入序号和案例库版本再检索，期间的写入只会让缓存条目提前失效
+    cache_key = ("present_case", user_profile_id, case_type, limit, cursor)
+    cache_version = (profile_revision(user_profile_id), success_cases_version())
     
-    # 模拟匹配的案例
-    cases = [
-        {
-            "case_id": "case001",
-            "customer_info": {
-                "age": 28,
-                "delivery_type": "顺产",
-                "child_count": 1,
-                "initial_concerns": ["体重恢复", "母乳喂养"]
-            },
-            "stay_info": {
-                "package": "高级产后护理套餐",
-                "duration": "28天",
-                "start_date": "2023-01-15",
-                "end_date": "2023-02-12"
-            },
-            "results": {
-                "weight_recovery": {
-                    "before": "65kg",
-                    "after": "56kg",
-                    "target": "54kg",
-                    "achievement": "恢复至目标体重的91%"
-                },
-                "breastfeeding": {
-                    "before": "困难，乳汁分泌不足",
-                    "after": "顺利，纯母乳喂养",
-                    "achievement": "成功建立充足奶源"
-                },
-                "sleep_quality": {
-                    "before": "每晚睡眠不足4小时",
-                    "after": "每晚连续睡眠6-7小时",
-                    "achievement": "睡眠质量显著提升"
-                }
-            },
-            "testimonial": "在月子中心的28天是我产后恢复的黄金时期，专业的团队让我能够专注于恢复和照顾宝宝，不必担心其他琐事。我的体重恢复超出预期，母乳喂养也顺利建立，非常感谢中心的每一位工作人员！",
-            "images": [
-                {
-                    "url": "https://example.com/cases/001/before.jpg",
-                    "description": "入住前"
-                },
-                {
-                    "url": "https://example.com/cases/001/after.jpg",
-                    "description": "结束时"
-                }
-            ]
+    try:
+        page = search_similar_cases(user_profile_id, case_type, limit=limit, cursor=cursor)
+    except ValueError as e:
+        logger.error(f"案例检索失败: {str(e)}")
+        return {
+            "user_profile_id": user_profile_id,
+            "case_type": case_type,
+            "status": "error",
+            "message": str(e)
         }
-    ]
     
     # 返回结果
-    return {
+    result = {
         "user_profile_id": user_profile_id,
         "case_type": case_type,
-        "matching_cases": cases,
+        "matching_cases": hydrate_results(page),
+        # 游标记录检索前读取的案例库替换次数，热加载后旧游标被拒绝
+        "next_cursor": next_cursor(page, limit, cache_version[1][0]),
         "status": "success",
         "message": "成功匹配相似案例"
-    } 
\ No newline at end of file
+    }
+    RECOMMENDATION_CACHE.put(cache_key, cache_version, result)
+    return result
@@ -5,15 +5,43 @@
 信息收集工具 - 处理用户和销售的语音，分析内容并生成用户画像
 """
 
+import asyncio
 import logging
-from typing import Any, Dict
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 
-from care_elite.voice.speech_to_text import speech_to_text
-from care_elite.utils.profile_generator import generate_user_profile
-from care_elite.database.user_profile import save_user_profile, get_user_profile
+from care_elite.voice.speech_to_text import (speech_to_text_async, get_stream_session, close_stream_session,
+                                             expire_stream_sessions, STREAM_SESSION_IDLE_SECONDS)
+from care_elite.utils.executor import run_in_thread
+from care_elite.utils.profile_generator import generate_user_profile, generate_user_profile_async, extend_user_profile
+from care_elite.database.records import to_plain
+from care_elite.database.user_profile import save_user_profile, get_user_profile, modify_user_profile_async
 
 logger = logging.getLogger(__name__)
 
+# 流式会话绑定的用户画像，存储结构为 session_id -> {"profile_id", "turn_started"}
+_STREAM_PROFILES: Dict[str, Dict[str, Any]] = {}
+# 会话锁在会话结束后保留，直到结束记录过期，等待同一把锁的音频块始终串行
+_STREAM_LOCKS: Dict[str, asyncio.Lock] = {}
+# 已结束的会话，存储结构为 session_id -> (结束时间, 用户画像ID)，在会话空闲期限内拒绝迟到或重试的音频块
+_COMPLETED_STREAMS: Dict[str, Tuple[float, str]] = {}
+
+def _expire_streams() -> None:
+    """清理空闲超时的会话和过期的结束记录，有音频块正在处理或等待的会话锁保留"""
+    expired = expire_stream_sessions()
+    for session_id in expired:
+        _STREAM_PROFILES.pop(session_id, None)
+    now = time.monotonic()
+    completed = [session_id for session_id, (completed_at, _) in _COMPLETED_STREAMS.items()
+                 if now - completed_at > STREAM_SESSION_IDLE_SECONDS]
+    for session_id in completed:
+        del _COMPLETED_STREAMS[session_id]
+    for session_id in expired + completed:
+        lock = _STREAM_LOCKS.get(session_id)
+        if lock is not None and not lock.locked():
+            del _STREAM_LOCKS[session_id]
+
 async def collect_information(audio_data: str, role: str) -> Dict[str, Any]:
     """
     收集并分析用户语音信息，生成用户画像
@@ -27,30 +55,34 @@ async def collect_information(audio_data: str, role: str) -> Dict[str, Any]:
     """
     logger.info(f"收集{role}的语音信息...")
     
-    # TODO: 实际实现语音转文字和分析
-    # 以下为mock实现
-    
-    # 模拟语音转文字
-    text = "这是模拟的语音转文字结果"
-    
-    # 模拟用户画像生成
-    profile_data = {
-        "profile_id": "user123",
-        "basic_info": {
-            "pregnancy_status": "产后2周",
-            "delivery_type": "顺产",
-            "child_count": 1,
-            "concerns": ["体重恢复", "母乳喂养", "睡眠质量"]
-        },
-        "preferences": {
-            "budget_level": "高端",
-            "stay_duration": "28天",
-            "dietary_restrictions": ["无海鲜过敏"]
-        },
-        "conversation_history": [
-            {"role": role, "content": text, "timestamp": "2023-06-01T10:30:00Z"}
-        ]
-    }
+    # 语音识别在线程池中执行，避免阻塞其它工具调用
+    try:
+        text = await speech_to_text_async(audio_data)
+    except asyncio.TimeoutError:
+        return {
+            "status": "error",
+            "message": "语音识别超时"
+        }
+    
+    if not text:
+        return {
+            "text": "",
+            "status": "error",
+            "message": "语音识别失败"
+        }
+    
+    conversation_history = [
+        {"role": role, "content": text, "timestamp": datetime.now().isoformat()}
+    ]
+    # 画像提取在线程池中执行，不占用事件循环
+    try:
+        profile_data = await generate_user_profile_async(conversation_history)
+    except asyncio.TimeoutError:
+        return {
+            "text": text,
+            "status": "error",
+            "message": "用户画像提取超时"
+        }
     
     # 返回结果
     return {
@@ -58,4 +90,101 @@ async def collect_information(audio_data: str, role: str) -> Dict[str, Any]:
         "user_profile": profile_data,
         "status": "success",
         "message": "成功处理语音并更新用户画像"
-    } 
\ No newline at end of file
+    }
+
+async def collect_information_chunk(session_id: str, seq: int, audio_chunk: str, role: str,
+                                    is_final: bool = False, user_profile_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    流式收集语音信息：按序号接收音频块，每块识别后立即增量更新用户画像
+    
+    参数:
+        session_id: 流式会话ID，同一段录音的所有音频块使用同一个ID
+        seq: 音频块序号，从0开始
+        audio_chunk: 音频块数据(Base64编码)
+        role: 发言角色，可选值: "user"(用户) 或 "sales"(销售)
+        is_final: 是否为最后一个音频块
+        user_profile_id: 可选的已有用户画像ID，不提供时为会话新建画像
+    
+    返回:
+        本块识别出的文字和更新后的用户画像
+    """
+    logger.info(f"收集{role}的流式语音信息: {session_id}#{seq}")
+    
+    _expire_streams()
+    
+    # 同一会话的音频块串行处理，保证部分转写按序并入画像；不同会话之间并发
+    lock = _STREAM_LOCKS.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        completed = _COMPLETED_STREAMS.get(session_id)
+        if completed is not None:
+            # 迟到或重试的音频块不再识别，也不为其新建画像
+            logger.warning(f"流式会话已结束，忽略音频块: {session_id}#{seq}")
+            return {
+                "session_id": session_id,
+                "seq": seq,
+                "user_profile_id": completed[1],
+                "status": "error",
+                "message": "流式会话已结束"
+            }
+        
+        session = get_stream_session(session_id)
+        try:
+            # 识别在线程池中执行，不阻塞事件循环；超时的调用识别出的文字留在会话中，由下一次调用取走
+            await run_in_thread(session.add_chunk, seq, audio_chunk, is_final)
+        except (ValueError, asyncio.TimeoutError) as e:
+            logger.error(f"流式语音识别失败: {session_id}#{seq} {str(e)}")
+            return {
+                "session_id": session_id,
+                "seq": seq,
+                "status": "error",
+                "message": str(e) or "语音识别超时"
+            }
+        texts = session.take_texts()
+    
+        # 取得会话绑定的用户画像，首个音频块时创建
+        binding = _STREAM_PROFILES.get(session_id)
+        profile = get_user_profile(binding["profile_id"]) if binding else None
+        if profile is None:
+            profile = get_user_profile(user_profile_id) if user_profile_id else None
+            if profile is None:
+                profile = generate_user_profile([])
+                # 沿用调用方给出的或会话已绑定的画像ID，不另外生成新的画像
+                profile_id = user_profile_id or (binding["profile_id"] if binding else None)
+                if profile_id:
+                    profile["profile_id"] = profile_id
+            binding = {"profile_id": save_user_profile(profile), "turn_started": False}
+            _STREAM_PROFILES[session_id] = binding
+            # 保存时转换为紧凑记录，后续通过modify_user_profile_async在画像锁内更新
+            profile = get_user_profile(binding["profile_id"])
+    
+        # 部分转写结果并入同一轮发言，只处理新增文字；在画像锁内原子地更新，与其它会话的写入互不覆盖
+        def apply_texts(current: Dict[str, Any]) -> None:
+            for text in texts:
+                extend_user_profile(current, text, role, new_turn=not binding["turn_started"])
+                binding["turn_started"] = True
+        
+        if texts:
+            profile = await modify_user_profile_async(binding["profile_id"], apply_texts) or profile
+    
+        result = {
+            "session_id": session_id,
+            "seq": seq,
+            "text": "".join(texts),
+            "is_complete": session.is_complete,
+            "user_profile_id": binding["profile_id"],
+            "user_profile": {
+                "profile_id": binding["profile_id"],
+                "basic_info": to_plain(profile.get("basic_info", {})),
+                "preferences": to_plain(profile.get("preferences", {}))
+            },
+            "status": "success",
+            "message": "成功处理语音片段并更新用户画像"
+        }
+    
+        if session.is_complete:
+            result["transcript"] = session.transcript
+            close_stream_session(session_id)
+            _STREAM_PROFILES.pop(session_id, None)
+            _COMPLETED_STREAMS[session_id] = (time.monotonic(), binding["profile_id"])
+    
+        return result
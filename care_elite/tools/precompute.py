@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+推荐结果预计算 - 画像变化后在后台合并短时间内的多次变化，重新计算该画像已缓存的话术和案例推荐
+
+只刷新推荐结果缓存中已有的条目(按原来的查询参数重新计算)，不会为没有调用过工具的画像新增条目，
+预计算不会把正在使用的缓存条目挤出LRU。打分在线程池中执行，结果直接写入缓存，不经过工具的缓存读取，
+不影响缓存的命中统计。
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from care_elite.database.user_profile import add_profile_listener, get_user_profile, remove_profile_listener
+from care_elite.tools.case_presenter import compute_case_presentation
+from care_elite.tools.service_recommender import compute_service_recommendation
+from care_elite.utils.executor import run_in_thread
+from care_elite.utils.result_cache import RECOMMENDATION_CACHE
+
+# 缓存键的工具名 -> 计算并写入缓存的同步函数，参数为画像ID和缓存键中的查询参数
+_COMPUTERS = {
+    "recommend_service": compute_service_recommendation,
+    "present_case": compute_case_presentation
+}
+
+logger = logging.getLogger(__name__)
+
+# 画像最后一次变化后等待的时间(秒)，期间的再次变化合并为一次预计算
+PRECOMPUTE_DEBOUNCE = float(os.environ.get("CARE_ELITE_PRECOMPUTE_DEBOUNCE", "0.5"))
+
+
+class RecommendationPrecomputer:
+    """监听画像变化，在事件循环中的后台任务里预计算推荐结果"""
+
+    def __init__(self, debounce: float = PRECOMPUTE_DEBOUNCE):
+        """
+        参数:
+            debounce: 画像最后一次变化后等待的时间(秒)
+        """
+        self.debounce = debounce
+        self.events = 0
+        self.precomputed = 0
+        self.skipped = 0
+        self.failed = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 画像ID -> 最早可以开始预计算的时间(事件循环时钟)，在队列中的画像才有记录
+        self._due: Dict[str, float] = {}
+
+    def start(self) -> "RecommendationPrecomputer":
+        """在当前运行的事件循环中启动后台任务并注册画像监听器，需在协程中调用"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._task = self._loop.create_task(self._run())
+            add_profile_listener(self.notify)
+        return self
+
+    async def stop(self) -> None:
+        """注销监听器并停止后台任务，未开始的预计算被丢弃"""
+        remove_profile_listener(self.notify)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._due.clear()
+
+    def notify(self, profile_id: str, version: int) -> None:
+        """
+        画像变化监听器，可在任意线程中调用
+
+        参数:
+            profile_id: 用户画像ID
+            version: 新的画像版本号
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._schedule, profile_id)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _schedule(self, profile_id: str) -> None:
+        self.events += 1
+        already_queued = profile_id in self._due
+        # 每次变化都推迟预计算，连续变化只在最后一次之后计算一次
+        self._due[profile_id] = self._loop.time() + self.debounce
+        if not already_queued:
+            self._queue.put_nowait(profile_id)
+
+    async def _run(self) -> None:
+        while True:
+            profile_id = await self._queue.get()
+            try:
+                # 等待期间又有变化时继续等待
+                while True:
+                    delay = self._due[profile_id] - self._loop.time()
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                del self._due[profile_id]
+                await self.precompute(profile_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 单个画像出错不能结束后台任务，否则之后的变化都不再预计算
+                self._due.pop(profile_id, None)
+                self.failed += 1
+                logger.error(f"预计算任务出错: {profile_id}, {str(e)}")
+
+    async def precompute(self, profile_id: str) -> bool:
+        """
+        按推荐结果缓存中该画像已有条目的查询参数重新计算，结果写回缓存
+
+        参数:
+            profile_id: 用户画像ID
+
+        返回:
+            是否完成预计算；画像已删除或没有缓存条目时返回False
+        """
+        try:
+            if await run_in_thread(get_user_profile, profile_id) is None:
+                return False
+            keys = RECOMMENDATION_CACHE.keys(lambda key: key[1] == profile_id)
+            if not keys:
+                self.skipped += 1
+                return False
+            for key in keys:
+                compute = _COMPUTERS.get(key[0])
+                if compute is not None:
+                    # 打分是同步计算，放到线程池中，不阻塞同一事件循环上的工具调用
+                    await run_in_thread(compute, profile_id, *key[2:])
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"预计算推荐结果失败: {profile_id}, {str(e)}")
+            return False
+        self.precomputed += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """预计算统计"""
+        return {
+            "events": self.events,
+            "precomputed": self.precomputed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "pending": len(self._due)
+        }
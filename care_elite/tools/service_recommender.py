@@ -6,58 +6,188 @@
 """
 
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from care_elite.database.user_profile import get_user_profile
-from care_elite.database.sales_experience import search_sales_experience
+from care_elite.database.pagination import next_cursor
+from care_elite.database.scored_record import ScoredRecord
+from care_elite.database.user_profile import get_user_profile, profile_revision
+from care_elite.database.sales_experience import (sales_experience_version, search_sales_experience,
+                                                  search_sales_experience_batch)
+from care_elite.utils.result_cache import RECOMMENDATION_CACHE
 
 logger = logging.getLogger(__name__)
 
-async def recommend_service(user_profile_id: str, query: Optional[str] = None) -> Dict[str, Any]:
+# 每页默认返回的销售心得条数
+DEFAULT_EXPERIENCE_LIMIT = 5
+
+def _build_experience_query(user_profile: Optional[Dict[str, Any]], query: Optional[str]) -> Dict[str, Any]:
+    """根据用户画像和查询语句构造销售心得检索条件"""
+    basic_info = (user_profile or {}).get("basic_info", {})
+    preferences = (user_profile or {}).get("preferences", {})
+
+    tags = list(basic_info.get("concerns", []))
+    persona: Dict[str, Any] = {"concerns": list(basic_info.get("concerns", []))}
+    if basic_info.get("delivery_type") not in (None, "", "未知"):
+        tags.append(basic_info["delivery_type"])
+        persona["delivery_type"] = basic_info["delivery_type"]
+    if preferences.get("budget_level") not in (None, "", "未知"):
+        persona["budget_level"] = preferences["budget_level"]
+    experience_query: Dict[str, Any] = {"tags": tags, "persona": persona}
+    if query:
+        # 查询语句既可能正好是标签，也按语义与心得和话术文本匹配
+        tags.append(query)
+        experience_query["text"] = query
+
+    return experience_query
+
+def _scripts_from_experiences(page: List[ScoredRecord]) -> List[Dict[str, Any]]:
+    """将命中的销售心得展开为话术列表，只取话术相关字段"""
+    scripts = []
+    for exp in page:
+        for script in exp.get("scripts", []):
+            scripts.append({
+                "script_id": f"{exp['id']}_{script['scenario']}",
+                "scenario": script["scenario"],
+                "content": script["content"],
+                "match_score": exp["match_score"]
+            })
+    return scripts
+
+def _recommended_services() -> List[Dict[str, Any]]:
+    """推荐服务列表，目前为mock实现"""
+    # TODO: 实际实现服务推荐
+    return [
+        {
+            "service_id": "postnatal_care_premium",
+            "service_name": "高级产后护理套餐",
+            "description": "全方位的产后护理，包括专业的营养餐、24小时护士看护、专业催乳师服务等",
+            "price": "38800元/28天",
+            "suitable_reasons": ["适合顺产的新妈妈", "对体重恢复有特别关注", "需要专业的母乳喂养指导"]
+        }
+    ]
+
+async def recommend_service(user_profile_id: str, query: Optional[str] = None,
+                            limit: Optional[int] = DEFAULT_EXPERIENCE_LIMIT,
+                            cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     基于用户画像，推荐合适的服务话术
     
     参数:
         user_profile_id: 用户画像ID
-        query: 可选的查询语句，用于精确匹配服务推荐
+        query: 可选的查询语句，与画像匹配分数叠加语义相似度后排序
+        limit: 每页检索的销售心得条数
+        cursor: 上一页返回的next_cursor，为空时返回第一页
     
     返回:
-        推荐的服务信息和话术内容
+        推荐的服务信息和话术内容；画像和销售心得库未变化时直接返回缓存的结果
     """
     logger.info(f"为用户 {user_profile_id} 推荐服务...")
     
-    # TODO: 实际实现用户画像检索和服务推荐
-    # 以下为mock实现
+    cache_version = (profile_revision(user_profile_id), sales_experience_version())
+    cached = RECOMMENDATION_CACHE.get(("recommend_service", user_profile_id, query, limit, cursor), cache_version)
+    if cached is not None:
+        logger.info(f"命中推荐结果缓存: {user_profile_id}")
+        return cached
+    return compute_service_recommendation(user_profile_id, query, limit, cursor)
+
+def compute_service_recommendation(user_profile_id: str, query: Optional[str] = None,
+                                   limit: Optional[int] = DEFAULT_EXPERIENCE_LIMIT,
+                                   cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    计算服务推荐并写入推荐结果缓存，不读取缓存，也不计入缓存的命中统计；同步执行，可在线程池中调用
+
+    参数:
+        与recommend_service相同
+
+    返回:
+        与recommend_service相同的结果，检索失败时的错误结果不写入缓存
+    """
+    # 先取画像的写入序号再读画像，期间的写入只会让缓存条目提前失效
+    cache_version = (profile_revision(user_profile_id), sales_experience_version())
+    cache_key = ("recommend_service", user_profile_id, query, limit, cursor)
+    user_profile = get_user_profile(user_profile_id)
     
-    # 模拟推荐服务和话术
-    recommended_services = [
-        {
-            "service_id": "postnatal_care_premium",
-            "service_name": "高级产后护理套餐",
-            "description": "全方位的产后护理，包括专业的营养餐、24小时护士看护、专业催乳师服务等",
-            "price": "38800元/28天",
-            "suitable_reasons": ["适合顺产的新妈妈", "对体重恢复有特别关注", "需要专业的母乳喂养指导"]
-        }
-    ]
+    recommended_services = _recommended_services()
     
-    sales_scripts = [
-        {
-            "script_id": "weight_recovery",
-            "scenario": "体重恢复关注点",
-            "content": "我们的高级产后护理套餐特别设计了科学的饮食计划，每日由营养师定制，帮助妈妈们在保证营养的同时，科学地恢复产前体重。我们往期的妈妈平均在28天内恢复到孕前体重的85%以上。"
-        },
-        {
-            "script_id": "breastfeeding",
-            "scenario": "母乳喂养困难",
-            "content": "我们的专业催乳师每天会对妈妈进行一对一的指导，解决乳汁分泌不足的问题，并教授正确的哺乳姿势，减轻乳头疼痛。90%的妈妈在我们的帮助下成功进行了纯母乳喂养。"
+    # 销售话术按画像检索销售心得，分页返回
+    experience_query = _build_experience_query(user_profile, query)
+    try:
+        page = search_sales_experience(experience_query, limit=limit, cursor=cursor)
+    except ValueError as e:
+        logger.error(f"销售心得检索失败: {str(e)}")
+        return {
+            "user_profile_id": user_profile_id,
+            "status": "error",
+            "message": str(e)
         }
-    ]
+    sales_scripts = _scripts_from_experiences(page)
     
     # 返回结果
-    return {
+    result = {
         "user_profile_id": user_profile_id,
         "recommended_services": recommended_services,
         "sales_scripts": sales_scripts,
+        # 游标记录检索前读取的心得库替换次数，热加载后旧游标被拒绝
+        "next_cursor": next_cursor(page, limit, cache_version[1][0]),
         "status": "success",
         "message": "成功匹配合适的服务和话术"
-    } 
\ No newline at end of file
+    }
+    RECOMMENDATION_CACHE.put(cache_key, cache_version, result)
+    return result
+
+async def recommend_service_batch(user_profile_ids: List[str], query: Optional[str] = None,
+                                  limit: Optional[int] = DEFAULT_EXPERIENCE_LIMIT) -> Dict[str, Any]:
+    """
+    为多个用户画像批量推荐服务话术，一次遍历话术库完成全部打分
+    
+    参数:
+        user_profile_ids: 用户画像ID列表
+        query: 可选的查询语句，对所有画像生效
+        limit: 每个画像返回的销售心得条数
+    
+    返回:
+        按画像ID分组的推荐结果；不存在的画像ID对应status为error的结果，并列在missing_profile_ids中
+    """
+    logger.info(f"为 {len(user_profile_ids)} 个用户批量推荐服务...")
+    
+    # 重复的画像ID只检索一次
+    unique_ids = list(dict.fromkeys(user_profile_ids))
+    profiles = {profile_id: get_user_profile(profile_id) for profile_id in unique_ids}
+    found_ids = [profile_id for profile_id in unique_ids if profiles[profile_id] is not None]
+    missing_ids = [profile_id for profile_id in unique_ids if profiles[profile_id] is None]
+    
+    queries = [_build_experience_query(profiles[profile_id], query) for profile_id in found_ids]
+    pages = search_sales_experience_batch(queries, limit) if queries else []
+    
+    recommended_services = _recommended_services()
+    pages_by_id = dict(zip(found_ids, pages))
+    results: Dict[str, Dict[str, Any]] = {}
+    for profile_id in unique_ids:
+        if profile_id in pages_by_id:
+            results[profile_id] = {
+                "recommended_services": recommended_services,
+                "sales_scripts": _scripts_from_experiences(pages_by_id[profile_id]),
+                "status": "success"
+            }
+        else:
+            results[profile_id] = {
+                "status": "error",
+                "message": "用户画像不存在"
+            }
+    
+    if not found_ids:
+        return {
+            "results": results,
+            "missing_profile_ids": missing_ids,
+            "status": "error",
+            "message": "用户画像均不存在"
+        }
+    
+    # 返回结果
+    return {
+        "results": results,
+        "missing_profile_ids": missing_ids,
+        "status": "success",
+        "message": f"成功为 {len(found_ids)} 个用户匹配服务和话术"
+                   + (f"，{len(missing_ids)} 个用户画像不存在" if missing_ids else "")
+    }
@@ -9,8 +9,9 @@ import logging
 import os
 import json
 import base64
+import mmap
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -44,17 +45,77 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> No
     
     logger.info(f"日志系统初始化完成，级别: {log_level}")
 
-def save_audio_to_file(audio_data: str, directory: str = "recordings") -> str:
+# 流式处理音频时每块原始字节数，需为3的倍数，保证各块的Base64编码可以直接拼接
+AUDIO_CHUNK_SIZE = 3 * 64 * 1024
+
+def iter_base64_chunks(audio_data: str, chunk_size: int = AUDIO_CHUNK_SIZE // 3 * 4) -> Iterator[str]:
     """
-    将Base64编码的音频数据保存到文件
-    
+    将完整的Base64字符串按固定长度切块
+
     参数:
         audio_data: Base64编码的音频数据
+        chunk_size: 每块字符数
+
+    返回:
+        Base64字符串块的迭代器
+    """
+    for offset in range(0, len(audio_data), chunk_size):
+        yield audio_data[offset:offset + chunk_size]
+
+def iter_base64_decode(chunks: Iterable[str]) -> Iterator[bytes]:
+    """
+    流式解码Base64数据，块边界不必对齐到4个字符
+
+    参数:
+        chunks: Base64字符串块，可包含换行等空白字符
+
+    返回:
+        解码后的字节块迭代器
+    """
+    remainder = ""
+    for chunk in chunks:
+        chunk = remainder + "".join(chunk.split())
+        aligned = len(chunk) - len(chunk) % 4
+        remainder = chunk[aligned:]
+        if aligned:
+            yield base64.b64decode(chunk[:aligned])
+    if remainder:
+        # 末尾不足4个字符时补齐填充后解码
+        yield base64.b64decode(remainder + "=" * (-len(remainder) % 4))
+
+def iter_audio_file_base64(filepath: str, chunk_size: int = AUDIO_CHUNK_SIZE) -> Iterator[str]:
+    """
+    通过内存映射分块读取音频文件并逐块编码为Base64
+
+    参数:
+        filepath: 音频文件路径
+        chunk_size: 每块原始字节数，需为3的倍数
+
+    返回:
+        Base64字符串块的迭代器，依次拼接即为整个文件的Base64编码
+    """
+    if chunk_size <= 0 or chunk_size % 3:
+        raise ValueError("chunk_size必须是3的正整数倍")
+
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), chunk_size):
+                yield base64.b64encode(mapped[offset:offset + chunk_size]).decode("ascii")
+
+def save_audio_stream_to_file(chunks: Iterable[str], directory: str = "recordings") -> str:
+    """
+    将分块的Base64音频数据边解码边写入文件
+
+    参数:
+        chunks: Base64字符串块
         directory: 保存目录，默认为recordings
-        
+
     返回:
         保存的文件路径
     """
+    tmp_path = None
     try:
         # 确保目录存在
         os.makedirs(directory, exist_ok=True)
@@ -64,18 +125,39 @@ def save_audio_to_file(audio_data: str, directory: str = "recordings") -> str:
         filename = f"audio_{timestamp}.wav"
         filepath = os.path.join(directory, filename)
         
-        # 解码并保存音频数据
-        decoded_audio = base64.b64decode(audio_data)
-        with open(filepath, "wb") as f:
-            f.write(decoded_audio)
+        # 逐块解码并写入临时文件，内存中只保留当前块；全部解码成功后再改名，失败时不留下截断的文件
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for decoded_chunk in iter_base64_decode(chunks):
+                f.write(decoded_chunk)
+        os.replace(tmp_path, filepath)
         
         logger.info(f"音频保存成功: {filepath}")
         return filepath
     
     except Exception as e:
         logger.error(f"保存音频失败: {str(e)}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
         return ""
 
+def save_audio_to_file(audio_data: str, directory: str = "recordings") -> str:
+    """
+    将Base64编码的音频数据保存到文件
+    
+    参数:
+        audio_data: Base64编码的音频数据
+        directory: 保存目录，默认为recordings
+        
+    返回:
+        保存的文件路径
+    """
+    # 分块解码，避免一次性生成完整的解码副本
+    return save_audio_stream_to_file(iter_base64_chunks(audio_data), directory)
+
 def load_audio_from_file(filepath: str) -> Optional[str]:
     """
     从文件加载音频数据并转换为Base64编码
@@ -87,9 +169,8 @@ def load_audio_from_file(filepath: str) -> Optional[str]:
         Base64编码的音频数据，如果失败则返回None
     """
     try:
-        with open(filepath, "rb") as f:
-            audio_data = f.read()
-            base64_audio = base64.b64encode(audio_data).decode('utf-8')
+        # 分块编码后拼接，不再先把整个文件读入内存；只需转发时可直接使用iter_audio_file_base64
+        base64_audio = "".join(iter_audio_file_base64(filepath))
         
         logger.info(f"音频加载成功: {filepath}")
         return base64_audio
@@ -120,19 +201,25 @@ def save_json_to_file(data: Dict[str, Any], filepath: str) -> bool:
         logger.error(f"保存JSON数据失败: {str(e)}")
         return False
 
-def load_json_from_file(filepath: str) -> Optional[Dict[str, Any]]:
+# 按JSON lines格式解析的文件扩展名，每行一个JSON值
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+
+def load_json_from_file(filepath: str) -> Optional[Any]:
     """
     从文件加载JSON数据
     
     参数:
-        filepath: 文件路径
+        filepath: 文件路径，扩展名为.jsonl/.ndjson时按JSON lines解析，跳过空行
         
     返回:
-        加载的JSON数据，如果失败则返回None
+        加载的JSON数据（JSON lines文件为各行组成的列表），如果失败则返回None
     """
     try:
         with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            if filepath.lower().endswith(JSON_LINES_EXTENSIONS):
+                data = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
         
         logger.info(f"JSON数据加载成功: {filepath}")
         return data
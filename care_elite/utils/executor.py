@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+执行器 - 将阻塞的语音处理和画像计算从事件循环中卸载到线程池
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 线程池用于IO密集或在原生代码中释放GIL的任务（语音识别、语音合成），以及画像提取等较短的计算
+THREAD_POOL_WORKERS = int(os.environ.get("CARE_ELITE_THREAD_WORKERS", "8"))
+# 单次调用的默认超时时间(秒)
+DEFAULT_TIMEOUT = float(os.environ.get("CARE_ELITE_TASK_TIMEOUT", "60"))
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_pools_lock = threading.Lock()
+
+def configure_executors(thread_workers: Optional[int] = None, default_timeout: Optional[float] = None) -> None:
+    """
+    调整执行器配置，已创建的线程池会被关闭并在下次使用时按新配置重建
+
+    参数:
+        thread_workers: 线程池大小
+        default_timeout: 默认超时时间(秒)
+    """
+    global THREAD_POOL_WORKERS, DEFAULT_TIMEOUT
+    if thread_workers is not None:
+        THREAD_POOL_WORKERS = thread_workers
+    if default_timeout is not None:
+        DEFAULT_TIMEOUT = default_timeout
+    shutdown_executors(wait=False)
+    logger.info(f"执行器配置: 线程池{THREAD_POOL_WORKERS}, 超时{DEFAULT_TIMEOUT}秒")
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """获取线程池，首次使用时创建"""
+    global _thread_pool
+    if _thread_pool is None:
+        with _pools_lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS, thread_name_prefix="care-elite")
+    return _thread_pool
+
+def shutdown_executors(wait: bool = True) -> None:
+    """
+    关闭线程池
+
+    参数:
+        wait: 是否等待正在执行的任务结束
+    """
+    global _thread_pool
+    with _pools_lock:
+        thread_pool, _thread_pool = _thread_pool, None
+    if thread_pool is not None:
+        thread_pool.shutdown(wait=wait)
+
+async def _run(pool: Executor, func: Callable[..., Any], args: tuple, kwargs: dict,
+               timeout: Optional[float]) -> Any:
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        # 已开始执行的任务无法中断，只是不再等待其结果
+        logger.error(f"任务超时({timeout}秒): {getattr(func, '__qualname__', func)}")
+        raise
+
+async def run_in_thread(func: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """
+    在线程池中执行阻塞函数
+
+    参数:
+        func: 要执行的函数
+        *args: 位置参数
+        timeout: 超时时间(秒)，默认为DEFAULT_TIMEOUT
+        **kwargs: 关键字参数
+
+    返回:
+        函数返回值；超时时抛出asyncio.TimeoutError
+    """
+    return await _run(get_thread_pool(), func, args, kwargs, timeout)
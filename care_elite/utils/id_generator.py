@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ID生成器 - 按时间排序、跨进程不冲突的画像ID
+
+ID由三部分组成，均为定长十六进制，字典序即生成顺序:
+    48位毫秒时间戳 | 40位节点号(进程号 + 随机数) | 40位进程内序号
+进程内序号来自itertools.count，在CPython中取值是原子的，生成ID不需要加锁；
+节点号在每个进程（包括fork出的子进程）中重新生成，保证不同进程之间不冲突。
+"""
+
+import itertools
+import os
+import random
+import time
+
+# 进程号占节点号的高22位，剩余18位为随机数
+_PID_BITS = 22
+_RANDOM_BITS = 18
+_SEQUENCE_MASK = (1 << 40) - 1
+
+def _new_node() -> str:
+    node = ((os.getpid() & ((1 << _PID_BITS) - 1)) << _RANDOM_BITS) | random.SystemRandom().getrandbits(_RANDOM_BITS)
+    return f"{node:010x}"
+
+def _reset() -> None:
+    """初始化（或在fork出的子进程中重置）节点号、序号和时钟基准"""
+    global _node, _sequence, _wall_anchor_ns, _monotonic_anchor_ns
+    _node = _new_node()
+    _sequence = itertools.count()
+    # 以单调时钟推算时间，系统时间回拨时ID仍然递增
+    _wall_anchor_ns = time.time_ns()
+    _monotonic_anchor_ns = time.monotonic_ns()
+
+_reset()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset)
+
+def new_id() -> str:
+    """
+    生成一个新的ID
+
+    返回:
+        32位十六进制字符串，同一线程内严格递增，跨进程唯一
+    """
+    millis = (_wall_anchor_ns + time.monotonic_ns() - _monotonic_anchor_ns) // 1_000_000
+    return f"{millis:012x}{_node}{next(_sequence) & _SEQUENCE_MASK:010x}"
+
+def new_profile_id() -> str:
+    """生成新的用户画像ID"""
+    return f"user_{new_id()}"
+
+def id_timestamp(generated_id: str) -> float:
+    """
+    从ID中解析出生成时间
+
+    参数:
+        generated_id: new_id或new_profile_id生成的ID
+
+    返回:
+        Unix时间戳(秒)
+    """
+    return int(generated_id[-32:-20], 16) / 1000
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多模式关键词匹配器 - 将关键词表编译为单个正则，一次扫描找出所有命中的关键词
+"""
+
+import re
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Set, Tuple
+
+
+def _build_trie_pattern(keywords: Iterable[str]) -> str:
+    """将关键词构造成前缀树形式的正则，分支按公共前缀合并，可选部分贪婪匹配最长关键词"""
+    root: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = None
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(root)
+
+
+class KeywordMatcher:
+    """多模式关键词匹配器，关键词映射到一个或多个标签"""
+
+    def __init__(self, keyword_labels: Dict[str, Iterable[Hashable]]):
+        """
+        编译关键词表
+
+        参数:
+            keyword_labels: 关键词 -> 标签列表
+        """
+        keywords = [keyword for keyword in keyword_labels if keyword]
+        if not keywords:
+            raise ValueError("关键词表不能为空")
+        self.max_keyword_length = max(len(keyword) for keyword in keywords)
+
+        # 命中某个关键词，意味着其中包含的其它关键词也同时出现
+        self._labels: Dict[str, FrozenSet[Hashable]] = {}
+        for keyword in keywords:
+            labels: Set[Hashable] = set()
+            for other in keywords:
+                if other in keyword:
+                    labels.update(keyword_labels[other])
+            self._labels[keyword] = frozenset(labels)
+
+        pattern = _build_trie_pattern(keywords)
+        if self._has_partial_overlap(keywords):
+            # 存在首尾交叠的关键词时，逐位置前瞻匹配，避免非重叠扫描漏掉交叠部分
+            self._overlapping = True
+            self._pattern = re.compile(f"(?=({pattern}))")
+        else:
+            self._overlapping = False
+            self._pattern = re.compile(pattern)
+
+    @staticmethod
+    def _has_partial_overlap(keywords: List[str]) -> bool:
+        """是否存在某个关键词的后缀恰为另一个关键词的前缀（且不互为子串）"""
+        for first in keywords:
+            for second in keywords:
+                if second in first:
+                    continue
+                for size in range(1, min(len(first), len(second))):
+                    if first.endswith(second[:size]):
+                        return True
+        return False
+
+    def find_keywords(self, text: str) -> Set[str]:
+        """
+        一次扫描找出文本中最长匹配的关键词
+
+        参数:
+            text: 待匹配文本
+
+        返回:
+            命中的关键词集合
+        """
+        return set(self._pattern.findall(text))
+
+    def find_labels(self, text: str) -> Set[Hashable]:
+        """
+        一次扫描找出文本中出现的所有关键词对应的标签
+
+        参数:
+            text: 待匹配文本
+
+        返回:
+            命中的标签集合
+        """
+        labels: Set[Hashable] = set()
+        for keyword in self.find_keywords(text):
+            labels.update(self._labels[keyword])
+        return labels
+
+
+def compile_keyword_rules(rules: Dict[str, List[Tuple[Any, List[str]]]]) -> KeywordMatcher:
+    """
+    将 字段 -> [(取值, 关键词列表)] 形式的规则表编译为匹配器，标签为(字段, 取值)
+
+    参数:
+        rules: 关键词规则表
+
+    返回:
+        关键词匹配器
+    """
+    keyword_labels: Dict[str, List[Tuple[str, Any]]] = {}
+    for field, values in rules.items():
+        for value, keywords in values:
+            for keyword in keywords:
+                keyword_labels.setdefault(keyword, []).append((field, value))
+    return KeywordMatcher(keyword_labels)
@@ -6,10 +6,82 @@
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from care_elite.utils.executor import run_in_thread
+from care_elite.utils.keyword_matcher import compile_keyword_rules
 
 logger = logging.getLogger(__name__)
 
+# 关键词规则表：字段 -> [(取值, 关键词列表)]
+# 单值字段按列表顺序优先取第一个命中的取值；concerns为多值字段，按列表顺序收集全部命中取值
+PROFILE_KEYWORD_RULES = {
+    "delivery_type": [
+        ("顺产", ["顺产"]),
+        ("剖腹产", ["剖腹产", "刨腹产"])
+    ],
+    "child_count": [
+        (1, ["一胎", "第一胎", "第一个孩子"]),
+        (2, ["二胎", "第二胎", "第二个孩子"])
+    ],
+    "concerns": [
+        ("体重恢复", ["体重", "瘦身", "减肥", "恢复身材"]),
+        ("母乳喂养", ["母乳", "奶水", "喂养", "催乳"]),
+        ("睡眠质量", ["睡眠", "失眠", "休息不好"]),
+        ("伤口愈合", ["伤口", "恢复", "疼痛"])
+    ],
+    "budget_preference": [
+        ("经济型", ["经济", "便宜", "实惠", "性价比"]),
+        ("高端", ["高端", "豪华", "尊享", "贵"])
+    ]
+}
+
+MULTI_VALUE_FIELDS = {"concerns"}
+
+# 模块加载时编译一次；规则版本变化后，已有的增量提取状态需要全量重建
+_KEYWORD_MATCHER = compile_keyword_rules(PROFILE_KEYWORD_RULES)
+_RULES_VERSION = 1
+
+def reload_keyword_rules(rules: Optional[Dict[str, List[Tuple[Any, List[str]]]]] = None) -> int:
+    """
+    重新编译关键词规则表，并使已有的增量提取状态失效
+
+    参数:
+        rules: 新的规则表，为None时重新编译当前的PROFILE_KEYWORD_RULES
+
+    返回:
+        新的规则版本号
+    """
+    global _KEYWORD_MATCHER, _RULES_VERSION, PROFILE_KEYWORD_RULES
+    if rules is not None:
+        PROFILE_KEYWORD_RULES = rules
+    _KEYWORD_MATCHER = compile_keyword_rules(PROFILE_KEYWORD_RULES)
+    _RULES_VERSION += 1
+    logger.info(f"关键词规则已重新编译，版本: {_RULES_VERSION}")
+    return _RULES_VERSION
+
+def resolve_user_info(labels: Set[Tuple[str, Any]]) -> Dict[str, Any]:
+    """
+    将命中的(字段, 取值)标签按规则表优先级整理为用户信息
+
+    参数:
+        labels: 命中的标签集合
+
+    返回:
+        提取的用户信息
+    """
+    extracted_info: Dict[str, Any] = {}
+    for field, values in PROFILE_KEYWORD_RULES.items():
+        matched = [value for value, _ in values if (field, value) in labels]
+        if field in MULTI_VALUE_FIELDS:
+            extracted_info[field] = matched
+        else:
+            extracted_info[field] = matched[0] if matched else None
+    return extracted_info
+
 def extract_user_info(text: str) -> Dict[str, Any]:
     """
     从文本中提取用户信息
@@ -21,68 +93,164 @@ def extract_user_info(text: str) -> Dict[str, Any]:
         提取的用户信息
     """
     # TODO: 实际实现应使用NLP或LLM提取用户信息
-    # 以下为mock实现
-    
-    # 模拟提取的用户信息
-    extracted_info = {
-        "delivery_type": None,
-        "child_count": None,
-        "concerns": [],
-        "budget_preference": None
-    }
-    
-    # 简单的关键词匹配提取
-    if "顺产" in text:
-        extracted_info["delivery_type"] = "顺产"
-    elif "剖腹产" in text or "刨腹产" in text:
-        extracted_info["delivery_type"] = "剖腹产"
-    
-    if "一胎" in text or "第一胎" in text or "第一个孩子" in text:
-        extracted_info["child_count"] = 1
-    elif "二胎" in text or "第二胎" in text or "第二个孩子" in text:
-        extracted_info["child_count"] = 2
-    
-    # 提取关注点
-    concerns = []
-    if any(keyword in text for keyword in ["体重", "瘦身", "减肥", "恢复身材"]):
-        concerns.append("体重恢复")
-    if any(keyword in text for keyword in ["母乳", "奶水", "喂养", "催乳"]):
-        concerns.append("母乳喂养")
-    if any(keyword in text for keyword in ["睡眠", "失眠", "休息不好"]):
-        concerns.append("睡眠质量")
-    if any(keyword in text for keyword in ["伤口", "恢复", "疼痛"]):
-        concerns.append("伤口愈合")
-    
-    extracted_info["concerns"] = concerns
-    
-    # 提取预算偏好
-    if any(keyword in text for keyword in ["经济", "便宜", "实惠", "性价比"]):
-        extracted_info["budget_preference"] = "经济型"
-    elif any(keyword in text for keyword in ["高端", "豪华", "尊享", "贵"]):
-        extracted_info["budget_preference"] = "高端"
-    
-    return extracted_info
+    # 目前为关键词匹配：对文本只扫描一次，找出规则表中全部命中的关键词
+    return resolve_user_info(_KEYWORD_MATCHER.find_labels(text))
 
-def generate_user_profile(conversation_history: List[Dict[str, Any]]) -> Dict[str, Any]:
+class ProfileExtractionState:
+    """单个用户画像的增量提取状态，记录已处理的对话条数和目前为止命中的(字段, 取值)标签"""
+
+    def __init__(self):
+        self.rules_version = _RULES_VERSION
+        self.labels: Set[Tuple[str, Any]] = set()
+        self.history_length = 0
+
+    @property
+    def is_stale(self) -> bool:
+        """规则表变化后状态失效"""
+        return self.rules_version != _RULES_VERSION
+
+    def feed(self, role: str, text: str) -> Set[Tuple[str, Any]]:
+        """
+        处理新的一轮发言，用户发言只扫描本轮文本并合并命中的标签
+
+        参数:
+            role: 发言角色
+            text: 发言内容
+
+        返回:
+            本轮命中的标签
+        """
+        self.history_length += 1
+        return self.scan(role, text)
+
+    def scan(self, role: str, text: str) -> Set[Tuple[str, Any]]:
+        """
+        扫描一段文字并合并命中的标签，不计入已处理的对话条数（用于同一轮发言的后续片段）
+
+        参数:
+            role: 发言角色
+            text: 文字片段
+
+        返回:
+            本段文字命中的标签
+        """
+        if role != "user":
+            return set()
+        labels = _KEYWORD_MATCHER.find_labels(text)
+        self.labels |= labels
+        return labels
+
+    def catch_up(self, conversation_history: List[Dict[str, Any]], archived_turns: int = 0) -> List[Set[Tuple[str, Any]]]:
+        """
+        处理对话历史中尚未处理的记录
+
+        参数:
+            conversation_history: 画像中保留的对话历史记录
+            archived_turns: 已移入归档的较早对话轮数，history_length按全部对话计数
+
+        返回:
+            按对话顺序排列的、补处理的每轮用户发言命中的标签
+        """
+        # 未处理就被归档的对话不再读回扫描
+        self.history_length = max(self.history_length, archived_turns)
+        turns = []
+        for entry in conversation_history[self.history_length - archived_turns:]:
+            labels = self.feed(entry["role"], entry["content"])
+            if labels:
+                turns.append(labels)
+        return turns
+
+    def user_info(self) -> Dict[str, Any]:
+        """按规则表优先级返回累计提取的用户信息"""
+        return resolve_user_info(self.labels)
+
+
+# 保留增量提取状态的画像数上限，超出时淘汰最久未使用的状态，再次使用时从对话历史重建
+EXTRACTION_STATE_LIMIT = int(os.environ.get("CARE_ELITE_EXTRACTION_STATE_LIMIT", "10000"))
+
+# 存储结构为 profile_id -> 增量提取状态，按最近使用排序
+_EXTRACTION_STATES: "OrderedDict[str, ProfileExtractionState]" = OrderedDict()
+# 工作线程中并发读写_EXTRACTION_STATES(含调整LRU顺序)时需持有
+_EXTRACTION_STATES_LOCK = threading.Lock()
+
+def _remember_extraction_state(profile_id: str, state: ProfileExtractionState) -> None:
+    """保存提取状态并淘汰超出上限的最久未使用状态"""
+    with _EXTRACTION_STATES_LOCK:
+        _EXTRACTION_STATES[profile_id] = state
+        _EXTRACTION_STATES.move_to_end(profile_id)
+        while len(_EXTRACTION_STATES) > EXTRACTION_STATE_LIMIT:
+            _EXTRACTION_STATES.popitem(last=False)
+
+def build_extraction_state(conversation_history: List[Dict[str, Any]], archived_turns: int = 0) -> ProfileExtractionState:
+    """
+    逐条扫描对话历史中的用户发言，构建提取状态
+
+    参数:
+        conversation_history: 对话历史记录
+        archived_turns: 已移入归档的较早对话轮数，这部分对话不参与重建
+
+    返回:
+        提取状态
+    """
+    state = ProfileExtractionState()
+    state.catch_up(conversation_history, archived_turns)
+    return state
+
+def get_extraction_state(profile: Dict[str, Any]) -> Optional[ProfileExtractionState]:
+    """
+    获取用户画像的增量提取状态，不存在或规则已变化时从对话历史全量重建
+
+    参数:
+        profile: 用户画像，需包含profile_id
+
+    返回:
+        提取状态，画像没有profile_id时返回None
+    """
+    profile_id = profile.get("profile_id")
+    if not profile_id:
+        return None
+
+    conversation_history = profile.get("conversation_history", [])
+    archived_turns = profile.get("archived_turns", 0)
+    with _EXTRACTION_STATES_LOCK:
+        state = _EXTRACTION_STATES.get(profile_id)
+    if state is None or state.is_stale or state.history_length > archived_turns + len(conversation_history):
+        # 归档的对话不读回，已写入画像的字段不受影响
+        logger.info(f"全量重建用户画像提取状态: {profile_id}")
+        state = build_extraction_state(conversation_history, archived_turns)
+    _remember_extraction_state(profile_id, state)
+    return state
+
+def discard_extraction_state(profile_id: str) -> None:
+    """
+    丢弃用户画像的增量提取状态
+
+    参数:
+        profile_id: 用户画像ID
+    """
+    with _EXTRACTION_STATES_LOCK:
+        _EXTRACTION_STATES.pop(profile_id, None)
+
+def generate_user_profile(conversation_history: List[Dict[str, Any]], profile_id: Optional[str] = None) -> Dict[str, Any]:
     """
     从对话历史生成用户画像
     
     参数:
         conversation_history: 对话历史记录
+        profile_id: 可选的用户画像ID，提供时保存提取状态，后续update_user_profile只处理新增发言
         
     返回:
         生成的用户画像
     """
     logger.info(f"从{len(conversation_history)}条对话记录生成用户画像")
     
-    # 整合所有文本
-    all_text = ""
-    for entry in conversation_history:
-        if entry["role"] == "user":
-            all_text += entry["content"] + " "
+    # 逐条扫描用户发言并合并结果，与拼接全部文本后提取等价
+    state = build_extraction_state(conversation_history)
+    if profile_id:
+        _remember_extraction_state(profile_id, state)
     
     # 提取用户信息
-    user_info = extract_user_info(all_text)
+    user_info = state.user_info()
     
     # 构建用户画像
     user_profile = {
@@ -99,9 +267,26 @@ def generate_user_profile(conversation_history: List[Dict[str, Any]]) -> Dict[st
         },
         "conversation_history": conversation_history
     }
+    if profile_id:
+        user_profile["profile_id"] = profile_id
     
     return user_profile
 
+async def generate_user_profile_async(conversation_history: List[Dict[str, Any]],
+                                      timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    在线程池中从对话历史生成用户画像，不阻塞事件循环
+    
+    参数:
+        conversation_history: 对话历史记录
+        timeout: 超时时间(秒)，默认使用执行器配置
+        
+    返回:
+        生成的用户画像
+    """
+    # 提取只扫描一遍文本，放到线程中即可让出事件循环，不值得承担进程间序列化的开销
+    return await run_in_thread(generate_user_profile, conversation_history, timeout=timeout)
+
 def update_user_profile(existing_profile: Dict[str, Any], new_text: str, role: str) -> Dict[str, Any]:
     """
     根据新的对话更新用户画像
@@ -114,6 +299,11 @@ def update_user_profile(existing_profile: Dict[str, Any], new_text: str, role: s
     返回:
         更新后的用户画像
     """
+    # 先取得增量提取状态，并补上绕过本模块追加的对话记录，新发言只需扫描本轮文本
+    state = get_extraction_state(existing_profile)
+    turns = state.catch_up(existing_profile.get("conversation_history", []),
+                           existing_profile.get("archived_turns", 0)) if state is not None else []
+    
     # 添加新的对话记录
     if "conversation_history" not in existing_profile:
         existing_profile["conversation_history"] = []
@@ -122,26 +312,73 @@ def update_user_profile(existing_profile: Dict[str, Any], new_text: str, role: s
         "role": role,
         "content": new_text
     })
+    if state is not None:
+        turns.append(state.feed(role, new_text))
+    elif role == "user":
+        # 没有profile_id的画像无法保存状态，只从本轮发言提取
+        turns.append(_KEYWORD_MATCHER.find_labels(new_text))
     
-    # 如果是用户发言，提取信息并更新画像
-    if role == "user":
-        user_info = extract_user_info(new_text)
-        
-        # 更新分娩方式
-        if user_info["delivery_type"]:
-            existing_profile["basic_info"]["delivery_type"] = user_info["delivery_type"]
-        
-        # 更新胎次
-        if user_info["child_count"]:
-            existing_profile["basic_info"]["child_count"] = user_info["child_count"]
-        
-        # 更新关注点，添加新的关注点
-        for concern in user_info["concerns"]:
-            if concern not in existing_profile["basic_info"]["concerns"]:
-                existing_profile["basic_info"]["concerns"].append(concern)
+    # 按对话顺序逐轮更新画像，单值字段以最近一轮发言为准
+    _apply_turns(existing_profile, turns)
+    
+    return existing_profile
+
+def extend_user_profile(existing_profile: Dict[str, Any], partial_text: str, role: str,
+                        new_turn: bool = False) -> Dict[str, Any]:
+    """
+    流式转写时，将一段部分文字并入同一角色的当前发言并更新用户画像
+    
+    参数:
+        existing_profile: 现有的用户画像
+        partial_text: 新识别出的部分文字
+        role: 发言角色
+        new_turn: 是否开启新一轮发言；角色与上一轮不同时也会开启新一轮
         
-        # 更新预算偏好
-        if user_info["budget_preference"]:
-            existing_profile["preferences"]["budget_level"] = user_info["budget_preference"]
+    返回:
+        更新后的用户画像
+    """
+    history = existing_profile.get("conversation_history") or []
+    if new_turn or not history or history[-1].get("role") != role:
+        return update_user_profile(existing_profile, partial_text, role)
+    
+    state = get_extraction_state(existing_profile)
+    turns = state.catch_up(history, existing_profile.get("archived_turns", 0)) if state is not None else []
+    
+    # 关键词可能跨越两个片段，带上前文末尾(最长关键词长度-1)个字符一起扫描
+    last_turn = history[-1]
+    overlap = _KEYWORD_MATCHER.max_keyword_length - 1
+    context = last_turn["content"][-overlap:] if overlap else ""
+    last_turn["content"] += partial_text
+    
+    if state is not None:
+        turns.append(state.scan(role, context + partial_text))
+    elif role == "user":
+        turns.append(_KEYWORD_MATCHER.find_labels(last_turn["content"]))
+    _apply_turns(existing_profile, turns)
+    
+    return existing_profile
+
+def _apply_turns(existing_profile: Dict[str, Any], turns: List[Set[Tuple[str, Any]]]) -> None:
+    """按对话顺序将每轮发言命中的标签写入用户画像，后一轮覆盖前一轮的单值字段"""
+    for labels in turns:
+        if labels:
+            _apply_user_info(existing_profile, resolve_user_info(labels))
+
+def _apply_user_info(existing_profile: Dict[str, Any], user_info: Dict[str, Any]) -> None:
+    """将提取到的用户信息写入用户画像"""
+    # 更新分娩方式
+    if user_info["delivery_type"]:
+        existing_profile["basic_info"]["delivery_type"] = user_info["delivery_type"]
+    
+    # 更新胎次
+    if user_info["child_count"]:
+        existing_profile["basic_info"]["child_count"] = user_info["child_count"]
+    
+    # 更新关注点，添加新的关注点
+    for concern in user_info["concerns"]:
+        if concern not in existing_profile["basic_info"]["concerns"]:
+            existing_profile["basic_info"]["concerns"].append(concern)
     
-    return existing_profile 
\ No newline at end of file
+    # 更新预算偏好
+    if user_info["budget_preference"]:
+        existing_profile["preferences"]["budget_level"] = user_info["budget_preference"]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+推荐结果缓存 - 按(画像ID, 查询参数)缓存工具结果，条目记录计算时的画像版本和知识库版本
+
+画像或知识库变化后版本不再一致，读取时视为未命中并丢弃旧条目；未变化的画像不受影响。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# 缓存条目数上限，超出时淘汰最久未使用的条目
+RESULT_CACHE_SIZE = int(os.environ.get("CARE_ELITE_RESULT_CACHE_SIZE", "1024"))
+# 条目有效期(秒)，不大于0时不过期
+RESULT_CACHE_TTL = float(os.environ.get("CARE_ELITE_RESULT_CACHE_TTL", "300"))
+
+
+class ResultCache:
+    """带版本校验的LRU + TTL缓存，线程安全"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        参数:
+            max_entries: 条目数上限
+            ttl: 条目有效期(秒)，不大于0时不过期
+            clock: 计时函数
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+        # 缓存键 -> (版本, 过期时间, 结果)
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        """
+        读取缓存
+
+        参数:
+            key: 缓存键
+            version: 当前的画像版本和知识库版本，与条目记录的版本不一致时视为未命中
+
+        返回:
+            缓存的结果，未命中返回None；结果与其它调用方共享，不要修改
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, value = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            if expires_at and expires_at <= self.clock():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, version: Hashable, value: Any) -> None:
+        """
+        写入缓存
+
+        参数:
+            key: 缓存键
+            version: 计算结果时的画像版本和知识库版本
+            value: 结果
+        """
+        if self.max_entries <= 0:
+            return
+        expires_at = self.clock() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            self._entries[key] = (version, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def keys(self, predicate: Callable[[Hashable], bool]) -> List[Hashable]:
+        """
+        列出键满足条件的条目，不计入命中统计，也不改变淘汰顺序
+
+        参数:
+            predicate: 接收缓存键，返回True时列出
+
+        返回:
+            缓存键列表，按最久未使用到最近使用排序
+        """
+        with self._lock:
+            return [key for key in self._entries if predicate(key)]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        删除键满足条件的条目
+
+        参数:
+            predicate: 接收缓存键，返回True时删除
+
+        返回:
+            删除的条目数
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存，命中统计保留"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": len(self._entries)
+            }
+
+
+# recommend_service和present_case共用的结果缓存，缓存键的第一项为工具名，第二项为画像ID
+RECOMMENDATION_CACHE = ResultCache()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时统计 - 记录启动各阶段及首次使用时延迟初始化的耗时，并与启动预算比较
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 从进程开始执行main.py到可以开始处理请求的目标耗时(毫秒)
+STARTUP_BUDGET_MS = float(os.environ.get("CARE_ELITE_STARTUP_BUDGET_MS", "300"))
+
+
+class StartupProfiler:
+    """按阶段记录耗时，阶段分为启动阶段和首次使用时的延迟初始化阶段"""
+
+    def __init__(self, start: Optional[float] = None):
+        """
+        参数:
+            start: 计时起点(time.perf_counter)，默认为创建时刻
+        """
+        self.start = time.perf_counter() if start is None else start
+        self.startup_phases: List[Tuple[str, float]] = []
+        self.lazy_phases: List[Tuple[str, float]] = []
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str, lazy: bool = False) -> Iterator[None]:
+        """
+        统计一个阶段的耗时
+
+        参数:
+            name: 阶段名称
+            lazy: 是否为首次使用时才执行的延迟初始化阶段
+        """
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = self.lazy_phases if lazy else self.startup_phases
+            phases.append((name, (time.perf_counter() - begin) * 1000))
+
+    def ready(self) -> None:
+        """标记启动完成，之后的阶段不计入启动耗时"""
+        self.ready_at = time.perf_counter()
+
+    def report(self, budget_ms: float = STARTUP_BUDGET_MS) -> Dict[str, Any]:
+        """
+        生成耗时报告
+
+        参数:
+            budget_ms: 启动预算(毫秒)
+
+        返回:
+            各阶段耗时、启动总耗时及是否在预算内
+        """
+        ready_at = self.ready_at if self.ready_at is not None else time.perf_counter()
+        startup_ms = (ready_at - self.start) * 1000
+        return {
+            "startup_ms": round(startup_ms, 3),
+            "budget_ms": budget_ms,
+            "within_budget": startup_ms <= budget_ms,
+            "startup_phases_ms": {name: round(ms, 3) for name, ms in self.startup_phases},
+            "lazy_init_phases_ms": {name: round(ms, 3) for name, ms in self.lazy_phases}
+        }
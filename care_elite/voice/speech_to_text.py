@@ -9,11 +9,18 @@ import base64
 import logging
 import tempfile
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, Optional
+
+from care_elite.utils.executor import run_in_thread
 
 
 logger = logging.getLogger(__name__)
 
+# 流式会话最长空闲时间(秒)，超过后清理；已结束的会话在同样长的时间内拒绝迟到的音频块
+STREAM_SESSION_IDLE_SECONDS = float(os.environ.get("CARE_ELITE_STREAM_SESSION_IDLE_SECONDS", "600"))
+
 class SpeechToText:
     """语音转文字处理类"""
     
@@ -34,6 +41,170 @@ class SpeechToText:
         """
         return "test"
 
+
+
+class SpeechStreamSession:
+    """流式语音识别会话：按序号接收音频块，每块到达后立即识别"""
+    
+    def __init__(self, session_id: str, language: str = "zh-CN", max_pending_chunks: int = 64):
+        """
+        初始化流式识别会话
+        
+        参数:
+            session_id: 会话ID
+            language: 语言代码，默认为中文
+            max_pending_chunks: 最多缓存多少个乱序到达的音频块
+        """
+        self.session_id = session_id
+        self.language = language
+        self.max_pending_chunks = max_pending_chunks
+        self.next_seq = 0
+        self.final_seq: Optional[int] = None
+        self.transcripts: List[str] = []
+        self.last_active = time.monotonic()
+        self._pending: Dict[int, str] = {}
+        # 已识别但调用方还没有取走的文字，调用超时时留在会话中，下次调用时一并取走
+        self._untaken: List[str] = []
+        self._recognizer = SpeechToText()
+        # 音频块可能在不同工作线程中处理，识别需按序串行
+        self._lock = threading.Lock()
+        # 只保护_untaken，在事件循环中取文字时不必等待正在进行的识别
+        self._untaken_lock = threading.Lock()
+    
+    @property
+    def is_complete(self) -> bool:
+        """最后一个音频块及其之前的所有块都已识别"""
+        return self.final_seq is not None and self.next_seq > self.final_seq
+    
+    @property
+    def transcript(self) -> str:
+        """目前为止按序识别出的全部文字"""
+        return "".join(self.transcripts)
+    
+    def add_chunk(self, seq: int, audio_chunk: str, is_final: bool = False) -> List[str]:
+        """
+        接收一个音频块，乱序到达的块先缓存，补齐后按序识别
+        
+        参数:
+            seq: 音频块序号，从0开始
+            audio_chunk: Base64编码的音频块
+            is_final: 是否为最后一个音频块
+            
+        返回:
+            本次新识别出的文字片段，按序号排列；重复的块返回空列表。
+            新识别的文字同时留在会话中，直到通过take_texts取走
+        """
+        with self._lock:
+            self.last_active = time.monotonic()
+            if seq < self.next_seq or seq in self._pending:
+                logger.warning(f"忽略重复的音频块: {self.session_id}#{seq}")
+                return []
+            if self.final_seq is not None and seq > self.final_seq:
+                raise ValueError(f"音频块序号超出最后一块: {self.session_id}#{seq}")
+            if is_final and seq < max(self._pending, default=-1):
+                raise ValueError(f"最后一块之后已有音频块: {self.session_id}#{seq}")
+            if len(self._pending) >= self.max_pending_chunks:
+                raise ValueError(f"乱序缓存的音频块过多: {self.session_id}")
+            
+            # 音频块被接受后才记录最后一块的序号，重复或被拒绝的块不改变会话状态
+            self._pending[seq] = audio_chunk
+            if is_final:
+                self.final_seq = seq
+            texts = []
+            while self.next_seq in self._pending:
+                chunk = self._pending.pop(self.next_seq)
+                self.next_seq += 1
+                text = self._recognizer.recognize(chunk, self.language)
+                if text:
+                    self.transcripts.append(text)
+                    texts.append(text)
+            with self._untaken_lock:
+                self._untaken.extend(texts)
+            return texts
+
+    def take_texts(self) -> List[str]:
+        """
+        取走已识别、调用方尚未取走的文字片段，包括超时的调用中识别出的文字
+
+        返回:
+            按序号排列的文字片段
+        """
+        with self._untaken_lock:
+            texts, self._untaken = self._untaken, []
+        return texts
+
+
+# 存储结构为 session_id -> 流式识别会话
+_STREAM_SESSIONS: Dict[str, SpeechStreamSession] = {}
+
+def get_stream_session(session_id: str, language: str = "zh-CN") -> SpeechStreamSession:
+    """
+    获取流式识别会话，不存在时创建
+    
+    参数:
+        session_id: 会话ID
+        language: 语言代码，默认为中文
+        
+    返回:
+        流式识别会话
+    """
+    session = _STREAM_SESSIONS.get(session_id)
+    if session is None:
+        session = SpeechStreamSession(session_id, language)
+        _STREAM_SESSIONS[session_id] = session
+        logger.info(f"开启流式语音识别会话: {session_id}")
+    return session
+
+def close_stream_session(session_id: str) -> Optional[SpeechStreamSession]:
+    """
+    关闭流式识别会话
+    
+    参数:
+        session_id: 会话ID
+        
+    返回:
+        被关闭的会话，不存在时返回None
+    """
+    session = _STREAM_SESSIONS.pop(session_id, None)
+    if session is not None:
+        logger.info(f"关闭流式语音识别会话: {session_id}")
+    return session
+
+def expire_stream_sessions(max_idle_seconds: float = STREAM_SESSION_IDLE_SECONDS) -> List[str]:
+    """
+    清理长时间没有新音频块的会话
+    
+    参数:
+        max_idle_seconds: 最长空闲时间(秒)
+        
+    返回:
+        被清理的会话ID列表
+    """
+    now = time.monotonic()
+    expired = [sid for sid, session in _STREAM_SESSIONS.items() if now - session.last_active > max_idle_seconds]
+    for session_id in expired:
+        close_stream_session(session_id)
+    return expired
+
+def recognize_stream_chunk(session_id: str, seq: int, audio_chunk: str, is_final: bool = False,
+                           language: str = "zh-CN") -> List[str]:
+    """
+    流式识别：识别会话中新到达的音频块（函数版本）
+    
+    参数:
+        session_id: 会话ID
+        seq: 音频块序号，从0开始
+        audio_chunk: Base64编码的音频块
+        is_final: 是否为最后一个音频块
+        language: 语言代码，默认为中文
+        
+    返回:
+        本次新识别出的文字片段
+    """
+    session = get_stream_session(session_id, language)
+    session.add_chunk(seq, audio_chunk, is_final)
+    return session.take_texts()
+
             
 # 为了便于直接调用的函数版本
 def speech_to_text(audio_data: str, language: str = "zh-CN") -> Optional[str]:
@@ -49,4 +220,18 @@ def speech_to_text(audio_data: str, language: str = "zh-CN") -> Optional[str]:
     """
     return "test"
     # stt = SpeechToText()
-    # return stt.recognize(audio_data, language) 
\ No newline at end of file
+    # return stt.recognize(audio_data, language) 
+
+async def speech_to_text_async(audio_data: str, language: str = "zh-CN", timeout: Optional[float] = None) -> Optional[str]:
+    """
+    在线程池中执行语音转文字，不阻塞事件循环
+    
+    参数:
+        audio_data: Base64编码的音频数据
+        language: 语言代码，默认为中文
+        timeout: 超时时间(秒)，默认使用执行器配置
+        
+    返回:
+        识别的文字，如果识别失败则返回None
+    """
+    return await run_in_thread(speech_to_text, audio_data, language, timeout=timeout)
@@ -5,11 +5,19 @@
 文字转语音模块 - 将文字转换为语音输出给用户
 """
 
+import asyncio
 import base64
 import logging
 import tempfile
 import os
-from typing import Optional
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from care_elite.utils.executor import run_in_thread
+from care_elite.voice.tts_cache import TTSCache, normalize_voice_params, tts_cache_key
 
 
 logger = logging.getLogger(__name__)
@@ -41,6 +49,80 @@ class TextToSpeech:
         """
         return "test"
 
+
+
+# 合成引擎版本，参与缓存键计算，更换引擎或调整合成参数后应递增
+TTS_ENGINE_VERSION = "1"
+
+# 磁盘缓存目录，可通过环境变量覆盖
+TTS_CACHE_DIR = os.environ.get("CARE_ELITE_TTS_CACHE_DIR", os.path.join("cache", "tts"))
+
+# 复用的引擎实例数上限，超出时淘汰最久未使用的引擎
+TTS_ENGINE_LIMIT = int(os.environ.get("CARE_ELITE_TTS_ENGINE_LIMIT", "8"))
+
+# 按规范化后的(语速, 音量)复用的引擎实例，按最近使用排序
+_ENGINES: "OrderedDict[Tuple[int, float], TextToSpeech]" = OrderedDict()
+_ENGINES_LOCK = threading.Lock()
+
+_tts_cache: Optional[TTSCache] = None
+
+# 流式合成时同时合成的句子数上限
+TTS_STREAM_WORKERS = int(os.environ.get("CARE_ELITE_TTS_STREAM_WORKERS", "4"))
+# 单个合成片段的最大字数，超长的句子在逗号等处继续切分
+TTS_SEGMENT_MAX_CHARS = int(os.environ.get("CARE_ELITE_TTS_SEGMENT_MAX_CHARS", "80"))
+
+# 句末标点(含紧随其后的引号、括号)处切分，超长时再在句中停顿处切分
+_SENTENCE_END = re.compile(r"[^。！？；!?;…\n]*(?:[。！？；!?;\n]|…+)+[”’」』）)]*")
+_CLAUSE_END = re.compile(r"[^，、：,:]*[，、：,:]+")
+# 可以读出来的字符(汉字、字母、数字)，只有标点和空白的片段不单独合成
+_SPEAKABLE = re.compile(r"\w")
+
+# 最近若干次流式合成的首段音频耗时(毫秒)
+_first_audio_ms: Deque[float] = deque(maxlen=1024)
+_stream_stats_lock = threading.Lock()
+
+def get_tts_engine(voice_rate: int = 150, voice_volume: float = 1.0) -> TextToSpeech:
+    """
+    获取复用的语音合成引擎，不存在时创建
+    
+    参数:
+        voice_rate: 语音速率，默认为150
+        voice_volume: 语音音量，范围0.0-1.0，默认为1.0
+        
+    返回:
+        语音合成引擎
+    """
+    key = normalize_voice_params(voice_rate, voice_volume)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = TextToSpeech(*key)
+            _ENGINES[key] = engine
+            while len(_ENGINES) > TTS_ENGINE_LIMIT:
+                _ENGINES.popitem(last=False)
+        else:
+            _ENGINES.move_to_end(key)
+    return engine
+
+def get_tts_cache() -> TTSCache:
+    """获取语音合成缓存，首次使用时创建"""
+    global _tts_cache
+    if _tts_cache is None:
+        with _ENGINES_LOCK:
+            if _tts_cache is None:
+                _tts_cache = TTSCache(TTS_CACHE_DIR)
+    return _tts_cache
+
+def set_tts_cache(cache: Optional[TTSCache]) -> None:
+    """
+    替换语音合成缓存
+    
+    参数:
+        cache: 新的缓存实例，为None时下次使用重新按默认配置创建
+    """
+    global _tts_cache
+    _tts_cache = cache
+
             
 # 为了便于直接调用的函数版本
 def text_to_speech(text: str, save_to_file: bool = False, 
@@ -57,5 +139,166 @@ def text_to_speech(text: str, save_to_file: bool = False,
     返回:
         如果save_to_file为True，返回Base64编码的音频数据；否则返回None
     """
-    tts = TextToSpeech(voice_rate, voice_volume)
-    return tts.synthesize(text, save_to_file) 
\ No newline at end of file
+    tts = get_tts_engine(voice_rate, voice_volume)
+    if not save_to_file:
+        # 直接播放，没有可缓存的结果
+        return tts.synthesize(text, save_to_file)
+    
+    # 相同文字和参数的合成结果直接复用
+    cache = get_tts_cache()
+    key = tts_cache_key(text, voice_rate, voice_volume, TTS_ENGINE_VERSION)
+    audio = cache.get(key)
+    if audio is None:
+        audio = tts.synthesize(text, save_to_file)
+        if audio:
+            cache.put(key, audio)
+    return audio 
+
+async def text_to_speech_async(text: str, save_to_file: bool = False,
+                               voice_rate: int = 150, voice_volume: float = 1.0,
+                               timeout: Optional[float] = None) -> Optional[str]:
+    """
+    在线程池中执行文字转语音，不阻塞事件循环
+    
+    参数:
+        text: 要转换为语音的文字
+        save_to_file: 是否保存到文件并返回Base64编码，默认为False（直接播放）
+        voice_rate: 语音速率，默认为150
+        voice_volume: 语音音量，范围0.0-1.0，默认为1.0
+        timeout: 超时时间(秒)，默认使用执行器配置
+        
+    返回:
+        如果save_to_file为True，返回Base64编码的音频数据；否则返回None
+    """
+    return await run_in_thread(text_to_speech, text, save_to_file, voice_rate, voice_volume, timeout=timeout)
+
+def _split_long(segment: str, max_chars: int) -> List[str]:
+    """在句中停顿处切分超长的句子，仍然超长的部分按字数切分"""
+    parts: List[str] = []
+    current = ""
+    for clause in _CLAUSE_END.findall(segment) + [_CLAUSE_END.sub("", segment)]:
+        if current and len(current) + len(clause) > max_chars:
+            parts.append(current)
+            current = ""
+        current += clause
+        while len(current) > max_chars:
+            parts.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        parts.append(current)
+    return parts
+
+def split_sentences(text: str, max_chars: int = TTS_SEGMENT_MAX_CHARS) -> List[str]:
+    """
+    按中文句末标点将文字切分为合成片段
+
+    参数:
+        text: 要合成的文字
+        max_chars: 单个片段的最大字数
+
+    返回:
+        去掉首尾空白后含有可读字符的片段，按原文顺序排列；只有标点的片段(如"。。。")并入前一个片段，
+        没有前一个片段时丢弃
+    """
+    sentences = _SENTENCE_END.findall(text) + [_SENTENCE_END.sub("", text)]
+    segments: List[str] = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for part in _split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence]:
+            if _SPEAKABLE.search(part):
+                segments.append(part)
+            elif segments:
+                segments[-1] += part
+    return segments
+
+async def text_to_speech_stream(text: str, voice_rate: int = 150, voice_volume: float = 1.0,
+                                max_workers: int = TTS_STREAM_WORKERS,
+                                timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式合成：按句切分后并行合成，按原文顺序逐段返回，前面的句子合成好即可开始播放
+
+    参数:
+        text: 要转换为语音的文字
+        voice_rate: 语音速率，默认为150
+        voice_volume: 语音音量，范围0.0-1.0，默认为1.0
+        max_workers: 同时合成的片段数上限，已合成未返回的片段也计入，限制内存中的音频数据量
+        timeout: 单个片段的超时时间(秒)，默认使用执行器配置
+
+    返回:
+        音频块的异步迭代器，每块包含seq、text、audio(Base64编码，合成失败时为None)、is_final
+        和elapsed_ms(从开始合成到该块就绪的毫秒数)
+    """
+    segments = split_sentences(text)
+    start = time.perf_counter()
+    pending: Deque[Tuple[int, "asyncio.Task[Optional[str]]"]] = deque()
+    next_seq = 0
+
+    def submit() -> None:
+        nonlocal next_seq
+        while next_seq < len(segments) and len(pending) < max(max_workers, 1):
+            # 每个片段单独走合成缓存，重复出现的句子直接复用
+            task = asyncio.ensure_future(
+                run_in_thread(text_to_speech, segments[next_seq], True, voice_rate, voice_volume, timeout=timeout)
+            )
+            pending.append((next_seq, task))
+            next_seq += 1
+
+    try:
+        submit()
+        while pending:
+            seq, task = pending.popleft()
+            try:
+                audio = await task
+            except Exception as e:
+                # 单个片段出错不中断整个流，该片段的audio为None
+                logger.error(f"语音片段合成出错: #{seq} {segments[seq]}, {str(e)}")
+                audio = None
+            else:
+                if audio is None:
+                    logger.error(f"语音片段合成失败: #{seq} {segments[seq]}")
+            # 队首片段就绪后立即补充新的合成任务，再返回当前片段
+            submit()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if seq == 0:
+                _record_first_audio(elapsed_ms)
+            yield {
+                "seq": seq,
+                "text": segments[seq],
+                "audio": audio,
+                "is_final": seq == len(segments) - 1,
+                "elapsed_ms": round(elapsed_ms, 3)
+            }
+    finally:
+        # 调用方提前结束迭代时取消尚未完成的合成
+        for _, task in pending:
+            task.cancel()
+
+def _record_first_audio(elapsed_ms: float) -> None:
+    with _stream_stats_lock:
+        _first_audio_ms.append(elapsed_ms)
+    logger.info(f"流式语音合成首段音频耗时: {elapsed_ms:.1f}ms")
+
+def tts_stream_stats() -> Dict[str, Any]:
+    """
+    最近若干次流式合成的首段音频耗时统计
+
+    返回:
+        次数及首段音频耗时的平均值、p50、p95、最大值(毫秒)
+    """
+    with _stream_stats_lock:
+        samples = sorted(_first_audio_ms)
+    if not samples:
+        return {"streams": 0}
+
+    def percentile(q: float) -> float:
+        return round(samples[max(0, int(round(q / 100 * len(samples))) - 1)], 3)
+
+    return {
+        "streams": len(samples),
+        "first_audio_mean_ms": round(sum(samples) / len(samples), 3),
+        "first_audio_p50_ms": percentile(50),
+        "first_audio_p95_ms": percentile(95),
+        "first_audio_max_ms": round(samples[-1], 3)
+    }
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+语音合成缓存 - 按内容寻址的两级缓存（内存LRU + 容量受限的磁盘存储）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def normalize_voice_params(voice_rate: float, voice_volume: float) -> Tuple[int, float]:
+    """
+    规范化合成参数，使150与150.0、1与1.0等等价的取值得到相同的缓存键和引擎
+
+    参数:
+        voice_rate: 语音速率
+        voice_volume: 语音音量
+
+    返回:
+        (取整后的语速, 保留三位小数并限制在0.0-1.0之间的音量)
+    """
+    return int(round(voice_rate)), round(min(max(float(voice_volume), 0.0), 1.0), 3)
+
+def tts_cache_key(text: str, voice_rate: int, voice_volume: float, engine_version: str) -> str:
+    """
+    计算合成结果的缓存键
+
+    参数:
+        text: 合成文字
+        voice_rate: 语音速率
+        voice_volume: 语音音量
+        engine_version: 合成引擎版本，引擎升级后旧缓存自然失效
+
+    返回:
+        SHA-256十六进制摘要
+    """
+    voice_rate, voice_volume = normalize_voice_params(voice_rate, voice_volume)
+    payload = json.dumps([text, voice_rate, voice_volume, engine_version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """语音合成两级缓存，值为Base64编码的音频数据"""
+
+    def __init__(self, directory: str, memory_max_bytes: int = 32 * 1024 * 1024,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        """
+        参数:
+            directory: 磁盘缓存目录
+            memory_max_bytes: 内存缓存容量上限(字节)
+            disk_max_bytes: 磁盘缓存容量上限(字节)，超出时淘汰最久未使用的文件
+        """
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(".b64"):
+                self._disk_bytes += entry.stat().st_size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.b64")
+
+    def _remember(self, key: str, audio: str) -> None:
+        """写入内存LRU，调用方需持有self._lock"""
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        if len(audio) > self.memory_max_bytes:
+            return
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存，内存未命中时读磁盘并回填内存
+
+        参数:
+            key: 缓存键
+
+        返回:
+            Base64编码的音频数据，未命中返回None
+        """
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="ascii") as f:
+                audio = f.read()
+            # 更新访问时间，作为磁盘淘汰的依据
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, audio)
+        return audio
+
+    def put(self, key: str, audio: str) -> None:
+        """
+        写入缓存
+
+        参数:
+            key: 缓存键
+            audio: Base64编码的音频数据
+        """
+        path = self._path(key)
+        # 进程号和线程号共同区分临时文件，多进程共用缓存目录时也不会互相覆盖
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            existed = os.path.exists(path)
+            with open(temp_path, "w", encoding="ascii") as f:
+                f.write(audio)
+            # 先写临时文件再替换，其它进程不会读到写了一半的文件
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"写入语音合成缓存失败: {str(e)}")
+            # 临时文件不计入磁盘容量，也不会被淘汰，失败时需要删除
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._remember(key, audio)
+            if not existed:
+                self._disk_bytes += len(audio)
+            over_limit = self._disk_bytes > self.disk_max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """按最近访问时间淘汰磁盘缓存，直到回到容量上限的90%"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".b64"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        target = int(self.disk_max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._disk_bytes = total
+        logger.info(f"淘汰语音合成磁盘缓存: {removed} 个文件")
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes
+            }
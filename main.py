@@ -3,17 +3,87 @@
 
 """
 月子中心专家Agent主程序入口
+
+工具模块、知识库、语音引擎和检索索引都在首次调用工具时才加载，缩短MCP客户端拉起进程的启动时间。
+`python main.py --startup-report` 输出启动及延迟初始化各阶段的耗时，超出启动预算时返回非0退出码。
 """
 
-from typing import Any, Dict
-from mcp.server.fastmcp import FastMCP
-from care_elite.tools.information_collector import collect_information
-from care_elite.tools.service_recommender import recommend_service
-from care_elite.tools.case_presenter import present_case
+import time
+
+_PROCESS_START = time.perf_counter()
+
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, List
+
+from care_elite.utils.startup import StartupProfiler
+
+profiler = StartupProfiler(_PROCESS_START)
+
+with profiler.phase("import_mcp"):
+    from mcp.server.fastmcp import FastMCP
+
+# 用户画像存储，例如 sqlite:///data/profiles.db，未配置时使用内存存储
+PROFILE_STORE_URL = os.environ.get("CARE_ELITE_PROFILE_STORE", "memory")
+# 画像变化后是否在后台预计算推荐结果，设为0关闭
+PRECOMPUTE_RECOMMENDATIONS = os.environ.get("CARE_ELITE_PRECOMPUTE", "1") != "0"
+
+_runtime_lock = threading.Lock()
+_runtime_ready = False
+_profile_store_ready = False
+knowledge_base_reloader = None
+precomputer = None
+
+def _init_runtime() -> None:
+    """
+    执行阻塞的初始化步骤：打开画像存储、加载知识库
+
+    每个步骤成功后不再执行；失败的步骤抛出异常，下次调用时只重试未完成的步骤。
+    """
+    global _profile_store_ready, knowledge_base_reloader
+    with _runtime_lock:
+        if not _profile_store_ready:
+            with profiler.phase("profile_store", lazy=True):
+                from care_elite.database.profile_store import create_profile_backend
+                from care_elite.database.user_profile import USER_PROFILES, set_profile_backend
+                backend = create_profile_backend(PROFILE_STORE_URL, USER_PROFILES)
+                try:
+                    set_profile_backend(backend)
+                except Exception:
+                    # 未能启用的后端立即关闭，重试时不会留下第二个刷盘线程
+                    backend.close()
+                    raise
+            _profile_store_ready = True
+        # 知识库文件，通过CARE_ELITE_SALES_EXPERIENCES_FILE / CARE_ELITE_SUCCESS_CASES_FILE配置，文件变化后自动重新加载
+        if knowledge_base_reloader is None:
+            with profiler.phase("knowledge_base", lazy=True):
+                from care_elite.database.knowledge_base import start_knowledge_base_reloader
+                knowledge_base_reloader = start_knowledge_base_reloader()
+        if PRECOMPUTE_RECOMMENDATIONS:
+            # 预计算任务需在事件循环中启动，这里只完成模块导入
+            import care_elite.tools.precompute
+
+async def ensure_runtime() -> None:
+    """首次调用工具时在线程池中完成初始化，不阻塞事件循环，之后直接返回"""
+    global _runtime_ready, precomputer
+    if _runtime_ready:
+        return
+    from care_elite.utils.executor import run_in_thread
+    # 并发的首次调用在锁内等待同一次初始化完成
+    await run_in_thread(_init_runtime)
+    # 预计算任务运行在工具调用所在的事件循环中
+    if PRECOMPUTE_RECOMMENDATIONS and precomputer is None:
+        with profiler.phase("precompute", lazy=True):
+            from care_elite.tools.precompute import RecommendationPrecomputer
+            precomputer = RecommendationPrecomputer().start()
+    _runtime_ready = True
 
 """创建并配置MCP服务器实例"""
 # 初始化 FastMCP 服务器
-mcp = FastMCP("care-elite")
+with profiler.phase("create_server"):
+    mcp = FastMCP("care-elite")
 
 # 注册工具
 @mcp.tool()
@@ -27,35 +97,110 @@ async def collect_user_information(audio_data: str, role: str) -> Dict[str, Any]
     返回:
         提取的用户信息和更新后的用户画像
     """
+    await ensure_runtime()
+    from care_elite.tools.information_collector import collect_information
     return await collect_information(audio_data, role)
 
 @mcp.tool()
-async def recommend_user_service(user_profile_id: str, query: str = None) -> Dict[str, Any]:
+async def collect_user_information_chunk(session_id: str, seq: int, audio_chunk: str, role: str,
+                                         is_final: bool = False, user_profile_id: str = None) -> Dict[str, Any]:
+    """流式收集用户语音信息，每个音频块识别后立即增量更新用户画像。
+    
+    参数:
+        session_id: 流式会话ID，同一段录音的所有音频块使用同一个ID
+        seq: 音频块序号，从0开始
+        audio_chunk: 音频块数据(Base64编码)
+        role: 发言角色，可选值: "user"(用户) 或 "sales"(销售)
+        is_final: 是否为最后一个音频块
+        user_profile_id: 可选的已有用户画像ID，不提供时为会话新建画像
+    
+    返回:
+        本块识别出的文字和更新后的用户画像
+    """
+    await ensure_runtime()
+    from care_elite.tools.information_collector import collect_information_chunk
+    return await collect_information_chunk(session_id, seq, audio_chunk, role, is_final, user_profile_id)
+
+@mcp.tool()
+async def recommend_user_service(user_profile_id: str, query: str = None, limit: int = 5,
+                                 cursor: str = None) -> Dict[str, Any]:
     """基于用户画像，推荐合适的服务话术。
     
     参数:
         user_profile_id: 用户画像ID
         query: 可选的查询语句，用于精确匹配服务推荐
+        limit: 每页检索的销售心得条数
+        cursor: 上一页返回的next_cursor，为空时返回第一页
         
     返回:
-        推荐的服务信息和话术内容
+        推荐的服务信息和话术内容，next_cursor为空表示没有更多结果
     """
-    return await recommend_service(user_profile_id, query)
+    await ensure_runtime()
+    from care_elite.tools.service_recommender import recommend_service
+    return await recommend_service(user_profile_id, query, limit, cursor)
 
 @mcp.tool()
-async def present_success_case(user_profile_id: str, case_type: str = "similar") -> Dict[str, Any]:
+async def recommend_user_service_batch(user_profile_ids: List[str], query: str = None,
+                                       limit: int = 5) -> Dict[str, Any]:
+    """为多个用户画像批量推荐服务话术，一次调用返回每个用户的推荐结果。
+    
+    参数:
+        user_profile_ids: 用户画像ID列表
+        query: 可选的查询语句，对所有用户生效
+        limit: 每个用户检索的销售心得条数
+        
+    返回:
+        按用户画像ID分组的服务信息和话术内容
+    """
+    await ensure_runtime()
+    from care_elite.tools.service_recommender import recommend_service_batch
+    return await recommend_service_batch(user_profile_ids, query, limit)
+
+@mcp.tool()
+async def present_success_case(user_profile_id: str, case_type: str = "similar", limit: int = 5,
+                               cursor: str = None) -> Dict[str, Any]:
     """展示与用户情况相近的成功合作案例
     
     参数:
         user_profile_id: 用户画像ID
         case_type: 案例类型，可选值: "similar"(相似案例), "best"(最佳案例)
+        limit: 每页返回的案例条数
+        cursor: 上一页返回的next_cursor，为空时返回第一页
         
     返回:
-        匹配的案例信息
+        匹配的案例信息，next_cursor为空表示没有更多结果
     """
-    return await present_case(user_profile_id, case_type)
+    await ensure_runtime()
+    from care_elite.tools.case_presenter import present_case
+    return await present_case(user_profile_id, case_type, limit, cursor)
+
+profiler.ready()
+
+def startup_report() -> Dict[str, Any]:
+    """依次执行各项延迟初始化并统计耗时，返回启动报告；没有运行中的事件循环，不启动预计算任务"""
+    _init_runtime()
+    with profiler.phase("import_tools", lazy=True):
+        import care_elite.tools.information_collector
+        import care_elite.tools.service_recommender
+        import care_elite.tools.case_presenter
+    with profiler.phase("sales_index", lazy=True):
+        from care_elite.database.sales_experience import search_sales_experience
+        search_sales_experience({})
+    with profiler.phase("case_matrix", lazy=True):
+        from care_elite.database.case_database import get_case_by_id
+        get_case_by_id("")
+    with profiler.phase("voice_engines", lazy=True):
+        from care_elite.voice.speech_to_text import SpeechToText
+        from care_elite.voice.text_to_speech import get_tts_engine
+        SpeechToText()
+        get_tts_engine()
+    return profiler.report()
 
 
 if __name__ == "__main__":
+    if "--startup-report" in sys.argv[1:]:
+        report = startup_report()
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(0 if report["within_budget"] else 1)
     # 初始化并运行服务器
     mcp.run(transport='stdio')